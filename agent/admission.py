@@ -0,0 +1,272 @@
+"""
+Admission control for the judge response path
+Every room in the process shares one /api/host (or LLM) budget. Without a
+limit, a burst of end_turns piles onto the backend, every room slows down
+together and the 30s timeouts cascade. Instead:
+
+- Deadline: each reply gets a JUDGE_REPLY_DEADLINE budget from the moment
+  the turn ends; waits and upstream timeouts use what is left of it rather
+  than their own 30s
+- AdmissionController: per-room and global concurrency limits with a short,
+  bounded wait queue; turns that can't get a slot in time are shed
+- CircuitBreaker: after repeated /api/host failures, calls fail fast for a
+  cool-down, then one probe decides whether to close it again
+
+Shed turns raise Overloaded, and the judge answers them with a cheap canned
+or cached line instead of waiting.
+"""
+
+import os
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Hashable, Optional
+
+from metrics import REGISTRY, Counter, gauge
+
+logger = logging.getLogger("admission")
+logger.setLevel(logging.INFO)
+
+SHED = REGISTRY.register(Counter("judge_shed_total", "Turns answered without the backend", ["reason"]))
+
+
+class Overloaded(Exception):
+    """A call was refused before reaching the backend"""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Overloaded ({reason})")
+        self.reason = reason
+
+
+class CircuitOpenError(Overloaded):
+    """The circuit breaker is failing calls fast"""
+
+    def __init__(self, name: str):
+        super().__init__("circuit_open")
+        self.name = name
+
+
+class Deadline:
+    """A point in time a reply has to be ready by"""
+
+    __slots__ = ("expires_at",)
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+class _RoomSlots:
+    __slots__ = ("semaphore", "users")
+
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.users = 0  # holders and waiters; the entry goes when it drops to 0
+
+
+class AdmissionController:
+    """Per-room and global concurrency limits for backend calls"""
+
+    def __init__(self, global_limit: int = 32, room_limit: int = 2, max_wait: float = 2.0, max_queue: Optional[int] = None):
+        self.global_limit = global_limit
+        self.room_limit = room_limit
+        self.max_wait = max_wait
+        self.max_queue = global_limit if max_queue is None else max_queue
+        self._global = asyncio.Semaphore(global_limit)
+        self._rooms: Dict[Hashable, _RoomSlots] = {}
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed: Dict[str, int] = {}
+
+    def _shed(self, reason: str) -> Overloaded:
+        self.shed[reason] = self.shed.get(reason, 0) + 1
+        SHED.inc(reason)
+        return Overloaded(reason)
+
+    def _room(self, key: Hashable) -> _RoomSlots:
+        slots = self._rooms.get(key)
+        if slots is None:
+            slots = self._rooms[key] = _RoomSlots(self.room_limit)
+        slots.users += 1
+        return slots
+
+    def _leave_room(self, key: Hashable, slots: _RoomSlots):
+        slots.users -= 1
+        if slots.users == 0 and self._rooms.get(key) is slots:
+            del self._rooms[key]
+
+    async def _acquire(self, semaphore: asyncio.Semaphore, wait: float, reason: str):
+        if semaphore.locked():
+            if wait <= 0:
+                raise self._shed(reason)
+            if self.waiting >= self.max_queue:
+                raise self._shed("queue_full")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), wait if wait > 0 else None)
+        except asyncio.TimeoutError:
+            raise self._shed(reason) from None
+        finally:
+            self.waiting -= 1
+
+    @asynccontextmanager
+    async def admit(self, key: Hashable, deadline: Optional[Deadline] = None, wait: Optional[float] = None) -> AsyncIterator[None]:
+        """Hold a room slot and a global slot, or raise Overloaded
+
+        Waits at most max_wait (or `wait`), and never past the deadline.
+        """
+        started = time.monotonic()
+        wait = self.max_wait if wait is None else wait
+        if deadline is not None:
+            if deadline.expired:
+                raise self._shed("deadline")
+            wait = min(wait, deadline.remaining())
+
+        slots = self._room(key)
+        try:
+            await self._acquire(slots.semaphore, wait, "room_busy")
+            try:
+                remaining = max(0.0, wait - (time.monotonic() - started))
+                await self._acquire(self._global, remaining, "global_busy")
+                self.in_flight += 1
+                self.admitted += 1
+                try:
+                    yield
+                finally:
+                    self.in_flight -= 1
+                    self._global.release()
+            finally:
+                slots.semaphore.release()
+        finally:
+            self._leave_room(key, slots)
+
+    def try_admit(self, key: Hashable):
+        """Admit only if a slot is free right now (for optional work like drafts)"""
+        return self.admit(key, wait=0.0)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+        }
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Fails calls fast after `failure_threshold` consecutive failures"""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 10.0,
+        is_failure: Callable[[BaseException], bool] = lambda e: True,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.is_failure = is_failure
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.opened = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go through now"""
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = HALF_OPEN
+            logger.info(f"Circuit {self.name} half-open, probing")
+        if self.state == HALF_OPEN:
+            # One probe at a time; everyone else keeps failing fast
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def success(self):
+        if self.state != CLOSED:
+            logger.info(f"Circuit {self.name} closed")
+        self.state = CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+            self.opened += 1
+            logger.warning(f"Circuit {self.name} open after {self.failures} failures; failing fast for {self.reset_timeout:.0f}s")
+
+    @asynccontextmanager
+    async def guard(self) -> AsyncIterator[None]:
+        """Run a call through the breaker, raising CircuitOpenError when open"""
+        if not self.allow():
+            self.rejected += 1
+            SHED.inc("circuit_open")
+            raise CircuitOpenError(self.name)
+        try:
+            yield
+        except (asyncio.CancelledError, GeneratorExit):
+            # No verdict; let the next call probe
+            self._probing = False
+            raise
+        except Exception as e:
+            if self.is_failure(e):
+                self.failure()
+            else:
+                self.success()
+            raise
+        else:
+            self.success()
+
+    def stats(self) -> Dict[str, object]:
+        return {"state": self.state, "failures": self.failures, "opened": self.opened, "rejected": self.rejected}
+
+
+_admission: Optional[AdmissionController] = None
+
+
+def get_admission() -> AdmissionController:
+    """Process-wide admission controller, shared by every room"""
+    global _admission
+    if _admission is None:
+        _admission = AdmissionController(
+            global_limit=int(os.getenv("JUDGE_MAX_REPLIES", "32")),
+            room_limit=int(os.getenv("JUDGE_MAX_REPLIES_PER_ROOM", "2")),
+            max_wait=float(os.getenv("JUDGE_ADMISSION_WAIT", "2.0")),
+        )
+        controller = _admission
+        gauge("judge_admission_in_flight", "Backend calls holding a slot",
+              lambda: {(): controller.in_flight})
+        gauge("judge_admission_waiting", "Backend calls waiting for a slot",
+              lambda: {(): controller.waiting})
+    return _admission
+
+
+def reply_deadline() -> Deadline:
+    """Budget for a reply from JUDGE_REPLY_DEADLINE
+
+    end_turn returns before the reply runs, so the RPC's own timeout says
+    nothing about how long the reply may take.
+    """
+    return Deadline(float(os.getenv("JUDGE_REPLY_DEADLINE", "8")))
@@ -0,0 +1,172 @@
+"""
+Adaptive transcript commits for push-to-talk turns
+Committing a user turn flushes the STT with silence and waits for the final
+transcript. A fixed 2s flush and 10s timeout made every turn pay for the
+slowest case. Instead, each turn gets a plan from what the STT and VAD
+already reported:
+
+- the last segment is final and nothing was said after it: no flush
+- the player was already silent before releasing: flush only the rest
+- otherwise: a flush learned from this room's recent turns, lowered while
+  finals keep arriving in time and raised when one has to be forced
+
+The transcript timeout follows how long finals actually take to arrive.
+"""
+
+import os
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional
+
+from metrics import REGISTRY, STAGE_SECONDS, Histogram
+
+logger = logging.getLogger("commit-tuning")
+logger.setLevel(logging.INFO)
+
+FLUSH_SECONDS = REGISTRY.register(Histogram(
+    "judge_stt_flush_seconds", "STT flush chosen when committing a turn", ["reason"],
+    buckets=(0.0, 0.1, 0.2, 0.4, 0.6, 0.8, 1.0, 1.5, 2.0, 3.0),
+))
+
+# Wait for a straggling final when everything said was already final
+STABLE_TIMEOUT = 0.2
+
+
+@dataclass
+class CommitPlan:
+    flush: float
+    timeout: float
+    reason: str  # stable | silence | learned
+    at: float = 0.0
+
+
+class TranscriptCommitTuner:
+    """Per-room flush and timeout choices for commit_user_turn"""
+
+    def __init__(
+        self,
+        max_flush: float = 2.0,
+        min_flush: float = 0.2,
+        max_timeout: float = 10.0,
+        min_timeout: float = 0.5,
+        history: int = 20,
+    ):
+        self.max_flush = max_flush
+        self.min_flush = min_flush
+        self.max_timeout = max_timeout
+        self.min_timeout = min_timeout
+        self.flush = max_flush  # learned; starts at the old fixed value
+        self._final_delays: Deque[float] = deque(maxlen=history)
+
+        # Current turn, fed from session events
+        self._final_at: Optional[float] = None
+        self._pending_interim = False
+        self._speaking = False
+        self._silent_since: Optional[float] = None
+        self._plan: Optional[CommitPlan] = None
+        self._final_after_commit = False
+
+        self.turns = 0
+        self.forced = 0
+        self.flush_total = 0.0
+        self.by_reason: Dict[str, int] = {}
+
+    def begin_turn(self):
+        self._final_at = None
+        self._pending_interim = False
+        self._speaking = False
+        self._silent_since = None
+
+    def on_transcript(self, is_final: bool, text: str):
+        now = time.monotonic()
+        if is_final:
+            self._final_at = now
+            self._pending_interim = False
+            if self._plan is not None:
+                self._final_after_commit = True
+        elif text.strip():
+            self._pending_interim = True
+
+    def on_user_state(self, new_state: str):
+        """VAD: 'speaking' when the player talks, 'listening' when they stop"""
+        if new_state == "speaking":
+            self._speaking = True
+            self._silent_since = None
+        elif self._speaking:
+            self._speaking = False
+            self._silent_since = time.monotonic()
+
+    def _timeout(self) -> float:
+        if not self._final_delays:
+            return self.max_timeout
+        delays = sorted(self._final_delays)
+        p90 = delays[min(len(delays) - 1, int(0.9 * len(delays)))]
+        return min(self.max_timeout, max(self.min_timeout, p90 * 1.5 + 0.25))
+
+    def plan(self) -> CommitPlan:
+        """Flush and timeout for the turn being released now"""
+        now = time.monotonic()
+        timeout = self._timeout()
+        if self._final_at is not None and not self._pending_interim and not self._speaking:
+            # Everything said is already final; just collect it
+            plan = CommitPlan(0.0, min(timeout, STABLE_TIMEOUT), "stable")
+        elif self._silent_since is not None:
+            # The STT has already heard this much trailing silence
+            trailing = now - self._silent_since
+            plan = CommitPlan(max(self.min_flush, self.flush - trailing), timeout, "silence")
+        else:
+            plan = CommitPlan(self.flush, timeout, "learned")
+
+        plan.at = now
+        self._plan = plan
+        self._final_after_commit = False
+        FLUSH_SECONDS.observe(plan.flush, plan.reason)
+        return plan
+
+    def committed(self, transcript: str):
+        """The commit resolved; learn from how it went"""
+        plan, self._plan = self._plan, None
+        if plan is None:
+            return
+        elapsed = time.monotonic() - plan.at
+        STAGE_SECONDS.observe(elapsed, "transcript_commit")
+
+        self.turns += 1
+        self.flush_total += plan.flush
+        self.by_reason[plan.reason] = self.by_reason.get(plan.reason, 0) + 1
+
+        if plan.reason != "stable" and transcript:
+            if self._final_after_commit:
+                self._final_delays.append(elapsed)
+                self.flush = max(self.min_flush, self.flush * 0.85)
+            else:
+                # Timed out and fell back to the interim text
+                self.forced += 1
+                self.flush = min(self.max_flush, self.flush * 1.5 + 0.1)
+
+        logger.info(
+            f"Turn committed in {elapsed:.2f}s (flush {plan.flush:.2f}s, {plan.reason}); "
+            f"next flush {self.flush:.2f}s"
+        )
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "turns": self.turns,
+            "flush_s": round(self.flush, 2),
+            "avg_flush_s": round(self.flush_total / self.turns, 2) if self.turns else 0.0,
+            "flush_saved_s": round(self.turns * self.max_flush - self.flush_total, 2),
+            "forced": self.forced,
+            "timeout_s": round(self._timeout(), 2),
+            "by_reason": dict(self.by_reason),
+        }
+
+
+def create_commit_tuner() -> TranscriptCommitTuner:
+    """Tuner bounded by JUDGE_STT_FLUSH_MAX/MIN and JUDGE_TRANSCRIPT_TIMEOUT"""
+    return TranscriptCommitTuner(
+        max_flush=float(os.getenv("JUDGE_STT_FLUSH_MAX", "2.0")),
+        min_flush=float(os.getenv("JUDGE_STT_FLUSH_MIN", "0.2")),
+        max_timeout=float(os.getenv("JUDGE_TRANSCRIPT_TIMEOUT", "10")),
+    )
@@ -0,0 +1,193 @@
+"""
+Room discovery - finds active mafia-* rooms and spawns judges for them
+Replaces typing `spawn CODE` by hand. Each tick diffs the active room set
+against the rooms we already host, so only new or vanished rooms cost any
+work; the poll interval tightens while games are changing and relaxes while
+nothing happens.
+
+Discovery only reaps judges whose room no longer exists, and only after it
+has been missing for a few polls in a row. Rooms that exist but are empty
+are left to the IdleReaper and its grace period.
+"""
+
+import os
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from livekit import api
+
+from http_client import get_host_client
+from tokens import JUDGE_IDENTITY
+
+logger = logging.getLogger("discovery")
+logger.setLevel(logging.INFO)
+
+ROOM_PREFIX = "mafia-"
+
+# A source returns {room code: player count} for every live room; judges and
+# other agents are not players
+RoomSource = Callable[[], Awaitable[Dict[str, int]]]
+
+
+def is_player(participant) -> bool:
+    """Not a judge or other agent; works for API listings and rtc participants"""
+    # rtc.ParticipantKind and ParticipantInfo.Kind share their values
+    return participant.identity != JUDGE_IDENTITY and getattr(participant, "kind", None) != api.ParticipantInfo.Kind.AGENT
+
+
+def livekit_room_source() -> RoomSource:
+    """List rooms straight from the LiveKit server
+
+    num_participants includes the judge, so rooms that have anyone in them
+    are asked for their participant list and only players are counted.
+    """
+    lkapi: Optional[api.LiveKitAPI] = None
+
+    async def list_rooms() -> Dict[str, int]:
+        nonlocal lkapi
+        if lkapi is None:
+            lkapi = api.LiveKitAPI(
+                os.getenv("LIVEKIT_URL") or os.getenv("LIVEKIT_WS_URL"),
+                os.getenv("LIVEKIT_API_KEY"),
+                os.getenv("LIVEKIT_API_SECRET"),
+            )
+        response = await lkapi.room.list_rooms(api.ListRoomsRequest())
+        rooms = [room for room in response.rooms if room.name.startswith(ROOM_PREFIX)]
+
+        async def players(room) -> int:
+            if room.num_participants == 0:
+                return 0
+            listing = await lkapi.room.list_participants(api.ListParticipantsRequest(room=room.name))
+            return sum(1 for participant in listing.participants if is_player(participant))
+
+        counts = await asyncio.gather(*(players(room) for room in rooms))
+        return {room.name[len(ROOM_PREFIX):].upper(): count for room, count in zip(rooms, counts)}
+
+    return list_rooms
+
+
+def room_api_source(base_url: str) -> RoomSource:
+    """List rooms from the Next.js /api/room endpoint (it only counts players)"""
+
+    async def list_rooms() -> Dict[str, int]:
+        data = await get_host_client(base_url).get_json("/api/room", timeout=10)
+        return {room["code"].upper(): room.get("players", 0) for room in data.get("rooms", [])}
+
+    return list_rooms
+
+
+class RoomDiscovery:
+    """Keeps AgentManager in sync with the rooms that have players"""
+
+    def __init__(
+        self,
+        manager,
+        source: RoomSource,
+        min_interval: float = 2.0,
+        max_interval: float = 30.0,
+        max_concurrency: int = 8,
+        retry_delay: float = 30.0,
+        missing_polls: int = 3,
+    ):
+        self.manager = manager
+        self.source = source
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.retry_delay = retry_delay
+        self.missing_polls = missing_polls
+        self.interval = min_interval
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._pending: Set[str] = set()
+        self._retry_at: Dict[str, float] = {}
+        self._missing: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def run(self):
+        """Poll forever, adapting the interval to how busy the server is"""
+        logger.info("Room discovery started")
+        try:
+            while True:
+                try:
+                    changed = await self.poll_once()
+                except Exception as e:
+                    logger.error(f"Discovery error: {e!r}")
+                    changed = False
+
+                if changed:
+                    self.interval = self.min_interval
+                else:
+                    self.interval = min(self.interval * 1.5, self.max_interval)
+                await asyncio.sleep(self.interval)
+        except asyncio.CancelledError:
+            logger.info("Room discovery stopped")
+
+    async def poll_once(self) -> bool:
+        """Spawn judges for new rooms and reap judges whose room is gone
+
+        Returns True if anything changed.
+        """
+        rooms = await self.source()
+        hosted = set(self.manager.agents.keys())
+        now = time.monotonic()
+
+        for code in [code for code in self._retry_at if code not in rooms]:
+            del self._retry_at[code]
+
+        active = {code for code, players in rooms.items() if players > 0}
+        new_rooms = [
+            code for code in active - hosted - self._pending
+            if self._retry_at.get(code, 0) <= now
+        ]
+
+        # A single missed listing shouldn't cost a room its judge
+        for code in [code for code in self._missing if code in rooms or code not in hosted]:
+            del self._missing[code]
+        gone_rooms = []
+        for code in hosted - set(rooms) - self._pending:
+            self._missing[code] = self._missing.get(code, 0) + 1
+            if self._missing[code] >= self.missing_polls:
+                gone_rooms.append(code)
+
+        if not new_rooms and not gone_rooms:
+            return False
+
+        if new_rooms:
+            logger.info(f"Discovered {len(new_rooms)} new room(s): {', '.join(new_rooms)}")
+        if gone_rooms:
+            logger.info(f"Reaping {len(gone_rooms)} finished room(s): {', '.join(gone_rooms)}")
+
+        await asyncio.gather(
+            *(self._spawn(code) for code in new_rooms),
+            *(self._remove(code) for code in gone_rooms),
+        )
+        return True
+
+    async def _spawn(self, room_code: str):
+        self._pending.add(room_code)
+        try:
+            async with self._semaphore:
+                await self.manager.spawn_agent(room_code)
+            if room_code in self.manager.agents:
+                self._retry_at.pop(room_code, None)
+            else:
+                self._retry_at[room_code] = time.monotonic() + self.retry_delay
+        finally:
+            self._pending.discard(room_code)
+
+    async def _remove(self, room_code: str):
+        self._pending.add(room_code)
+        try:
+            async with self._semaphore:
+                await self.manager.remove_agent(room_code)
+            self._missing.pop(room_code, None)
+        finally:
+            self._pending.discard(room_code)
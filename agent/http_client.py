@@ -0,0 +1,245 @@
+"""
+Shared async HTTP client for the judge bots
+One pooled keep-alive session per process, so a slow /api/host call never
+blocks the event loop that every room shares. /api/host calls go through a
+circuit breaker per provider, so an outage fails turns fast instead of after
+the timeout without taking the healthy providers down with it.
+"""
+
+import os
+import json
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+import aiohttp
+
+from admission import CLOSED, CircuitBreaker
+from metrics import gauge
+from routing import ProviderError
+
+logger = logging.getLogger("http-client")
+logger.setLevel(logging.INFO)
+
+
+class HostAPIError(Exception):
+    """Raised when /api/host answers with a non-2xx status"""
+
+    def __init__(self, status: int):
+        super().__init__(f"Host API returned {status}")
+        self.status = status
+
+
+def _host_failure(error: BaseException) -> bool:
+    """Errors that say /api/host is unhealthy (not a bad request)"""
+    if isinstance(error, HostAPIError):
+        return error.status >= 500 or error.status == 429
+    return isinstance(error, (ProviderError, asyncio.TimeoutError, aiohttp.ClientError, OSError))
+
+
+def _check_answer(provider: Optional[str], event: Dict[str, Any]) -> Dict[str, Any]:
+    """Raise ProviderError unless the provider that was asked for answered
+
+    /api/host falls back to another provider (or a canned line) when the
+    requested one fails, and the router must not credit that answer to it.
+    Answers that don't name a provider are taken at their word.
+    """
+    answered_by = str(event.get("provider") or provider or "")
+    if answered_by == "fallback" or answered_by.endswith("-error"):
+        raise ProviderError(provider or "auto", str(event.get("error") or answered_by))
+    if provider and answered_by != provider:
+        raise ProviderError(provider, f"answered by {answered_by}")
+    return event
+
+
+class HostClient:
+    """Pooled async client for the Next.js API"""
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 30.0,
+        max_in_flight: int = 64,
+        pool_size: int = 100,
+        breaker_failures: int = 5,
+        breaker_reset: float = 10.0,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        self.pool_size = pool_size
+        self.in_flight = 0
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def breaker(self, provider: Optional[str]) -> CircuitBreaker:
+        """The circuit breaker for one /api/host provider"""
+        name = provider or "auto"
+        breaker = self.breakers.get(name)
+        if breaker is None:
+            breaker = self.breakers[name] = CircuitBreaker(
+                f"host_api:{name}",
+                failure_threshold=self.breaker_failures,
+                reset_timeout=self.breaker_reset,
+                is_failure=_host_failure,
+            )
+        return breaker
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Create the keep-alive session on first use"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=60,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def post_json(
+        self, path: str, payload: Dict[str, Any], timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """POST a JSON body and return the decoded JSON answer
+
+        The deadline covers both waiting for a free slot and the request itself.
+        """
+        deadline = timeout if timeout is not None else self.timeout
+        return await asyncio.wait_for(self._post_json(path, payload), deadline)
+
+    async def _post_json(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                session = self._get_session()
+                async with session.post(f"{self.base_url}{path}", json=payload) as response:
+                    if response.status >= 400:
+                        raise HostAPIError(response.status)
+                    return await response.json(content_type=None)
+            finally:
+                self.in_flight -= 1
+
+    async def get_json(self, path: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """GET a path and return the decoded JSON answer"""
+        deadline = timeout if timeout is not None else self.timeout
+        return await asyncio.wait_for(self._get_json(path), deadline)
+
+    async def _get_json(self, path: str) -> Dict[str, Any]:
+        async with self._semaphore:
+            session = self._get_session()
+            async with session.get(f"{self.base_url}{path}") as response:
+                if response.status >= 400:
+                    raise HostAPIError(response.status)
+                return await response.json(content_type=None)
+
+    async def ask_host(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Call /api/host; raises CircuitOpenError while the provider's breaker is open"""
+        provider = payload.get("provider")
+        async with self.breaker(provider).guard():
+            data = await self.post_json("/api/host", payload, timeout=timeout)
+            return _check_answer(provider, data)
+
+    async def stream_host(
+        self, payload: Dict[str, Any], timeout: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Call /api/host in streaming mode
+
+        Yields {"delta": text} events as tokens arrive and a final
+        {"answer": text, ...} event. Servers that don't stream answer with
+        plain JSON, which is yielded as the final event.
+        """
+        provider = payload.get("provider")
+        async with self.breaker(provider).guard():
+            async for event in self._stream_host(payload, timeout):
+                yield _check_answer(provider, event) if "answer" in event else event
+
+    async def _stream_host(
+        self, payload: Dict[str, Any], timeout: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        deadline = timeout if timeout is not None else self.timeout
+        started = time.monotonic()
+        await asyncio.wait_for(self._semaphore.acquire(), deadline)
+        self.in_flight += 1
+        try:
+            remaining = max(0.1, deadline - (time.monotonic() - started))
+            session = self._get_session()
+            async with session.post(
+                f"{self.base_url}/api/host",
+                json={**payload, "stream": True},
+                headers={"Accept": "text/event-stream, application/json"},
+                timeout=aiohttp.ClientTimeout(total=remaining),
+            ) as response:
+                if response.status >= 400:
+                    raise HostAPIError(response.status)
+
+                content_type = response.headers.get("Content-Type", "")
+                if "application/json" in content_type:
+                    yield await response.json(content_type=None)
+                elif "text/event-stream" in content_type:
+                    async for event in _iter_sse(response.content):
+                        yield event
+                else:
+                    # Plain chunked text: every chunk is a delta
+                    async for chunk in response.content.iter_any():
+                        text = chunk.decode("utf-8", errors="ignore")
+                        if text:
+                            yield {"delta": text}
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def close(self):
+        """Close the pooled session"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+async def _iter_sse(stream: aiohttp.StreamReader) -> AsyncIterator[Dict[str, Any]]:
+    """Parse `data: {...}` lines from a server-sent event stream"""
+    async for raw_line in stream:
+        line = raw_line.decode("utf-8", errors="ignore").strip()
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if not data or data == "[DONE]":
+            continue
+        try:
+            event = json.loads(data)
+        except ValueError:
+            yield {"delta": data}
+            continue
+        if isinstance(event, dict):
+            yield event
+
+
+_client: Optional[HostClient] = None
+
+
+def get_host_client(base_url: str) -> HostClient:
+    """Return the process-wide client, creating it on first use"""
+    global _client
+    if _client is None:
+        _client = HostClient(
+            base_url,
+            timeout=float(os.getenv("HOST_API_TIMEOUT", "30")),
+            max_in_flight=int(os.getenv("HOST_API_MAX_IN_FLIGHT", "64")),
+            breaker_failures=int(os.getenv("HOST_API_BREAKER_FAILURES", "5")),
+            breaker_reset=float(os.getenv("HOST_API_BREAKER_RESET", "10")),
+        )
+        client = _client
+        gauge("judge_host_circuit_open", "1 while a provider's /api/host calls fail fast",
+              lambda: {(name,): 0 if breaker.state == CLOSED else 1 for name, breaker in client.breakers.items()},
+              ["provider"])
+    return _client
+
+
+async def close_host_client():
+    """Close the process-wide client if one was created"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
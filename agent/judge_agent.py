@@ -16,33 +16,184 @@ Setup:
 To connect, use room name format: mafia-ROOMCODE (e.g., mafia-ABC123)
 """
 
+import os
+import re
+import json
+import asyncio
+import importlib.util
 import logging
+import time
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
 
 from livekit import rtc
-from livekit.agents import Agent, AgentSession, JobContext, JobRequest, RoomIO, WorkerOptions, cli
+from livekit.agents import Agent, AgentSession, AutoSubscribe, JobContext, JobProcess, JobRequest, RoomIO, WorkerOptions, cli
 from livekit.agents.llm import ChatContext, ChatMessage, StopResponse
-from livekit.plugins import deepgram, openai
 
-# Try to import Cartesia TTS, fallback to OpenAI TTS if not available
-try:
-    from livekit.plugins import cartesia
-    TTS_PLUGIN = cartesia.TTS()
-except ImportError:
-    print("Cartesia not available, using OpenAI TTS")
-    TTS_PLUGIN = openai.TTS(voice="alloy")
+from admission import Deadline
+from commit_tuning import create_commit_tuner
+from judge_core import JudgeCore, ResponseBackend
+from memory import RoomMemory
+from metrics import ERRORS, STAGE_SECONDS
+from phrase_cache import DEFAULT_CACHE_DIR, PhraseCache
+from plugin_pool import PluginPool
+from routing import provider_list
+from speculation import SessionSpeculation
+
+STARTED_AT = time.monotonic()
 
 logger = logging.getLogger("judge-agent")
 logger.setLevel(logging.INFO)
 
 load_dotenv()
 
+# Chat items kept verbatim; older turns reach the LLM as memory summaries
+MAX_CHAT_ITEMS = int(os.getenv("JUDGE_MAX_CHAT_ITEMS", "8"))
+NOTES_ID = "judge-game-notes"
+
+# Start drafting the reply from final STT segments while push-to-talk is
+# still held; the draft is used if the committed transcript matches
+SPECULATE = os.getenv("JUDGE_SPECULATE", "1") == "1"
+
+# How long the host waits for a fresh vote before we fall back to the
+# suspicion scores computed during discussion
+VOTE_TIMEOUT = float(os.getenv("JUDGE_VOTE_TIMEOUT", "4"))
+
+ABSTAIN = "abstain"
+
+
+# Plugins are imported and built on first use, not at import time
+def _deepgram_stt():
+    from livekit.plugins import deepgram
+    return deepgram.STT()
+
+
+def _openai_llm():
+    from livekit.plugins import openai
+    models = provider_list("JUDGE_LLM_MODELS", os.getenv("JUDGE_LLM_MODEL", "gpt-4o-mini"))
+    if len(models) == 1:
+        return openai.LLM(model=models[0])
+    # The session streams straight into TTS, so it fails over between
+    # models in order rather than hedging (see routing.py for that)
+    from livekit.agents.llm import FallbackAdapter
+    return FallbackAdapter([openai.LLM(model=model) for model in models])
+
+
+def _tts_options(plugin: str) -> Dict[str, str]:
+    """Model/voice overrides for a TTS plugin; unset keeps the plugin default"""
+    defaults = {"openai": {"voice": "alloy"}}.get(plugin, {})
+    options = {
+        "model": os.getenv(f"{plugin.upper()}_TTS_MODEL", defaults.get("model", "")),
+        "voice": os.getenv(f"{plugin.upper()}_TTS_VOICE", defaults.get("voice", "")),
+    }
+    return {key: value for key, value in options.items() if value}
+
+
+def _cartesia_tts():
+    from livekit.plugins import cartesia
+    return cartesia.TTS(**_tts_options("cartesia"))
+
+
+def _openai_tts():
+    from livekit.plugins import openai
+    return openai.TTS(**_tts_options("openai"))
+
+
+# Tried in order; the first one installed is built
+TTS_PLUGINS = [("cartesia", _cartesia_tts), ("openai", _openai_tts)]
+
+
+def _plugin_installed(plugin: str) -> bool:
+    try:
+        return importlib.util.find_spec(f"livekit.plugins.{plugin}") is not None
+    except ImportError:
+        return False
+
+
+def tts_voice(plugin: Optional[str] = None) -> str:
+    """Phrase cache voice key for a TTS plugin, without building its client
+
+    Defaults to the plugin the pool would build first.
+    """
+    if plugin is None:
+        plugin = next((name for name, _ in TTS_PLUGINS if _plugin_installed(name)), "none")
+    options = _tts_options(plugin)
+    return f"{plugin}:{options.get('model', '')}:{options.get('voice', '')}"
+
+
+_pool: Optional[PluginPool] = None
+
+
+def get_plugin_pool() -> PluginPool:
+    """Return the worker process's plugin pool"""
+    global _pool
+    if _pool is None:
+        _pool = PluginPool(max_errors=int(os.getenv("PLUGIN_MAX_ERRORS", "3")))
+        _pool.register("stt", [("deepgram", _deepgram_stt)], int(os.getenv("STT_MAX_SESSIONS", "32")))
+        _pool.register("llm", [("openai", _openai_llm)], int(os.getenv("LLM_MAX_SESSIONS", "32")))
+        # Try Cartesia TTS, fallback to OpenAI TTS if not available
+        _pool.register("tts", TTS_PLUGINS, int(os.getenv("TTS_MAX_SESSIONS", "32")))
+    return _pool
+
+# Fixed lines, pre-rendered once and replayed from the phrase cache
+WELCOME_LINE = "The Judge has entered. State your case when ready."
+NO_PLAYERS_LINE = "No players to vote for. Abstaining."
+NOT_ENOUGH_LINE = "I have not heard enough to condemn anyone. I abstain."
+NO_CAUSE_LINE = "No one has given me cause enough. I abstain."
+JUDGE_PHRASES = [WELCOME_LINE, NO_PLAYERS_LINE, NOT_ENOUGH_LINE, NO_CAUSE_LINE]
+
+SCORING_PROMPT = """You are scoring players in a social deduction game (Mafia/Werewolf).
+Rate how suspicious each player is from 0 (clearly innocent) to 10 (almost certainly Mafia),
+based on contradictions, deflection and vagueness in what they said.
+
+Players: {players}
+
+What has been said:
+{notes}
+
+Reply with JSON only: {{"scores": {{"<player>": {{"score": <0-10>, "reason": "<one short sentence>"}}}}}}"""
+
+VOTE_PROMPT = """You are the AI Judge in a social deduction game and must now vote to eliminate one player or abstain.
+
+Players still in the game: {players}
+
+What has been said:
+{notes}
+
+Suspicion scores from the discussion:
+{scores}
+
+Reply with JSON only: {{"target": "<exact player name or abstain>", "reasoning": "<one or two short, dramatic sentences>"}}"""
+
+
+def parse_json_reply(text: str) -> Optional[dict]:
+    """Pull a JSON object out of an LLM reply, tolerating code fences"""
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def validate_target(target, players: List[str]) -> str:
+    """Map the LLM's pick onto a live player, or abstain"""
+    if not isinstance(target, str):
+        return ABSTAIN
+    wanted = target.strip().lower()
+    for player in players:
+        if player.lower() == wanted:
+            return player
+    return ABSTAIN
+
 
 class JudgeAgent(Agent):
     """
     AI Judge agent that listens to players and makes decisions
     """
-    def __init__(self) -> None:
+    def __init__(self, stt, llm, tts) -> None:
         super().__init__(
             instructions="""You are the AI Judge in a social deduction game similar to Mafia/Werewolf.
 
@@ -57,15 +208,19 @@ Your role:
 
 Respond naturally and conversationally. Keep responses under 3 sentences.
 Be dramatic and engaging, but fair.""",
-            stt=deepgram.STT(),
-            llm=openai.LLM(model="gpt-4o-mini"),
-            tts=TTS_PLUGIN,
+            stt=stt,
+            llm=llm,
+            tts=tts,
         )
         
         # Track game state
         self.players_spoken = set()
         self.round_number = 1
-        self.suspicions = {}  # player -> suspicion notes
+        self.suspicions: Dict[str, dict] = {}  # player -> {"score", "reason"}
+        self.current_speaker = None
+        self._scored_turn = 0
+        self._scoring_task: Optional[asyncio.Task] = None
+        self.memory = RoomMemory(token_budget=int(os.getenv("MEMORY_TOKEN_BUDGET", "400")))
 
     async def on_user_turn_completed(
         self, turn_ctx: ChatContext, new_message: ChatMessage
@@ -77,63 +232,329 @@ Be dramatic and engaging, but fair.""",
         
         # Log the player's statement
         logger.info(f"Player statement: {new_message.text_content}")
+        
+        speaker = self.current_speaker or "A player"
+        self.players_spoken.add(speaker)
+        self.memory.add_turn(speaker, new_message.text_content)
+        
+        # Compact the persistent context for the next turn instead of editing
+        # turn_ctx: a preemptive draft of this reply stays valid only if the
+        # context it was drafted from is left untouched
+        await self.update_chat_ctx(self.compact_chat_ctx())
+        self.schedule_scoring()
+
+    def compact_chat_ctx(self) -> ChatContext:
+        """Last few items verbatim, with bounded game notes after the instructions"""
+        chat_ctx = self.chat_ctx.copy()
+        notes = chat_ctx.get_by_id(NOTES_ID)
+        if notes:
+            chat_ctx.remove(notes)
+        chat_ctx.truncate(max_items=MAX_CHAT_ITEMS)
+        
+        text = self.memory.render()
+        if text:
+            position = 1 if chat_ctx.items and getattr(chat_ctx.items[0], "role", None) == "system" else 0
+            chat_ctx.items.insert(position, ChatMessage(
+                id=NOTES_ID,
+                role="system",
+                content=[f"Notes on the game so far:\n{text}"],
+            ))
+        return chat_ctx
+
+    async def _ask_json(self, prompt: str) -> Optional[dict]:
+        """One non-streaming LLM call that must answer with a JSON object"""
+        ctx = ChatContext.empty()
+        ctx.add_message(role="user", content=prompt)
+        stream = self.llm.chat(
+            chat_ctx=ctx,
+            extra_kwargs={"response_format": {"type": "json_object"}},
+        )
+        response = await stream.collect()
+        return parse_json_reply(response.text)
+
+    def schedule_scoring(self):
+        """Re-score players in the background after each statement"""
+        if self._scoring_task is None or self._scoring_task.done():
+            self._scoring_task = asyncio.create_task(self._score_loop())
+
+    async def _score_loop(self):
+        # Statements that arrive mid-call are picked up by the next pass
+        while self._scored_turn < self.memory.turn_count:
+            turn = self.memory.turn_count
+            players = self.memory.players
+            try:
+                data = await self._ask_json(SCORING_PROMPT.format(
+                    players=", ".join(players),
+                    notes=self.memory.render(),
+                ))
+            except Exception as e:
+                logger.error(f"Suspicion scoring failed: {e!r}")
+                return
+            
+            scores = (data or {}).get("scores")
+            if isinstance(scores, dict):
+                for player in players:
+                    entry = scores.get(player)
+                    if not isinstance(entry, dict):
+                        continue
+                    try:
+                        score = max(0.0, min(10.0, float(entry.get("score", 0))))
+                    except (TypeError, ValueError):
+                        continue
+                    self.suspicions[player] = {"score": score, "reason": str(entry.get("reason", ""))}
+            self._scored_turn = turn
+
+    def precomputed_vote(self, players: List[str]) -> dict:
+        """Vote for the most suspicious live player from the running scores"""
+        scored = [(self.suspicions[p]["score"], p) for p in players if p in self.suspicions]
+        if not scored:
+            return {"target": ABSTAIN, "reasoning": NOT_ENOUGH_LINE}
+        score, target = max(scored)
+        if score < 5:
+            return {"target": ABSTAIN, "reasoning": NO_CAUSE_LINE}
+        return {"target": target, "reasoning": self.suspicions[target]["reason"] or f"{target}'s story does not hold together."}
+
+    async def decide_vote(self, players: List[str]) -> dict:
+        """Structured vote: {target, reasoning} with target checked against live players"""
+        if self._scored_turn == self.memory.turn_count and self.suspicions:
+            # Scores already cover everything said; answer instantly
+            vote = self.precomputed_vote(players)
+            vote["source"] = "precomputed"
+            return vote
+        
+        scores = "\n".join(
+            f"- {p}: {self.suspicions[p]['score']:.0f}/10 ({self.suspicions[p]['reason']})"
+            for p in players if p in self.suspicions
+        ) or "(none yet)"
+        try:
+            data = await asyncio.wait_for(
+                self._ask_json(VOTE_PROMPT.format(
+                    players=", ".join(players),
+                    notes=self.memory.render() or "(nothing yet)",
+                    scores=scores,
+                )),
+                VOTE_TIMEOUT,
+            )
+        except Exception as e:
+            logger.warning(f"Vote call failed ({e!r}), using precomputed scores")
+            data = None
+        
+        if not data:
+            vote = self.precomputed_vote(players)
+            vote["source"] = "precomputed"
+            return vote
+        
+        reasoning = str(data.get("reasoning") or "").strip()
+        return {
+            "target": validate_target(data.get("target"), players),
+            "reasoning": reasoning or "I have made my decision.",
+            "source": "llm",
+        }
+
+
+def prewarm(proc: JobProcess):
+    """Set up per-process state before any job arrives"""
+    # Plugin clients stay unbuilt until a job leases them; the phrase cache
+    # only needs the voice they will use to find what is already on disk
+    try:
+        phrases = PhraseCache(tts_voice(), os.getenv("PHRASE_CACHE_DIR", DEFAULT_CACHE_DIR))
+        phrases.load(JUDGE_PHRASES)
+        missing = phrases.missing(JUDGE_PHRASES)
+        if missing:
+            logger.info(f"{len(missing)} phrase(s) not rendered yet; synthesizing on first use")
+        proc.userdata["phrases"] = phrases
+    except Exception as e:
+        logger.warning(f"Phrase cache not prewarmed: {e!r}")
+    logger.info(f"Judge worker process ready in {time.monotonic() - STARTED_AT:.2f}s")
+
+
+async def lease_plugins(ctx: JobContext) -> Dict[str, object]:
+    """Take STT/LLM/TTS slots for this session, returned on job shutdown"""
+    pool = get_plugin_pool()
+    leases = []
+    try:
+        for kind in ("stt", "llm", "tts"):
+            leases.append((kind, await pool.acquire(kind)))
+    except Exception:
+        for kind, client in leases:
+            pool.release(kind, client)
+        raise
+
+    async def release_plugins():
+        for kind, client in leases:
+            pool.release(kind, client)
+        logger.info(f"Plugin pool: {pool.stats()}")
+
+    ctx.add_shutdown_callback(release_plugins)
+    return dict(leases)
+
+
+class SessionReplies(ResponseBackend):
+    """The AgentSession answers turns itself; this only labels their timing"""
+
+    stage = "session"
+
+    async def answer(self, core: JudgeCore, speaker: str, transcript: str, deadline: Optional[Deadline] = None) -> str:
+        # SessionJudge.generate_reply hands the turn to the session instead
+        return ""
+
+
+class SessionJudge(JudgeCore):
+    """Shared turn handling with audio, replies and speech left to the AgentSession"""
+
+    def __init__(self, room: rtc.Room, session: AgentSession, room_io: RoomIO, agent: JudgeAgent):
+        # Speculation is the session's preemptive generation
+        super().__init__(lambda: room, backend=SessionReplies(), memory=agent.memory, speculate=False)
+        self.session = session
+        self.room_io = room_io
+        self.agent = agent
+        self._listening_to: Optional[str] = None
+        self._transcript: Optional[asyncio.Future] = None
+        self._reply_finished = asyncio.Event()
+        # Flush/timeout for each commit, learned from this room's turns
+        self.commits = create_commit_tuner()
+        self.preemption = SessionSpeculation()
+        session.on("metrics_collected", self.preemption.on_metrics)
+        session.on("agent_state_changed", self._on_agent_state_changed)
+        session.on("user_input_transcribed", lambda ev: self.commits.on_transcript(ev.is_final, ev.transcript))
+        session.on("user_state_changed", lambda ev: self.commits.on_user_state(ev.new_state))
+        room.on("participant_disconnected", lambda p: self.leave(p.identity))
+
+    def _on_agent_state_changed(self, ev):
+        if ev.new_state == "listening" and ev.old_state in ("thinking", "speaking"):
+            self._reply_finished.set()
+
+    @property
+    def listening_to(self) -> Optional[str]:
+        return self._listening_to
+
+    async def listen(self, identity: str, continuing: bool):
+        # Interrupt any current speech; this also drops a preemptive draft
+        self.session.interrupt()
+        if not continuing:
+            # Same player again before the reply finished keeps what they
+            # already said, so both parts are answered together
+            self.session.clear_user_turn()
+            self.commits.begin_turn()
+
+        self.agent.current_speaker = identity
+        self._listening_to = identity
+        self.room_io.set_participant(identity)
+        self.session.input.set_audio_enabled(True)
+        logger.info(f"Now listening to: {identity}")
+
+    async def stop_listening(self, identity: str) -> str:
+        self._listening_to = None
+        self.session.input.set_audio_enabled(False)
+        self._reply_finished.clear()
+        self.preemption.released()
+        # Commit the user turn; the session answers it. The transcript is
+        # awaited in generate_reply so end_turn returns right away
+        plan = self.commits.plan()
+        self._transcript = self.session.commit_user_turn(
+            transcript_timeout=plan.timeout,
+            stt_flush_duration=plan.flush,
+        )
+        self._transcript.add_done_callback(
+            lambda f: self.commits.committed("" if f.cancelled() or f.exception() else f.result())
+        )
+        return ""
+
+    async def cancel_listening(self, identity: str):
+        self._listening_to = None
+        self.session.input.set_audio_enabled(False)
+        self.session.clear_user_turn()
+        # clear_user_turn leaves a preemptive draft running; interrupt drops it
+        self.session.interrupt()
+
+    async def generate_reply(self, speaker: str, transcript: str, deadline: Deadline) -> Optional[str]:
+        try:
+            said = await self._transcript
+        except Exception:
+            said = ""
+        # Nothing to answer: hand the floor on right away
+        if said:
+            await asyncio.wait_for(self._reply_finished.wait(), self.turns.response_timeout)
+        return None
+
+    def remember(self, speaker: str, transcript: str, answer: Optional[str]):
+        pass  # JudgeAgent records turns as the session completes them
+
+    def metrics(self) -> Dict[str, object]:
+        return {**super().metrics(), "speculation": self.preemption.stats(), "commits": self.commits.stats()}
+
+    async def _cancel_reply(self):
+        if self._reply_task and not self._reply_task.done():
+            self.session.interrupt()
+        await super()._cancel_reply()
+
+
+def record_sdk_metrics(ev):
+    """Feed the session's per-stage timings into judge_stage_seconds"""
+    m = ev.metrics
+    if m.type == "eou_metrics":
+        STAGE_SECONDS.observe(m.transcription_delay, "stt")
+        STAGE_SECONDS.observe(m.end_of_utterance_delay, "end_of_turn")
+    elif m.type == "llm_metrics" and not m.cancelled:
+        STAGE_SECONDS.observe(m.ttft, "llm_first_token")
+        STAGE_SECONDS.observe(m.duration, "llm")
+    elif m.type == "tts_metrics" and not m.cancelled:
+        STAGE_SECONDS.observe(m.ttfb, "tts_first_byte")
 
 
 async def entrypoint(ctx: JobContext):
     """Main entrypoint for the agent"""
     logger.info(f"Agent joining room: {ctx.room.name}")
     
-    session = AgentSession(turn_detection="manual")
+    session = AgentSession(turn_detection="manual", preemptive_generation=SPECULATE)
     room_io = RoomIO(session, room=ctx.room)
     await room_io.start()
+    # Connect before the session would (it subscribes to everything); the
+    # judge's AudioSubscriptions subscribes to the floor holder and warm set
+    await ctx.connect(auto_subscribe=AutoSubscribe.SUBSCRIBE_NONE)
+    # Jobs run one per process, so there is no /metrics server here; the
+    # SDK timings land in the same histograms the room agents use
+    session.on("metrics_collected", record_sdk_metrics)
+    session.on("error", lambda ev: ERRORS.inc(type(ev.source).__name__.lower()))
 
-    agent = JudgeAgent()
+    plugins = await lease_plugins(ctx)
+    agent = JudgeAgent(stt=plugins["stt"], llm=plugins["llm"], tts=plugins["tts"])
     await session.start(agent=agent)
 
     # Disable input audio at the start - only enable during push-to-talk
     session.input.set_audio_enabled(False)
 
+    # Filled in prewarm; without it phrases are loaded on first use
+    tts_plugin = get_plugin_pool().plugin("tts")
+    phrases: Optional[PhraseCache] = ctx.proc.userdata.get("phrases")
+    if phrases is None:
+        phrases = PhraseCache(tts_voice(tts_plugin), os.getenv("PHRASE_CACHE_DIR", DEFAULT_CACHE_DIR))
+        ctx.proc.userdata["phrases"] = phrases
+    # The pool may have built (or rebuilt) a different plugin than prewarm assumed
+    phrases.voice = tts_voice(tts_plugin)
+    phrases.tts = plugins["tts"]
+
+    async def speak(text: str):
+        """Fixed lines come from the phrase cache, everything else is live TTS"""
+        if text in JUDGE_PHRASES:
+            await phrases.say(session, text)
+        else:
+            session.say(text)
+
     # Announce joining
-    await agent.say("The Judge has entered. State your case when ready.")
+    await speak(WELCOME_LINE)
 
-    @ctx.room.local_participant.register_rpc_method("start_turn")
-    async def start_turn(data: rtc.RpcInvocationData):
-        """Player pressed push-to-talk button"""
-        logger.info(f"Start turn from: {data.caller_identity}")
-        
-        # Interrupt any current speech
-        session.interrupt()
-        session.clear_user_turn()
+    # Turns run on the shared judge core; the session does the listening,
+    # thinking and speaking
+    judge = SessionJudge(ctx.room, session, room_io, agent)
+    judge.register_rpc_methods(ctx.room.local_participant)
+    ctx.add_shutdown_callback(judge.close)
 
-        # Listen to the caller
-        room_io.set_participant(data.caller_identity)
-        session.input.set_audio_enabled(True)
-        
-        logger.info(f"Now listening to: {data.caller_identity}")
+    async def log_judge_metrics():
+        logger.info(f"Judge metrics: {judge.metrics()}")
 
-    @ctx.room.local_participant.register_rpc_method("end_turn")
-    async def end_turn(data: rtc.RpcInvocationData):
-        """Player released push-to-talk button"""
-        logger.info(f"End turn from: {data.caller_identity}")
-        
-        session.input.set_audio_enabled(False)
-        
-        # Commit the user turn and generate response
-        session.commit_user_turn(
-            # Timeout for final transcript
-            transcript_timeout=10.0,
-            # Silence duration to flush STT
-            stt_flush_duration=2.0,
-        )
+    ctx.add_shutdown_callback(log_judge_metrics)
 
-    @ctx.room.local_participant.register_rpc_method("cancel_turn")
-    async def cancel_turn(data: rtc.RpcInvocationData):
-        """Player cancelled their turn"""
-        logger.info(f"Cancel turn from: {data.caller_identity}")
-        
-        session.input.set_audio_enabled(False)
-        session.clear_user_turn()
-    
     @ctx.room.local_participant.register_rpc_method("request_vote")
     async def request_vote(data: rtc.RpcInvocationData):
         """Request the judge to make a voting decision"""
@@ -143,19 +564,24 @@ async def entrypoint(ctx: JobContext):
         players = [p.identity for p in ctx.room.remote_participants.values() 
                   if not p.identity.startswith('ptt-agent')]
         
-        if not players:
-            await agent.say("No players to vote for. Abstaining.")
-            return
+        if players:
+            vote = await agent.decide_vote(players)
+        else:
+            vote = {"target": ABSTAIN, "reasoning": NO_PLAYERS_LINE, "source": "none"}
         
-        # Ask the LLM to make a decision
-        vote_prompt = f"""Based on the arguments you've heard, you must now vote to eliminate one player or abstain.
-
-Available players: {', '.join(players)}
-
-Who do you vote to eliminate? Respond with just the player name, or say 'abstain' if you cannot decide. Then briefly explain your reasoning in 1-2 sentences."""
+        logger.info(f"Judge votes: {vote['target']} ({vote['source']})")
+        packet = {
+            "type": "judge_vote",
+            "round": agent.round_number,
+            "target": vote["target"],
+            "reasoning": vote["reasoning"],
+        }
+        judge.outbound.send(packet)
+        agent.round_number += 1
         
-        # This would need integration with the game logic to actually cast the vote
-        await agent.say(vote_prompt)
+        # Speak only the short reasoning, not the prompt
+        await speak(vote["reasoning"])
+        return json.dumps(packet)
 
     # Track participants
     @ctx.room.on("participant_connected")
@@ -188,6 +614,7 @@ if __name__ == "__main__":
     cli.run_app(
         WorkerOptions(
             entrypoint_fnc=entrypoint, 
+            prewarm_fnc=prewarm,
             request_fnc=handle_request
         )
     )
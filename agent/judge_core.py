@@ -0,0 +1,633 @@
+"""
+Shared judge runtime
+The push-to-talk turn handling, reply generation and data-channel output
+that multi_agent.py, simple_judge.py and judge_agent.py all build on, so a
+hot-path change lands once:
+
+- JudgeCore: start_turn / end_turn / cancel_turn on top of the per-room
+  TurnScheduler, with speculation, turn timing and the outbound publisher
+- ResponseBackend: where replies come from - /api/host over HTTP
+  (HostBackend) or an in-process LLM plugin (LLMBackend), each routed
+  across its providers with hedging (routing.py)
+- connect_room: cached token plus a connection with no audio subscribed;
+  AudioSubscriptions follows the turn queue from there
+
+Replies run under a deadline taken from the end_turn RPC and the shared
+admission limits; shed or failed turns get a cached or canned line.
+
+Entry points subclass JudgeCore and override the listen / reply hooks when
+audio and speech are handled elsewhere (judge_agent's AgentSession).
+"""
+
+import os
+import abc
+import json
+import asyncio
+import logging
+from typing import Callable, Dict, Optional, Sequence
+
+from livekit import rtc
+
+from admission import Deadline, Overloaded, get_admission, reply_deadline
+from http_client import HostAPIError, get_host_client
+from memory import RoomMemory
+from metrics import ERRORS, TURNS, TurnSpan
+from outbound import create_publisher
+from response_cache import get_response_cache
+from routing import create_router, provider_list
+from speculation import Speculator
+from stt import SpeakerTranscriber
+from subscriptions import AudioSubscriptions
+from tokens import get_token_cache
+from turns import create_turn_scheduler, speaker_priority
+
+logger = logging.getLogger("judge-core")
+logger.setLevel(logging.INFO)
+
+
+def _api_base() -> str:
+    return os.getenv("NEXT_PUBLIC_API_URL", "http://localhost:3000")
+
+
+def _stream_responses() -> bool:
+    """Stream replies to players as judge_response_delta packets"""
+    return os.getenv("JUDGE_STREAM_RESPONSES", "1") == "1"
+
+
+def _speculate() -> bool:
+    """Draft replies from partial transcripts while push-to-talk is held"""
+    return os.getenv("JUDGE_SPECULATE", "1") == "1"
+
+JUDGE_INSTRUCTIONS = """You are the AI Judge in a social deduction game similar to Mafia/Werewolf.
+Listen to each player's case, be fair but skeptical, and look for inconsistencies.
+Respond in character, dramatic but fair, in under 3 sentences."""
+
+# Said when the backend is overloaded or failing, instead of making players wait
+FALLBACK_REPLIES = (
+    "The court has heard you. Who speaks next?",
+    "Noted. I will weigh that against what the others say.",
+    "Hmm. Keep your story straight; the court remembers.",
+    "Interesting. Let us hear from someone else.",
+)
+
+
+async def connect_room(room_name: str, room_factory: Callable[[], rtc.Room] = rtc.Room, label: str = "") -> Optional[rtc.Room]:
+    """Join a room as the judge with a cached token, or None on failure"""
+    tokens = get_token_cache()
+    jwt_token = tokens.get(room_name)
+    if not jwt_token:
+        logger.error("Missing LiveKit credentials")
+        return None
+
+    # Nothing is subscribed up front; AudioSubscriptions follows the turn queue
+    room = room_factory()
+    try:
+        logger.info(f"{label}Connecting to {room_name}...")
+        await room.connect(
+            tokens.credentials.url,
+            jwt_token,
+            options=rtc.RoomOptions(auto_subscribe=False),
+        )
+    except Exception as e:
+        logger.error(f"{label}Connection failed: {e}")
+        ERRORS.inc("connect")
+        return None
+    logger.info(f"{label}✅ Connected as AI Judge!")
+    return room
+
+
+class ResponseBackend(abc.ABC):
+    """Produces the judge's reply to a finished turn"""
+
+    # judge_stage_seconds label for the time spent here
+    stage = "reply"
+
+    @abc.abstractmethod
+    async def answer(self, core: "JudgeCore", speaker: str, transcript: str, deadline: Optional[Deadline] = None) -> str:
+        """The reply text ("" when there is nothing to say)"""
+
+    def cached(self, core: "JudgeCore", speaker: str, transcript: str) -> Optional[str]:
+        """An answer available without calling out, for shed turns"""
+        return None
+
+    def stats(self) -> Dict[str, object]:
+        return {}
+
+    async def draft(self, core: "JudgeCore", speaker: str, partial: str) -> Optional[str]:
+        """Speculative answer for a partial transcript; never streamed"""
+        return None
+
+
+class HostBackend(ResponseBackend):
+    """Replies from the Next.js /api/host endpoint"""
+
+    stage = "host_api"
+
+    def __init__(self, api_base: Optional[str] = None, stream: Optional[bool] = None, providers: Optional[Sequence[str]] = None):
+        # Read when built, so entry points can load their .env first
+        self.api_base = api_base or _api_base()
+        self.stream = _stream_responses() if stream is None else stream
+        # /api/host providers to route between (JUDGE_HOST_PROVIDERS)
+        self.router = create_router(providers or provider_list("JUDGE_HOST_PROVIDERS", "baseten,janitorai"), label="host: ")
+
+    def build_payload(self, core: "JudgeCore", speaker: str, transcript: str) -> dict:
+        """Build the /api/host request for a player's statement"""
+        if transcript:
+            question = f'Player {speaker} says to you, the AI Judge: "{transcript}"'
+        else:
+            question = f"Player {speaker} has made their case to you, the AI Judge."
+
+        # Earlier turns go in as bounded memory so the prompt stays flat
+        return {
+            "question": question,
+            "gameContext": core.memory.build_context({
+                "phase": {"kind": "Discussion"},
+                "round": 1,
+                "alivePlayers": [],
+            }),
+        }
+
+    async def answer(self, core: "JudgeCore", speaker: str, transcript: str, deadline: Optional[Deadline] = None) -> str:
+        payload = self.build_payload(core, speaker, transcript)
+        # Identical prompts share one upstream call through the cache; a
+        # streamed call fans its deltas out to every room waiting on it
+        return await get_response_cache().get_or_fetch(
+            payload,
+            lambda emit: self.fetch(payload, deadline, emit),
+            on_delta=core.on_delta if self.stream else None,
+        )
+
+    def cached(self, core: "JudgeCore", speaker: str, transcript: str) -> Optional[str]:
+        return get_response_cache().peek(self.build_payload(core, speaker, transcript))
+
+    async def draft(self, core: "JudgeCore", speaker: str, partial: str) -> Optional[str]:
+        payload = self.build_payload(core, speaker, partial)
+        # Drafts are optional; never spend a hedge on one
+        data = await self.router.call(lambda provider: self._ask(payload, provider), hedge=False)
+        return data.get("answer")
+
+    def stats(self) -> Dict[str, object]:
+        return {"routing": self.router.stats()}
+
+    async def _ask(self, payload: dict, provider: str, timeout: Optional[float] = None) -> dict:
+        return await get_host_client(self.api_base).ask_host({**payload, "provider": provider}, timeout=timeout)
+
+    async def _open_stream(self, payload: dict, provider: str, timeout: Optional[float]):
+        """Start a streamed answer; ready once its first event is in"""
+        events = get_host_client(self.api_base).stream_host({**payload, "provider": provider}, timeout=timeout)
+        try:
+            first = await events.__anext__()
+        except StopAsyncIteration:
+            return None, events
+        except BaseException:
+            await events.aclose()
+            raise
+        return first, events
+
+    async def fetch(self, payload: dict, deadline: Optional[Deadline] = None, emit: Optional[Callable[[str], None]] = None) -> str:
+        """Ask /api/host, handing streamed deltas to emit when enabled"""
+        # The upstream timeout is whatever is left of the turn's budget
+        timeout = deadline.remaining() if deadline else None
+        if not self.stream:
+            data = await self.router.call(lambda provider: self._ask(payload, provider, timeout))
+            return data.get("answer") or ""
+
+        # Providers race to the first event; only the winner is streamed out
+        first, events = await self.router.call(
+            lambda provider: self._open_stream(payload, provider, timeout),
+            discard=lambda opened: asyncio.create_task(opened[1].aclose()),
+        )
+        parts = []
+        answer = None
+        try:
+            event = first
+            while event is not None:
+                if event.get("delta"):
+                    parts.append(event["delta"])
+                    if emit:
+                        emit(event["delta"])
+                elif "answer" in event:
+                    answer = event["answer"]
+                event = await events.__anext__()
+        except StopAsyncIteration:
+            pass
+        finally:
+            await events.aclose()
+        return answer or "".join(parts).strip()
+
+
+class LLMBackend(ResponseBackend):
+    """Replies from in-process livekit-agents LLM plugins, one per model"""
+
+    stage = "llm"
+
+    def __init__(self, llms: Dict[str, object], instructions: str = JUDGE_INSTRUCTIONS, stream: Optional[bool] = None):
+        self.llms = llms
+        self.instructions = instructions
+        self.stream = _stream_responses() if stream is None else stream
+        self.router = create_router(list(llms), label="llm: ")
+
+    def _chat_ctx(self, core: "JudgeCore", speaker: str, transcript: str):
+        from livekit.agents.llm import ChatContext
+
+        chat_ctx = ChatContext.empty()
+        notes = core.memory.render()
+        system = f"{self.instructions}\n\nWhat has been said so far:\n{notes}" if notes else self.instructions
+        chat_ctx.add_message(role="system", content=system)
+        chat_ctx.add_message(role="user", content=f"{speaker}: {transcript or '(makes their case)'}")
+        return chat_ctx
+
+    @staticmethod
+    async def _next_delta(llm_stream) -> Optional[str]:
+        async for chunk in llm_stream:
+            delta = chunk.delta.content if chunk.delta else None
+            if delta:
+                return delta
+        return None
+
+    async def _open(self, model: str, chat_ctx):
+        """Start a completion; ready once its first token is in"""
+        llm_stream = self.llms[model].chat(chat_ctx=chat_ctx)
+        try:
+            return await self._next_delta(llm_stream), llm_stream
+        except BaseException:
+            await llm_stream.aclose()
+            raise
+
+    async def _complete(self, core: "JudgeCore", chat_ctx, stream: bool, hedge: Optional[bool] = None) -> str:
+        # Models race to the first token; only the winner is streamed out
+        delta, llm_stream = await self.router.call(
+            lambda model: self._open(model, chat_ctx),
+            hedge=hedge,
+            discard=lambda opened: asyncio.create_task(opened[1].aclose()),
+        )
+        parts = []
+        try:
+            while delta:
+                parts.append(delta)
+                if stream:
+                    await core.on_delta(delta, seq=len(parts))
+                delta = await self._next_delta(llm_stream)
+        finally:
+            await llm_stream.aclose()
+        return "".join(parts).strip()
+
+    async def answer(self, core: "JudgeCore", speaker: str, transcript: str, deadline: Optional[Deadline] = None) -> str:
+        return await self._complete(core, self._chat_ctx(core, speaker, transcript), self.stream)
+
+    async def draft(self, core: "JudgeCore", speaker: str, partial: str) -> Optional[str]:
+        return await self._complete(core, self._chat_ctx(core, speaker, partial), False, hedge=False)
+
+    def stats(self) -> Dict[str, object]:
+        return {"routing": self.router.stats()}
+
+
+_backend: Optional[ResponseBackend] = None
+
+
+def get_response_backend() -> ResponseBackend:
+    """Process-wide backend from JUDGE_BACKEND (host or llm)
+
+    host routes between JUDGE_HOST_PROVIDERS; llm between JUDGE_LLM_MODELS.
+    """
+    global _backend
+    if _backend is None:
+        if os.getenv("JUDGE_BACKEND", "host") == "llm":
+            try:
+                from livekit.plugins import openai
+                models = provider_list("JUDGE_LLM_MODELS", os.getenv("JUDGE_LLM_MODEL", "gpt-4o-mini"))
+                _backend = LLMBackend({model: openai.LLM(model=model) for model in models})
+            except ImportError:
+                logger.warning("livekit-plugins-openai not installed; using /api/host")
+        if _backend is None:
+            _backend = HostBackend()
+        logger.info(f"Response backend: {type(_backend).__name__}")
+    return _backend
+
+
+class JudgeCore:
+    """Turn handling for one room, shared by every judge entry point"""
+
+    def __init__(
+        self,
+        get_room: Callable[[], Optional[rtc.Room]],
+        backend: Optional[ResponseBackend] = None,
+        transcriber: Optional[SpeakerTranscriber] = None,
+        memory: Optional[RoomMemory] = None,
+        speculate: Optional[bool] = None,
+        empty_reply: str = "I hear you. Continue.",
+        fallback_replies: Sequence[str] = FALLBACK_REPLIES,
+        label: str = "",
+    ):
+        self.get_room = get_room
+        self.backend = backend or get_response_backend()
+        self.transcriber = transcriber
+        self.memory = memory or RoomMemory(token_budget=int(os.getenv("MEMORY_TOKEN_BUDGET", "400")))
+        if speculate is None:
+            speculate = _speculate()
+        self.speculate = speculate and transcriber is not None and transcriber.backend is not None
+        self.empty_reply = empty_reply
+        self.fallback_replies = tuple(fallback_replies)
+        self._fallback_index = 0
+        self.label = label
+        self.current_speaker = None
+        # Backend concurrency is shared by every room in the process
+        self.admission = get_admission()
+
+        # Batched, enveloped data packets; follows the room across reconnects
+        self.outbound = create_publisher(
+            lambda: self.get_room().local_participant if self.get_room() else None,
+            label=label,
+        )
+        self.speculator = Speculator(
+            self.draft_answer,
+            match_threshold=float(os.getenv("SPECULATION_MATCH", "0.85")),
+        )
+
+        # One speaker at a time; other presses queue instead of cutting in
+        self.turns = create_turn_scheduler(on_grant=self._on_turn_granted, on_change=self._on_turns_changed)
+        self._reply_task: Optional[asyncio.Task] = None
+        self._carried: Dict[str, str] = {}  # transcript of a turn being coalesced
+        self._queue_task: Optional[asyncio.Task] = None
+        self._queue_dirty = False
+        self._span: Optional[TurnSpan] = None  # timing for the turn holding the floor
+        # Only the floor holder and the next few in line are subscribed
+        self.audio = AudioSubscriptions(
+            get_room,
+            warm_size=int(os.getenv("JUDGE_WARM_SPEAKERS", "1")),
+            label=label,
+            sample_interval=float(os.getenv("JUDGE_AUDIO_SAMPLE_INTERVAL", "10")),
+        )
+
+    def register_rpc_methods(self, local_participant: rtc.LocalParticipant):
+        local_participant.register_rpc_method("start_turn", self.handle_start_turn)
+        local_participant.register_rpc_method("end_turn", self.handle_end_turn)
+        local_participant.register_rpc_method("cancel_turn", self.handle_cancel_turn)
+
+    # Listening and replying; override when audio or speech live elsewhere
+
+    @property
+    def listening_to(self) -> Optional[str]:
+        return self.transcriber.speaker if self.transcriber else None
+
+    async def listen(self, identity: str, continuing: bool):
+        """Start capturing the floor holder's speech"""
+        if self.transcriber:
+            await self.transcriber.start(self.get_room(), identity)
+
+    async def stop_listening(self, identity: str) -> str:
+        """Stop capturing and return the final transcript"""
+        return await self.transcriber.stop() if self.transcriber else ""
+
+    async def cancel_listening(self, identity: str):
+        if self.transcriber:
+            await self.transcriber.cancel()
+
+    async def generate_reply(self, speaker: str, transcript: str, deadline: Deadline) -> Optional[str]:
+        """Reply text to deliver, or None if it was already delivered
+
+        Raises Overloaded when shed and TimeoutError past the deadline.
+        """
+        async with self.admission.admit(self, deadline):
+            return await asyncio.wait_for(
+                self.backend.answer(self, speaker, transcript, deadline), deadline.remaining()
+            )
+
+    def fallback_reply(self, speaker: str, transcript: str) -> Optional[str]:
+        """Cheap line for a shed or failed turn: a cached answer, else a canned one"""
+        try:
+            cached = self.backend.cached(self, speaker, transcript)
+        except Exception:
+            cached = None
+        if cached:
+            return cached
+        if not self.fallback_replies:
+            return None
+        line = self.fallback_replies[self._fallback_index % len(self.fallback_replies)]
+        self._fallback_index += 1
+        return line
+
+    async def deliver_reply(self, answer: str):
+        await self.broadcast_message(answer)
+
+    def remember(self, speaker: str, transcript: str, answer: Optional[str]):
+        self.memory.add_turn(speaker, transcript)
+        if answer:
+            self.memory.add_turn("AI Judge", answer)
+
+    async def draft_answer(self, partial: str) -> Optional[str]:
+        # Drafts are optional; they only run on a slot that is free right now
+        try:
+            async with self.admission.try_admit(self):
+                return await self.backend.draft(self, self.current_speaker, partial)
+        except Overloaded:
+            return None
+
+    # RPC handlers
+
+    async def handle_start_turn(self, data: rtc.RpcInvocationData):
+        """Player pressed push-to-talk"""
+        identity = data.caller_identity
+        logger.info(f"{self.label}Start turn: {identity}")
+
+        room = self.get_room()
+        participant = room.remote_participants.get(identity) if room else None
+        decision = self.turns.request(identity, speaker_priority(participant, data.payload))
+        if not decision.granted:
+            logger.info(f"{self.label}{identity} queued at position {decision.position}")
+            return json.dumps(decision.to_dict())
+
+        if decision.preempted:
+            await self._drop_turn(decision.preempted)
+        if decision.coalesced:
+            # Pressed again before the judge answered: one turn, one reply
+            logger.info(f"{self.label}Continuing {identity}'s turn")
+            await self._cancel_reply()
+        elif self.listening_to == identity:
+            return json.dumps(decision.to_dict())
+        else:
+            self._span = TurnSpan()
+
+        self.current_speaker = identity
+        await self.listen(identity, continuing=decision.coalesced)
+        if self.speculate:
+            self.speculator.start(lambda: self.transcriber.partial)
+        return json.dumps(decision.to_dict())
+
+    async def handle_end_turn(self, data: rtc.RpcInvocationData):
+        """Player released push-to-talk; the reply runs after this returns"""
+        identity = data.caller_identity
+        logger.info(f"{self.label}End turn: {identity}")
+        # The reply's budget starts now
+        deadline = reply_deadline()
+        if not self.turns.finish(identity):
+            logger.info(f"{self.label}{identity} doesn't hold the floor, ignoring")
+            return ""
+
+        span = self._span or TurnSpan()
+        span.mark("listen")
+        transcript = await self.stop_listening(identity)
+        span.mark("stt")
+        if transcript:
+            logger.info(f"{self.label}{identity} said: {transcript}")
+        if identity in self._carried:
+            transcript = f"{self._carried[identity]} {transcript}".strip()
+        self._carried[identity] = transcript
+
+        # A coalesced or preempted turn cancels the reply, not this RPC
+        self._reply_task = asyncio.create_task(self._run_reply(identity, transcript, span, deadline))
+        return ""
+
+    async def handle_cancel_turn(self, data: rtc.RpcInvocationData):
+        """Player cancelled"""
+        identity = data.caller_identity
+        logger.info(f"{self.label}Cancel turn: {identity}")
+        self._carried.pop(identity, None)
+        if self.listening_to == identity:
+            self.speculator.cancel()
+            await self.cancel_listening(identity)
+            self.current_speaker = None
+        if self.turns.cancel(identity):
+            TURNS.inc("cancelled")
+        return ""
+
+    def leave(self, identity: str):
+        """A participant disconnected"""
+        self.turns.leave(identity)
+
+    # Replies
+
+    async def _run_reply(self, speaker: str, transcript: str, span: TurnSpan, deadline: Deadline):
+        try:
+            await self._respond(speaker, transcript, span, deadline)
+        finally:
+            self.turns.reply_done(speaker)
+            if not self.turns.is_speaking(speaker) and self.current_speaker == speaker:
+                self.current_speaker = None
+
+    async def _respond(self, speaker: str, transcript: str, span: TurnSpan, deadline: Deadline):
+        """Answer one finished turn"""
+        outcome = "answered"
+        try:
+            # A draft made while the button was held is used if the final
+            # transcript still matches it
+            answer = None
+            if self.speculate:
+                try:
+                    answer = await asyncio.wait_for(self.speculator.resolve(transcript), deadline.remaining())
+                except asyncio.TimeoutError:
+                    logger.warning(f"{self.label}Speculative draft missed the deadline")
+            if answer:
+                logger.info(f"{self.label}Using speculative reply")
+                outcome = "speculative"
+            else:
+                answer = await self.generate_reply(speaker, transcript, deadline)
+                span.mark(self.backend.stage)
+                if answer is None:
+                    # Spoken by the session itself, or nothing to say
+                    self._carried.pop(speaker, None)
+                    span.finish(outcome)
+                    return
+            answer = answer or self.empty_reply
+            logger.info(f"{self.label}Judge says: {answer[:50]}...")
+        except Overloaded as e:
+            logger.warning(f"{self.label}Reply shed: {e.reason}")
+            answer, outcome = self.fallback_reply(speaker, transcript), "shed"
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.label}Reply missed its deadline")
+            ERRORS.inc("deadline")
+            answer, outcome = self.fallback_reply(speaker, transcript), "shed"
+        except HostAPIError as e:
+            logger.error(f"{self.label}API error: {e.status}")
+            ERRORS.inc("host_api")
+            answer, outcome = self.fallback_reply(speaker, transcript), "fallback"
+        except Exception as e:
+            logger.error(f"{self.label}Error: {e!r}")
+            ERRORS.inc("reply")
+            answer, outcome = self.fallback_reply(speaker, transcript), "fallback"
+
+        self._carried.pop(speaker, None)
+        self.remember(speaker, transcript, answer if outcome in ("answered", "speculative") else None)
+        if answer:
+            await self.deliver_reply(answer)
+            span.mark("publish")
+        span.finish(outcome)
+
+    async def _cancel_reply(self):
+        task = self._reply_task
+        if task and not task.done():
+            task.cancel()
+            await asyncio.wait({task})
+
+    async def _drop_turn(self, identity: str):
+        """Throw away a preempted player's turn"""
+        logger.info(f"{self.label}Dropping {identity}'s turn")
+        if self.listening_to == identity:
+            self.speculator.cancel()
+            await self.cancel_listening(identity)
+        else:
+            await self._cancel_reply()
+        self._carried.pop(identity, None)
+        TURNS.inc("preempted")
+
+    # Turn queue updates
+
+    def _on_turn_granted(self, identity: str):
+        asyncio.create_task(self.notify_turn_granted(identity))
+
+    def _on_turns_changed(self):
+        self.audio.update(self.turns.holder, self.turns.upcoming(self.audio.warm_size))
+        # Publish the latest snapshot once, however many changes piled up
+        self._queue_dirty = True
+        if self._queue_task is None or self._queue_task.done():
+            self._queue_task = asyncio.create_task(self._publish_turn_queue())
+
+    async def _publish_turn_queue(self):
+        while self._queue_dirty:
+            self._queue_dirty = False
+            await self.broadcast_turn_queue()
+
+    # Outbound packets
+
+    async def on_delta(self, delta: str, seq: int):
+        """A streamed piece of the reply is ready"""
+        if seq == 1 and self._span:
+            self._span.peek("first_delta")
+        await self.broadcast_delta(delta, seq)
+
+    async def broadcast_message(self, message: str):
+        """Send message to all participants"""
+        self.outbound.send({"type": "judge_response", "message": message})
+
+    async def broadcast_delta(self, delta: str, seq: int):
+        """Send one streamed piece of the judge's answer to all participants"""
+        # Reliable keeps deltas in order
+        self.outbound.send({"type": "judge_response_delta", "message": delta, "seq": seq})
+
+    async def broadcast_turn_queue(self):
+        """Tell everyone who holds the floor and who is waiting"""
+        self.outbound.send({"type": "turn_queue", **self.turns.snapshot()})
+
+    async def notify_turn_granted(self, identity: str):
+        """Tell a queued player it's their turn to press and speak"""
+        self.outbound.send({"type": "turn_granted", "identity": identity}, destinations=[identity])
+
+    def metrics(self) -> Dict[str, object]:
+        return {
+            "speculation": self.speculator.stats(),
+            "turns": self.turns.stats(),
+            "outbound": self.outbound.stats(),
+            "admission": self.admission.stats(),
+            "backend": self.backend.stats(),
+            "audio": self.audio.stats(),
+        }
+
+    async def close(self):
+        """Stop all turn work and flush queued packets"""
+        self.turns.close()
+        await self._cancel_reply()
+        self.speculator.cancel()
+        if self.listening_to:
+            await self.cancel_listening(self.listening_to)
+        self.audio.clear()
+        await self.outbound.close()
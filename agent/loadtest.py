@@ -0,0 +1,403 @@
+"""
+Load test for the multi-room judge
+Runs AgentManager against a local stand-in for /api/host and fake LiveKit
+rooms, so no LiveKit or Baseten credentials are needed. Virtual players in
+every room press and release push-to-talk through the same start_turn /
+end_turn RPC handlers the real clients call, and the driver ramps the room
+count step by step.
+
+Each step reports throughput, turn latency (release -> judge_response
+packet), time to the first streamed delta and event-loop lag.
+
+Usage:
+    python agent/loadtest.py --rooms 10,50,100 --players 6 --duration 20
+    python agent/loadtest.py --host-latency lognormal:0.8:0.5 --host-errors 0.02
+    python agent/loadtest.py --serve-host 8787   # only run the mock /api/host
+
+The mock /api/host shares the event loop with the agents unless it is run
+separately (--serve-host) and pointed at with --host-url.
+"""
+
+import os
+import json
+import asyncio
+import itertools
+import logging
+import math
+import random
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+from aiohttp import web
+from livekit import rtc
+
+from outbound import Reassembler
+
+logger = logging.getLogger("loadtest")
+logger.setLevel(logging.INFO)
+
+ANSWER_WORDS = (
+    "The judge has heard your case and notes every word of it carefully before "
+    "the village decides who among you is telling the truth tonight"
+).split()
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """Latency sampler from fixed:S, uniform:LO:HI, exp:MEAN or lognormal:MEDIAN:SIGMA"""
+    kind, *args = spec.split(":")
+    values = [float(a) for a in args]
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "exp":
+        return lambda: random.expovariate(1 / values[0])
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class MockHost:
+    """Stand-in for the Next.js /api/host endpoint"""
+
+    def __init__(self, latency: Callable[[], float], error_rate: float = 0.0, deltas: int = 6):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.deltas = deltas
+        self.requests = 0
+        self.errors = 0
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        payload = await request.json()
+        self.requests += 1
+        delay = self.latency()
+
+        if random.random() < self.error_rate:
+            await asyncio.sleep(delay)
+            self.errors += 1
+            return web.json_response({"error": "mock failure"}, status=500)
+
+        # Answers as whichever provider was asked for, like /api/host on success
+        provider = payload.get("provider") or "mock"
+        words = random.sample(ANSWER_WORDS, k=min(len(ANSWER_WORDS), 12))
+        answer = " ".join(words)
+        if not payload.get("stream"):
+            await asyncio.sleep(delay)
+            return web.json_response({"answer": answer, "provider": provider})
+
+        # First token after half the latency, the rest spread over the remainder
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await asyncio.sleep(delay / 2)
+        step = max(1, len(words) // self.deltas)
+        try:
+            for i in range(0, len(words), step):
+                chunk = " ".join(words[i:i + step]) + " "
+                await response.write(f"data: {json.dumps({'delta': chunk})}\n\n".encode("utf-8"))
+                await asyncio.sleep(delay / 2 / self.deltas)
+            await response.write(f"data: {json.dumps({'answer': answer, 'provider': provider})}\n\n".encode("utf-8"))
+            await response.write_eof()
+        except ConnectionResetError:
+            pass  # the judge cancelled this reply (coalesced turn or shutdown)
+        return response
+
+    async def start(self, port: int = 0, host: str = "127.0.0.1") -> str:
+        """Serve on host:port (0 picks a free port); returns the base URL"""
+        app = web.Application()
+        app.router.add_post("/api/host", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+
+class FakePublication:
+    """A microphone track publication; only tracks subscription"""
+
+    kind = rtc.TrackKind.KIND_AUDIO
+    track = None
+
+    def __init__(self, sid: str):
+        self.sid = sid
+        self.subscribed = False
+
+    def set_subscribed(self, subscribed: bool):
+        self.subscribed = subscribed
+
+
+class FakeParticipant:
+    def __init__(self, identity: str, attributes: Optional[Dict[str, str]] = None):
+        self.identity = identity
+        self.attributes = attributes or {}
+        self.track_publications = {f"TR_{identity}": FakePublication(f"TR_{identity}")}
+
+
+class FakeLocalParticipant:
+    """The judge's side of a FakeRoom: RPC registry and publish_data"""
+
+    def __init__(self, room: "FakeRoom"):
+        self.room = room
+        self.identity = "ptt-agent"
+        self.rpc_methods: Dict[str, Callable] = {}
+
+    def register_rpc_method(self, method: str, handler: Optional[Callable] = None):
+        if handler is None:
+            return lambda fn: self.register_rpc_method(method, fn) or fn
+        self.rpc_methods[method] = handler
+
+    async def publish_data(self, payload, reliable: bool = True, destination_identities=None, topic: str = ""):
+        self.room.deliver(bytes(payload), destination_identities or [])
+
+
+class FakeRoom:
+    """In-memory rtc.Room stand-in; no network, no media"""
+
+    _request_ids = itertools.count(1)
+
+    def __init__(self):
+        self.local_participant = FakeLocalParticipant(self)
+        self.remote_participants: Dict[str, FakeParticipant] = {}
+        self._listeners: Dict[str, List[Callable]] = defaultdict(list)
+        self._reassembler = Reassembler()
+        self._reply: Optional[asyncio.Future] = None
+        self._granted: Dict[str, asyncio.Event] = defaultdict(asyncio.Event)
+        self.first_delta_at: Optional[float] = None
+
+    async def connect(self, url: str, token: str, options=None):
+        await asyncio.sleep(0)
+
+    async def disconnect(self):
+        self.remote_participants.clear()
+
+    def on(self, event: str, callback: Optional[Callable] = None):
+        if callback is None:
+            return lambda fn: self.on(event, fn) or fn
+        self._listeners[event].append(callback)
+
+    def emit(self, event: str, *args):
+        for callback in list(self._listeners[event]):
+            callback(*args)
+
+    def add_player(self, identity: str) -> FakeParticipant:
+        participant = FakeParticipant(identity)
+        self.remote_participants[identity] = participant
+        self.emit("participant_connected", participant)
+        return participant
+
+    async def call(self, method: str, identity: str, payload: str = "") -> str:
+        """Invoke one of the judge's RPC handlers as a player would"""
+        data = rtc.RpcInvocationData(str(next(self._request_ids)), identity, payload, 15.0, method)
+        return await self.local_participant.rpc_methods[method](data)
+
+    def expect_reply(self) -> asyncio.Future:
+        self.first_delta_at = None
+        self._reply = asyncio.get_running_loop().create_future()
+        return self._reply
+
+    def granted(self, identity: str) -> asyncio.Event:
+        return self._granted[identity]
+
+    def deliver(self, packet: bytes, destinations: List[str]):
+        for message in self._reassembler.feed(packet, "judge"):
+            kind = message.get("type")
+            if kind == "judge_response" and self._reply and not self._reply.done():
+                self._reply.set_result(time.perf_counter())
+            elif kind == "judge_response_delta" and self.first_delta_at is None:
+                self.first_delta_at = time.perf_counter()
+            elif kind == "turn_granted":
+                self._granted[message["identity"]].set()
+
+
+class StepStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.first_deltas: List[float] = []
+        self.queued = 0
+        self.timeouts = 0
+
+    def summary(self, rooms: int, duration: float, lag: List[float], host: MockHost) -> dict:
+        return {
+            "rooms": rooms,
+            "turns": len(self.latencies),
+            "turns_per_s": round(len(self.latencies) / duration, 2),
+            "p50_ms": round(percentile(self.latencies, 0.5) * 1000, 1),
+            "p99_ms": round(percentile(self.latencies, 0.99) * 1000, 1),
+            "first_delta_p50_ms": round(percentile(self.first_deltas, 0.5) * 1000, 1),
+            "lag_p50_ms": round(percentile(lag, 0.5) * 1000, 2),
+            "lag_p99_ms": round(percentile(lag, 0.99) * 1000, 2),
+            "lag_max_ms": round(max(lag, default=0.0) * 1000, 2),
+            "queued": self.queued,
+            "timeouts": self.timeouts,
+            "host_errors": host.errors if host else None,
+        }
+
+
+async def run_player(room: FakeRoom, identity: str, args, stats: Callable[[], StepStats]):
+    """One virtual player pressing push-to-talk at random intervals"""
+    while True:
+        await asyncio.sleep(random.expovariate(1 / args.think))
+
+        reply = json.loads(await room.call("start_turn", identity) or "{}")
+        if reply.get("status") == "queued":
+            stats().queued += 1
+            granted = room.granted(identity)
+            granted.clear()
+            try:
+                await asyncio.wait_for(granted.wait(), 30)
+            except asyncio.TimeoutError:
+                stats().timeouts += 1
+                await room.call("cancel_turn", identity)
+                continue
+            if json.loads(await room.call("start_turn", identity) or "{}").get("status") == "queued":
+                continue
+
+        await asyncio.sleep(args.hold)
+        reply_at = room.expect_reply()
+        released = time.perf_counter()
+        await room.call("end_turn", identity)
+        try:
+            done = await asyncio.wait_for(reply_at, 30)
+        except asyncio.TimeoutError:
+            stats().timeouts += 1
+            continue
+        stats().latencies.append(done - released)
+        if room.first_delta_at:
+            stats().first_deltas.append(room.first_delta_at - released)
+
+
+async def watch_loop_lag(samples: List[float], interval: float = 0.02):
+    """How late the event loop wakes a sleeping task"""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - started - interval))
+
+
+async def run(args) -> List[dict]:
+    host = None
+    host_url = args.host_url
+    if not host_url:
+        host = MockHost(parse_latency(args.host_latency), args.host_errors)
+        host_url = await host.start()
+
+    # multi_agent reads these at import time
+    os.environ["NEXT_PUBLIC_API_URL"] = host_url
+    os.environ["STT_BACKEND"] = "none"
+    os.environ["SNAPSHOT_PATH"] = ""
+    os.environ.setdefault("LIVEKIT_URL", "ws://loadtest.invalid")
+    os.environ.setdefault("LIVEKIT_API_KEY", "loadtest")
+    os.environ.setdefault("LIVEKIT_API_SECRET", "loadtest-secret-loadtest-secret-0")
+    os.environ.setdefault("SPAWN_RATE", "1000")
+    os.environ.setdefault("SPAWN_BURST", "1000")
+    from multi_agent import AgentManager
+    from http_client import close_host_client
+
+    manager = AgentManager(idle_grace_period=3600, room_factory=FakeRoom)
+    players: List[asyncio.Task] = []
+    lag: List[float] = []
+    lag_task = asyncio.create_task(watch_loop_lag(lag))
+    current = StepStats()
+    results = []
+
+    try:
+        for rooms in args.rooms:
+            codes = [f"LT{i:04d}" for i in range(len(manager.agents), rooms)]
+            await manager.spawn_many(codes)
+            for code in codes:
+                room = manager.agents[code].room
+                for p in range(args.players):
+                    identity = f"{code}-p{p}"
+                    room.add_player(identity)
+                    players.append(asyncio.create_task(run_player(room, identity, args, lambda: current)))
+
+            # Let the new rooms settle before measuring
+            await asyncio.sleep(args.warmup)
+            current = StepStats()
+            lag.clear()
+            started = time.perf_counter()
+            await asyncio.sleep(args.duration)
+            summary = current.summary(len(manager.agents), time.perf_counter() - started, lag, host)
+            # Microphones held open right now, out of every player's
+            audio = [agent.audio.stats() for agent in manager.agents.values()]
+            summary["mics_per_room"] = round(sum(len(a["subscribed"]) for a in audio) / len(audio), 2)
+            summary["warm_hits"] = sum(a["warm_hits"] for a in audio)
+            summary["cold_starts"] = sum(a["cold_starts"] for a in audio)
+            results.append(summary)
+            print(
+                f"rooms={summary['rooms']:<5} turns/s={summary['turns_per_s']:<7} "
+                f"p50={summary['p50_ms']}ms p99={summary['p99_ms']}ms "
+                f"first_delta_p50={summary['first_delta_p50_ms']}ms "
+                f"lag p99/max={summary['lag_p99_ms']}/{summary['lag_max_ms']}ms "
+                f"queued={summary['queued']} timeouts={summary['timeouts']} "
+                f"mics/room={summary['mics_per_room']}/{args.players} warm/cold={summary['warm_hits']}/{summary['cold_starts']}"
+            )
+    finally:
+        for task in players + [lag_task]:
+            task.cancel()
+        await asyncio.gather(*players, lag_task, return_exceptions=True)
+        await manager.shutdown()
+        # Shared fetches outlive the replies that started them; let them land
+        leftovers = asyncio.all_tasks() - {asyncio.current_task()}
+        if leftovers:
+            await asyncio.wait(leftovers, timeout=10)
+        await close_host_client()
+        if host:
+            await host.stop()
+
+    return results
+
+
+async def serve_host(args):
+    host = MockHost(parse_latency(args.host_latency), args.host_errors)
+    url = await host.start(args.serve_host, "0.0.0.0")
+    print(f"Mock /api/host on {url} ({args.host_latency}, {args.host_errors:.0%} errors)")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="SuperMafia judge load test")
+    parser.add_argument("--rooms", default="10,50,100",
+                        help="Comma-separated room counts to ramp through")
+    parser.add_argument("--players", type=int, default=6, help="Virtual players per room")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds measured per step")
+    parser.add_argument("--warmup", type=float, default=3, help="Seconds before measuring each step")
+    parser.add_argument("--think", type=float, default=4.0, help="Mean seconds between a player's presses")
+    parser.add_argument("--hold", type=float, default=1.0, help="Seconds push-to-talk is held")
+    parser.add_argument("--host-latency", default="lognormal:0.6:0.4",
+                        help="fixed:S, uniform:LO:HI, exp:MEAN or lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--host-errors", type=float, default=0.0, help="Fraction of host calls that fail")
+    parser.add_argument("--host-url", help="Use an already running /api/host instead of the mock")
+    parser.add_argument("--serve-host", type=int, metavar="PORT", help="Only run the mock /api/host")
+    parser.add_argument("--json", metavar="PATH", help="Also write the step results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Keep the agents' INFO logs")
+    args = parser.parse_args()
+    args.rooms = [int(n) for n in args.rooms.split(",")]
+
+    logging.basicConfig(level=logging.INFO)
+    if not args.verbose:
+        logging.disable(logging.INFO)
+    try:
+        if args.serve_host:
+            asyncio.run(serve_host(args))
+        else:
+            results = asyncio.run(run(args))
+            if args.json:
+                with open(args.json, "w") as f:
+                    json.dump(results, f, indent=2)
+    except KeyboardInterrupt:
+        pass
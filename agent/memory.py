@@ -0,0 +1,142 @@
+"""
+Bounded per-room conversation memory for the judges
+Each player keeps a small ring buffer of their latest statements. Turns that
+fall out of the buffer are folded into a rolling per-player summary, and the
+context handed to the LLM is cut to a fixed token budget, so prompts stay the
+same size however long a game runs.
+"""
+
+import re
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+def _clip_words(text: str, max_words: int) -> str:
+    words = text.split()
+    if len(words) <= max_words:
+        return " ".join(words)
+    return " ".join(words[:max_words]) + "…"
+
+
+class RoomMemory:
+    """Ring buffers of recent turns plus rolling summaries"""
+
+    def __init__(
+        self,
+        turns_per_player: int = 3,
+        summary_chars: int = 300,
+        token_budget: int = 400,
+        gist_words: int = 16,
+    ):
+        self.turns_per_player = turns_per_player
+        self.summary_chars = summary_chars
+        self.token_budget = token_budget
+        self.gist_words = gist_words
+        self.turn_count = 0
+        self._recent: Dict[str, Deque[Tuple[int, str]]] = {}
+        self._summaries: Dict[str, str] = {}
+
+    @property
+    def players(self) -> List[str]:
+        return list(self._recent.keys())
+
+    def add_turn(self, player: str, text: str):
+        """Record a statement, compacting the oldest one if the buffer is full"""
+        text = text.strip()
+        if not text:
+            return
+
+        self.turn_count += 1
+        recent = self._recent.setdefault(player, deque())
+        if len(recent) >= self.turns_per_player:
+            _, oldest = recent.popleft()
+            self._compact(player, oldest)
+        recent.append((self.turn_count, text))
+
+    def _compact(self, player: str, text: str):
+        """Fold one turn into the player's summary
+
+        Keeps the first sentence as the gist and drops the oldest gists once
+        the summary is over its size, so each turn costs O(1) work.
+        """
+        gist = _clip_words(re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0], self.gist_words)
+        summary = f"{self._summaries[player]} | {gist}" if player in self._summaries else gist
+        while len(summary) > self.summary_chars and " | " in summary:
+            summary = summary.split(" | ", 1)[1]
+        self._summaries[player] = summary[-self.summary_chars:]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable state, for snapshots"""
+        return {
+            "turnCount": self.turn_count,
+            "recent": {player: [list(turn) for turn in recent] for player, recent in self._recent.items()},
+            "summaries": dict(self._summaries),
+        }
+
+    def restore(self, data: Dict[str, Any]):
+        """Replace the current state with one from to_dict()"""
+        self.turn_count = data.get("turnCount", 0)
+        self._recent = {
+            player: deque((turn, text) for turn, text in recent)
+            for player, recent in data.get("recent", {}).items()
+        }
+        self._summaries = dict(data.get("summaries", {}))
+
+    def summary(self, player: str) -> Optional[str]:
+        return self._summaries.get(player)
+
+    def recent_turns(self, player: str) -> List[str]:
+        return [text for _, text in self._recent.get(player, ())]
+
+    def build_context(self, base: Dict[str, Any], token_budget: Optional[int] = None) -> Dict[str, Any]:
+        """Add summaries and recent statements to a gameContext within a token budget
+
+        Up to a third of the budget goes to summaries; the rest is filled
+        with recent statements, newest first.
+        """
+        budget = token_budget if token_budget is not None else self.token_budget
+        context = dict(base)
+
+        summary_budget = budget // 3
+        summaries = {}
+        for player, summary in self._summaries.items():
+            cost = estimate_tokens(player) + estimate_tokens(summary)
+            if cost > summary_budget:
+                continue
+            summary_budget -= cost
+            budget -= cost
+            summaries[player] = summary
+
+        turns = sorted(
+            ((turn, player, text) for player, recent in self._recent.items() for turn, text in recent),
+            reverse=True,
+        )
+        statements = []
+        for _, player, text in turns:
+            cost = estimate_tokens(player) + estimate_tokens(text)
+            if cost > budget:
+                break
+            budget -= cost
+            statements.append({"player": player, "text": text})
+
+        if summaries:
+            context["earlierStatements"] = summaries
+        if statements:
+            # Chronological order reads better in the prompt
+            context["recentStatements"] = list(reversed(statements))
+        return context
+
+    def render(self, token_budget: Optional[int] = None) -> str:
+        """Plain-text version of build_context for chat-style LLM prompts"""
+        context = self.build_context({}, token_budget)
+        lines = []
+        for player, summary in context.get("earlierStatements", {}).items():
+            lines.append(f"Earlier, {player}: {summary}")
+        for statement in context.get("recentStatements", []):
+            lines.append(f"{statement['player']}: {statement['text']}")
+        return "\n".join(lines)
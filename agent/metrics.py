@@ -0,0 +1,200 @@
+"""
+Low-overhead metrics for the judges
+Counters, gauges and fixed-bucket histograms kept in process memory and
+rendered in the Prometheus text format on a local /metrics endpoint.
+Recording is a dict lookup, a bisect and a few additions, so it stays on
+in production.
+
+Each turn is timed with a TurnSpan: marks between start_turn, end_turn,
+the transcript, the /api/host answer and publishing land in the
+judge_stage_seconds histogram labelled by stage.
+"""
+
+import os
+import bisect
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from aiohttp import web
+
+logger = logging.getLogger("metrics")
+logger.setLevel(logging.INFO)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge:
+    """Set directly, or computed at scrape time from a callback"""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (),
+                 callback: Optional[Callable[[], Dict[LabelValues, float]]] = None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = value
+
+    def render(self) -> List[str]:
+        values = self._values
+        if self.callback:
+            try:
+                values = self.callback()
+            except Exception as e:
+                logger.warning(f"Gauge {self.name} callback failed: {e!r}")
+                values = {}
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for labels, value in values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in self._series.items():
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _format_labels(self.labelnames, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "judge_stage_seconds", "Time spent in each stage of a judge turn", ["stage"],
+))
+PUBLISH_SECONDS = REGISTRY.register(Histogram(
+    "judge_publish_seconds", "publish_data call duration",
+))
+TURNS = REGISTRY.register(Counter("judge_turns_total", "Player turns handled", ["outcome"]))
+ERRORS = REGISTRY.register(Counter("judge_errors_total", "Errors by kind", ["kind"]))
+RETRIES = REGISTRY.register(Counter("judge_retries_total", "Retries by kind", ["kind"]))
+
+
+class TurnSpan:
+    """Times one turn; each mark records the time since the previous one"""
+
+    __slots__ = ("started", "_last")
+
+    def __init__(self):
+        self.started = self._last = time.perf_counter()
+
+    def mark(self, stage: str) -> float:
+        now = time.perf_counter()
+        elapsed = now - self._last
+        STAGE_SECONDS.observe(elapsed, stage)
+        self._last = now
+        return elapsed
+
+    def peek(self, stage: str) -> float:
+        """Record time since the last mark without starting a new stage"""
+        elapsed = time.perf_counter() - self._last
+        STAGE_SECONDS.observe(elapsed, stage)
+        return elapsed
+
+    def finish(self, outcome: str = "answered") -> float:
+        total = time.perf_counter() - self.started
+        STAGE_SECONDS.observe(total, "total")
+        TURNS.inc(outcome)
+        return total
+
+
+def gauge(name: str, help: str, callback: Callable[[], Dict[LabelValues, float]], labelnames: Iterable[str] = ()) -> Gauge:
+    """Register a gauge computed at scrape time"""
+    return REGISTRY.register(Gauge(name, help, labelnames, callback))
+
+
+async def start_metrics_server(port: int, host: str = "127.0.0.1") -> web.AppRunner:
+    """Serve REGISTRY on http://host:port/metrics"""
+
+    async def handle(_request: web.Request) -> web.Response:
+        return web.Response(text=REGISTRY.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Metrics on http://{host}:{port}/metrics")
+    return runner
+
+
+def metrics_port(offset: int = 0) -> Optional[int]:
+    """METRICS_PORT (+ offset for supervisor workers), or None when unset"""
+    port = os.getenv("METRICS_PORT")
+    return int(port) + offset if port else None
@@ -6,10 +6,22 @@ Each game gets its own dedicated AI Judge
 import os
 import asyncio
 import logging
+import random
+import time
 from dotenv import load_dotenv
-import requests
-from typing import Dict
-from livekit import rtc, api
+from typing import Callable, Dict, List, Optional, Tuple
+from livekit import rtc
+
+from discovery import RoomDiscovery, is_player, livekit_room_source, room_api_source
+from http_client import close_host_client
+from judge_core import JudgeCore, connect_room
+from metrics import RETRIES, gauge, metrics_port, start_metrics_server
+from ratelimit import TokenBucket
+from reaper import IdleReaper
+from response_cache import get_response_cache
+from snapshots import RoomSnapshotter, create_snapshot_store
+from stt import SpeakerTranscriber, get_stt_backend
+from tokens import get_token_cache
 
 logger = logging.getLogger("multi-agent")
 logger.setLevel(logging.INFO)
@@ -18,127 +30,123 @@ load_dotenv(dotenv_path=".env.local")
 
 API_BASE = os.getenv("NEXT_PUBLIC_API_URL", "http://localhost:3000")
 
-class RoomAgent:
+
+class RoomAgent(JudgeCore):
     """Individual agent for one specific room"""
     
-    def __init__(self, room_code: str):
+    def __init__(self, room_code: str, room_factory: Callable[[], rtc.Room] = rtc.Room):
         self.room_code = room_code
         self.room_name = f"mafia-{room_code}"
         self.room = None
-        self.current_speaker = None
+        self.room_factory = room_factory  # swapped for a fake room by loadtest.py
+        super().__init__(
+            lambda: self.room,
+            transcriber=SpeakerTranscriber(get_stt_backend()),
+            label=f"[{room_code}] ",
+        )
+        
+        # Listeners re-attached to every new rtc.Room after a reconnect
+        self._room_listeners: List[Tuple[str, Callable]] = []
+        self._closing = False
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self.on_lost: Optional[Callable[["RoomAgent"], None]] = None
+        
+        # Reconnect metrics
+        self.reconnects = 0
+        self.reconnect_attempts = 0
+        self.last_reconnect_seconds = 0.0
+        
+        self.add_room_listener("participant_disconnected", lambda p: self.leave(p.identity))
         
     async def connect(self):
         """Connect to the LiveKit room"""
-        url = os.getenv("LIVEKIT_URL") or os.getenv("LIVEKIT_WS_URL")
-        api_key = os.getenv("LIVEKIT_API_KEY")
-        api_secret = os.getenv("LIVEKIT_API_SECRET")
-        
-        if not all([url, api_key, api_secret]):
-            logger.error("Missing LiveKit credentials")
+        if not await self._open():
             return False
         
-        # Generate token
-        token = api.AccessToken(api_key, api_secret)
-        token.with_identity("ptt-agent")
-        token.with_name("AI Judge")
-        token.with_grants(api.VideoGrants(
-            room_join=True,
-            room=self.room_name,
-            can_publish=True,
-            can_subscribe=True,
-            can_publish_data=True,
-        ))
-        token.with_metadata('{"push-to-talk": "1"}')
-        
-        jwt_token = token.to_jwt()
+        # Send welcome message
+        await self.broadcast_message("The AI Judge has joined the room. Press and hold the microphone to speak.")
+        return True
+    
+    async def _open(self) -> bool:
+        """Open a fresh room connection and register handlers on it"""
+        room = await connect_room(self.room_name, self.room_factory, label=self.label)
+        if room is None:
+            return False
         
-        # Connect
-        self.room = rtc.Room()
+        self.room = room
+        self.register_rpc_methods(room.local_participant)
+        for event, callback in self._room_listeners:
+            room.on(event, callback)
+        room.on("disconnected", self._on_disconnected)
         
-        try:
-            logger.info(f"[{self.room_code}] Connecting...")
-            await self.room.connect(url, jwt_token)
-            logger.info(f"[{self.room_code}] ✅ Connected as AI Judge!")
-            
-            # Register RPC methods
-            self.room.local_participant.register_rpc_method("start_turn", self.handle_start_turn)
-            self.room.local_participant.register_rpc_method("end_turn", self.handle_end_turn)
-            self.room.local_participant.register_rpc_method("cancel_turn", self.handle_cancel_turn)
-            
-            # Send welcome message
-            await self.broadcast_message("The AI Judge has joined the room. Press and hold the microphone to speak.")
-            
-            return True
-        except Exception as e:
-            logger.error(f"[{self.room_code}] Connection failed: {e}")
-            return False
+        return True
+    
+    def add_room_listener(self, event: str, callback: Callable):
+        """Subscribe to a room event, surviving reconnects"""
+        self._room_listeners.append((event, callback))
+        if self.room:
+            self.room.on(event, callback)
     
-    async def handle_start_turn(self, data: rtc.RpcInvocationData):
-        """Player started talking"""
-        logger.info(f"[{self.room_code}] Start turn: {data.caller_identity}")
-        self.current_speaker = data.caller_identity
-        return ""
+    def _on_disconnected(self, *_):
+        """LiveKit gave up on the connection - reconnect ourselves"""
+        if self._closing or (self._reconnect_task and not self._reconnect_task.done()):
+            return
+        logger.warning(f"[{self.room_code}] Connection lost, reconnecting...")
+        self._reconnect_task = asyncio.create_task(self._reconnect())
     
-    async def handle_end_turn(self, data: rtc.RpcInvocationData):
-        """Player finished talking - generate response"""
-        logger.info(f"[{self.room_code}] End turn: {data.caller_identity}")
+    async def _reconnect(self, base_delay: float = 0.5, max_delay: float = 30.0):
+        """Retry with jittered exponential backoff, keeping all agent state"""
+        max_attempts = int(os.getenv("RECONNECT_MAX_ATTEMPTS", "10"))
+        started = time.monotonic()
         
-        try:
-            # Call your existing API
-            response = requests.post(
-                f"{API_BASE}/api/host",
-                json={
-                    "question": f"Player {data.caller_identity} has made their case to you, the AI Judge.",
-                    "gameContext": {
-                        "phase": {"kind": "Discussion"},
-                        "round": 1,
-                        "alivePlayers": [],
-                    },
-                    "provider": "baseten"
-                },
-                timeout=30
-            )
+        for attempt in range(max_attempts):
+            delay = min(max_delay, base_delay * 2 ** attempt)
+            await asyncio.sleep(random.uniform(delay / 2, delay))
+            if self._closing:
+                return
             
-            if response.ok:
-                data_json = response.json()
-                answer = data_json.get("answer", "I hear you. Continue.")
-                logger.info(f"[{self.room_code}] Judge says: {answer[:50]}...")
-                await self.broadcast_message(answer)
-            else:
-                logger.error(f"[{self.room_code}] API error: {response.status_code}")
-                await self.broadcast_message("I'm listening carefully...")
-                
-        except Exception as e:
-            logger.error(f"[{self.room_code}] Error: {e}")
-            await self.broadcast_message("Please continue...")
+            self.reconnect_attempts += 1
+            RETRIES.inc("reconnect")
+            if await self._open():
+                self.reconnects += 1
+                self.last_reconnect_seconds = time.monotonic() - started
+                logger.info(
+                    f"[{self.room_code}] ✅ Reconnected after {attempt + 1} attempt(s) "
+                    f"in {self.last_reconnect_seconds:.1f}s"
+                )
+                return
         
-        self.current_speaker = None
-        return ""
+        logger.error(f"[{self.room_code}] ❌ Giving up after {max_attempts} reconnect attempts")
+        if self.on_lost:
+            self.on_lost(self)
     
-    async def handle_cancel_turn(self, data: rtc.RpcInvocationData):
-        """Player cancelled"""
-        logger.info(f"[{self.room_code}] Cancel turn: {data.caller_identity}")
-        self.current_speaker = None
-        return ""
+    @property
+    def state_version(self) -> int:
+        """Changes whenever snapshot() would return something new"""
+        return self.memory.turn_count
     
-    async def broadcast_message(self, message: str):
-        """Send message to all participants"""
-        if not self.room:
-            return
-            
-        try:
-            import json
-            payload = json.dumps({
-                "type": "judge_response",
-                "message": message
-            }).encode("utf-8")
-            
-            await self.room.local_participant.publish_data(payload, reliable=True)
-        except Exception as e:
-            logger.error(f"[{self.room_code}] Broadcast error: {e}")
+    def snapshot(self) -> dict:
+        """State that survives a restart of the process"""
+        return {"memory": self.memory.to_dict()}
+    
+    def restore(self, state: dict):
+        self.memory.restore(state.get("memory", {}))
+        logger.info(f"[{self.room_code}] Restored {self.memory.turn_count} turn(s) of memory")
+    
+    def metrics(self) -> Dict[str, float]:
+        return {
+            "reconnects": self.reconnects,
+            "reconnect_attempts": self.reconnect_attempts,
+            "last_reconnect_seconds": self.last_reconnect_seconds,
+            **super().metrics(),
+        }
     
     async def disconnect(self):
         """Disconnect from room"""
+        self._closing = True
+        if self._reconnect_task:
+            self._reconnect_task.cancel()
+        await self.close()
         if self.room:
             await self.room.disconnect()
             logger.info(f"[{self.room_code}] Disconnected")
@@ -147,77 +155,261 @@ class RoomAgent:
 class AgentManager:
     """Manages multiple agents, one per room"""
     
-    def __init__(self):
+    def __init__(self, idle_grace_period: float = None, room_factory: Callable[[], rtc.Room] = rtc.Room):
         self.agents: Dict[str, RoomAgent] = {}
-        self.tasks: Dict[str, asyncio.Task] = {}
+        self.room_factory = room_factory
+        self._spawning: Dict[str, asyncio.Task] = {}
+        # Called with the room code after any removal (command, idle reap or lost room)
+        self.on_removed: Optional[Callable[[str], None]] = None
+        if idle_grace_period is None:
+            idle_grace_period = float(os.getenv("IDLE_GRACE_PERIOD", "300"))
+        self.reaper = IdleReaper(self.remove_agent, grace_period=idle_grace_period)
+        
+        # Bound connects/disconnects so bulk operations don't hammer LiveKit
+        self._connect_slots = asyncio.Semaphore(int(os.getenv("SPAWN_CONCURRENCY", "16")))
+        self._connect_rate = TokenBucket(
+            rate=float(os.getenv("SPAWN_RATE", "10")),
+            burst=int(os.getenv("SPAWN_BURST", "20")),
+        )
+        
+        # Room assignments and memory survive restarts through snapshots
+        store = create_snapshot_store()
+        self.snapshots = RoomSnapshotter(
+            store, lambda: self.agents, interval=float(os.getenv("SNAPSHOT_INTERVAL", "5"))
+        ) if store else None
+        self._register_gauges()
+    
+    def _register_gauges(self):
+        """Scrape-time gauges over this process's rooms and shared caches"""
+        gauge("judge_rooms", "Rooms with a connected judge", lambda: {(): len(self.agents)})
+        gauge(
+            "judge_turn_queue_depth", "Players waiting for the floor",
+            lambda: {(code,): agent.turns.stats()["depth"] for code, agent in self.agents.items()},
+            ["room"],
+        )
+        gauge(
+            "judge_audio_subscribed_tracks", "Microphones subscribed (floor holder plus warm set)",
+            lambda: {(code,): len(agent.audio.wanted) for code, agent in self.agents.items()},
+            ["room"],
+        )
+        gauge(
+            "judge_room_audio_bytes", "Inbound audio bytes received per room",
+            lambda: {(code,): agent.audio.bytes_received for code, agent in self.agents.items()},
+            ["room"],
+        )
+        gauge(
+            "judge_response_cache", "Host response cache counters",
+            lambda: {(key,): value for key, value in get_response_cache().stats().items()},
+            ["stat"],
+        )
+        gauge(
+            "judge_token_cache", "LiveKit token cache counters",
+            lambda: {(key,): value for key, value in get_token_cache().stats().items()},
+            ["stat"],
+        )
     
-    async def spawn_agent(self, room_code: str):
-        """Spawn a new agent for a room"""
+    async def spawn_agent(self, room_code: str) -> bool:
+        """Spawn a new agent for a room
+        
+        Concurrent calls for the same room share one connection attempt.
+        Returns True if the room has an agent afterwards.
+        """
         room_code = room_code.upper()
         
         if room_code in self.agents:
             logger.info(f"Agent already exists for room {room_code}")
-            return
+            return True
         
+        task = self._spawning.get(room_code)
+        if task is None:
+            task = asyncio.create_task(self._spawn(room_code))
+            self._spawning[room_code] = task
+            task.add_done_callback(lambda _: self._spawning.pop(room_code, None))
+        
+        return await asyncio.shield(task)
+    
+    async def _spawn(self, room_code: str) -> bool:
         logger.info(f"Spawning agent for room: {room_code}")
-        agent = RoomAgent(room_code)
+        agent = RoomAgent(room_code, self.room_factory)
+        if self.snapshots:
+            try:
+                state = await self.snapshots.store.load(room_code)
+            except Exception as e:
+                logger.error(f"[{room_code}] Could not read snapshot: {e!r}")
+                state = None
+            if state:
+                agent.restore(state)
+                self.snapshots.mark_saved(room_code, agent.state_version)
+        
+        async with self._connect_slots:
+            await self._connect_rate.acquire()
+            connected = await agent.connect()
         
-        if await agent.connect():
+        if connected:
             self.agents[room_code] = agent
-            # Keep agent running
-            task = asyncio.create_task(self._keep_alive(agent))
-            self.tasks[room_code] = task
+            agent.on_lost = lambda lost: asyncio.create_task(self.remove_agent(lost.room_code))
+            self._watch_presence(agent)
+            if self.snapshots:
+                self.snapshots.start()
             logger.info(f"✅ Agent spawned for room: {room_code}")
         else:
             logger.error(f"❌ Failed to spawn agent for room: {room_code}")
+        return connected
     
-    async def _keep_alive(self, agent: RoomAgent):
-        """Keep agent alive and monitor for disconnection"""
-        try:
-            while True:
-                await asyncio.sleep(5)
-                # Check if room still has participants
-                if agent.room and len(agent.room.remote_participants) == 0:
-                    logger.info(f"[{agent.room_code}] No participants, waiting...")
-        except asyncio.CancelledError:
-            logger.info(f"[{agent.room_code}] Task cancelled")
-        except Exception as e:
-            logger.error(f"[{agent.room_code}] Error: {e}")
+    async def spawn_many(self, room_codes: List[str]) -> Dict[str, bool]:
+        """Spawn agents for many rooms concurrently
+        
+        Returns {room code: True if the room has an agent}.
+        """
+        codes = list(dict.fromkeys(code.upper() for code in room_codes))
+        get_token_cache().prefetch(f"mafia-{code}" for code in codes if code not in self.agents)
+        results = await asyncio.gather(
+            *(self.spawn_agent(code) for code in codes), return_exceptions=True
+        )
+        return {code: result is True for code, result in zip(codes, results)}
+    
+    def _watch_presence(self, agent: RoomAgent):
+        """Feed participant events to the idle reaper"""
+        self.reaper.start()
+        
+        def on_presence_change(*_):
+            # Other agents (the voice judge) don't keep a room alive
+            room = agent.room
+            if room and not any(is_player(p) for p in room.remote_participants.values()):
+                self.reaper.mark_idle(agent.room_code)
+            else:
+                self.reaper.mark_busy(agent.room_code)
+        
+        agent.add_room_listener("participant_connected", on_presence_change)
+        agent.add_room_listener("participant_disconnected", on_presence_change)
+        on_presence_change()
     
-    async def remove_agent(self, room_code: str):
-        """Remove agent for a room"""
+    async def remove_agent(self, room_code: str) -> bool:
+        """Remove agent for a room
+        
+        Returns True if an agent was disconnected.
+        """
         room_code = room_code.upper()
+        self.reaper.forget(room_code)
         
-        if room_code in self.agents:
-            await self.agents[room_code].disconnect()
-            del self.agents[room_code]
-            
-        if room_code in self.tasks:
-            self.tasks[room_code].cancel()
-            del self.tasks[room_code]
+        # Let an in-flight spawn finish so it can't re-add the agent afterwards
+        task = self._spawning.get(room_code)
+        if task:
+            await asyncio.shield(task)
+        
+        agent = self.agents.pop(room_code, None)
+        if agent:
+            async with self._connect_slots:
+                await self._connect_rate.acquire()
+                await agent.disconnect()
+            if self.snapshots:
+                await self.snapshots.forget(room_code)
+            if self.on_removed:
+                self.on_removed(room_code)
             
         logger.info(f"Removed agent for room: {room_code}")
+        return agent is not None
+    
+    async def remove_many(self, room_codes: List[str]) -> Dict[str, bool]:
+        """Remove agents for many rooms concurrently
+        
+        Returns {room code: True if an agent was disconnected}.
+        """
+        codes = list(dict.fromkeys(code.upper() for code in room_codes))
+        results = await asyncio.gather(
+            *(self.remove_agent(code) for code in codes), return_exceptions=True
+        )
+        for code, result in zip(codes, results):
+            if isinstance(result, Exception):
+                logger.error(f"[{code}] Remove failed: {result!r}")
+        return {code: result is True for code, result in zip(codes, results)}
+    
+    async def restore(self) -> Dict[str, bool]:
+        """Re-spawn every room from the last snapshot, concurrently"""
+        if not self.snapshots:
+            return {}
+        codes = await self.snapshots.store.room_codes()
+        if not codes:
+            return {}
+        
+        started = time.monotonic()
+        results = await self.spawn_many(codes)
+        for code, ok in results.items():
+            if not ok:
+                await self.snapshots.forget(code)
+        logger.info(
+            f"Restored {sum(results.values())}/{len(results)} room(s) "
+            f"in {time.monotonic() - started:.1f}s"
+        )
+        return results
+    
+    async def shutdown(self):
+        """Remove every agent and stop background work
+        
+        Snapshots are flushed and kept, so the next start restores the rooms.
+        """
+        self.reaper.stop()
+        snapshots, self.snapshots = self.snapshots, None
+        if snapshots:
+            snapshots.stop()
+            try:
+                await snapshots.flush()
+            except Exception as e:
+                logger.error(f"Final snapshot failed: {e!r}")
+        await self.remove_many(list(self.agents.keys()) + list(self._spawning.keys()))
+        if snapshots:
+            snapshots.store.close()
     
     async def list_agents(self):
         """List all active agents"""
         return list(self.agents.keys())
 
 
-async def interactive_mode():
+def create_discovery(manager: AgentManager) -> RoomDiscovery:
+    """Build room discovery from DISCOVERY_SOURCE (livekit or api)"""
+    if os.getenv("DISCOVERY_SOURCE", "livekit") == "api":
+        source = room_api_source(API_BASE)
+    else:
+        source = livekit_room_source()
+    return RoomDiscovery(
+        manager,
+        source,
+        max_interval=float(os.getenv("DISCOVERY_MAX_INTERVAL", "30")),
+        max_concurrency=int(os.getenv("DISCOVERY_CONCURRENCY", "8")),
+        missing_polls=int(os.getenv("DISCOVERY_MISSING_POLLS", "3")),
+    )
+
+
+async def interactive_mode(discover: bool = False):
     """Interactive mode for demo - spawn agents as needed"""
     manager = AgentManager()
+    discovery = create_discovery(manager) if discover else None
     
     print("\n" + "="*60)
     print("🎮 SuperMafia Multi-Agent Manager")
     print("="*60)
     print("\nCommands:")
-    print("  spawn <CODE>  - Spawn agent for room code (e.g., spawn ABC123)")
+    print("  spawn <CODE>  - Spawn agent for room code (e.g., spawn ABC123 DEF456)")
     print("  list          - List all active agents")
-    print("  remove <CODE> - Remove agent for room")
+    print("  remove <CODE> - Remove agent for room (several codes allowed)")
+    print("  stats         - Show cache and reconnect counters")
     print("  quit          - Exit")
-    print("\nTip: Just create a room in the web UI, then run 'spawn CODE' here")
+    if discovery:
+        print("\nRoom discovery is on: judges join new games automatically")
+    else:
+        print("\nTip: Just create a room in the web UI, then run 'spawn CODE' here")
     print("="*60 + "\n")
     
+    restored = await manager.restore()
+    if restored:
+        print(f"Restored {sum(restored.values())}/{len(restored)} room(s) from the last run")
+    
+    if discovery:
+        discovery.start()
+    
+    port = metrics_port()
+    metrics_runner = await start_metrics_server(port) if port else None
+    
     async def process_commands():
         while True:
             await asyncio.sleep(0.1)
@@ -246,8 +438,9 @@ async def interactive_mode():
             command = parts[0].lower()
             
             if command == "spawn" and len(parts) > 1:
-                room_code = parts[1].upper()
-                await manager.spawn_agent(room_code)
+                results = await manager.spawn_many(parts[1:])
+                if len(results) > 1:
+                    print(f"Spawned {sum(results.values())}/{len(results)} agents")
                 
             elif command == "list":
                 agents = await manager.list_agents()
@@ -256,14 +449,25 @@ async def interactive_mode():
                 else:
                     print("No active agents")
                     
+            elif command == "stats":
+                print(f"Token cache: {get_token_cache().stats()}")
+                print(f"Response cache: {get_response_cache().stats()}")
+                if manager.snapshots:
+                    print(f"Snapshots: {manager.snapshots.stats()}")
+                for room_code, agent in manager.agents.items():
+                    print(f"  {room_code}: {agent.metrics()}")
+                
             elif command == "remove" and len(parts) > 1:
-                room_code = parts[1].upper()
-                await manager.remove_agent(room_code)
+                await manager.remove_many(parts[1:])
                 
             elif command in ["quit", "exit"]:
                 print("Shutting down all agents...")
-                for room_code in list(manager.agents.keys()):
-                    await manager.remove_agent(room_code)
+                if discovery:
+                    discovery.stop()
+                await manager.shutdown()
+                await close_host_client()
+                if metrics_runner:
+                    await metrics_runner.cleanup()
                 break
                 
             else:
@@ -277,7 +481,30 @@ async def interactive_mode():
 
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="SuperMafia Multi-Agent Manager")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("AGENT_WORKERS", "1")),
+        help="Number of worker processes; more than 1 runs the sharded supervisor",
+    )
+    parser.add_argument(
+        "--discover",
+        action="store_true",
+        default=os.getenv("AUTO_DISCOVER") == "1",
+        help="Join active mafia-* rooms automatically instead of waiting for 'spawn'",
+    )
+    args = parser.parse_args()
+    if args.workers > 1 and args.discover:
+        parser.error("--discover is not supported with --workers > 1 (the supervisor doesn't run discovery)")
+    
     try:
-        asyncio.run(interactive_mode())
+        if args.workers > 1:
+            from supervisor import supervisor_mode
+            asyncio.run(supervisor_mode(args.workers))
+        else:
+            asyncio.run(interactive_mode(discover=args.discover))
     except KeyboardInterrupt:
         print("\nGoodbye!")
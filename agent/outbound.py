@@ -0,0 +1,205 @@
+"""
+Outbound data-channel pipeline for one room
+Messages queued within a short window are batched into one packet per set
+of recipients. Packets use a small binary envelope, compress long bodies
+with deflate, and are split into chunks below LiveKit's packet size limit.
+Clients decode it in lib/livekit-room.ts; plain JSON packets still work.
+
+Envelope:
+    byte 0      MAGIC (0xA5, never the first byte of JSON text)
+    byte 1      flags: FLAG_DEFLATE | FLAG_CHUNKED
+    if chunked: uint32 message id, uint16 chunk index, uint16 chunk count
+    rest        body (or this chunk of it)
+Body (after reassembly and inflate): repeated [uint32 length][UTF-8 JSON]
+"""
+
+import os
+import json
+import asyncio
+import itertools
+import logging
+import struct
+import zlib
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from livekit import rtc
+
+from metrics import ERRORS, PUBLISH_SECONDS
+
+logger = logging.getLogger("outbound")
+logger.setLevel(logging.INFO)
+
+MAGIC = 0xA5
+FLAG_DEFLATE = 0x01
+FLAG_CHUNKED = 0x02
+
+_HEADER = struct.Struct(">BB")
+_CHUNK_HEADER = struct.Struct(">BBIHH")
+_LENGTH = struct.Struct(">I")
+
+# LiveKit drops reliable packets over ~15 KiB
+MAX_PACKET_BYTES = 15000
+
+
+def encode_batch(messages: Iterable[dict]) -> bytes:
+    """Length-prefixed JSON records"""
+    parts = []
+    for message in messages:
+        record = json.dumps(message, separators=(",", ":")).encode("utf-8")
+        parts.append(_LENGTH.pack(len(record)))
+        parts.append(record)
+    return b"".join(parts)
+
+
+def decode_batch(body: bytes) -> List[dict]:
+    messages = []
+    offset = 0
+    while offset < len(body):
+        (length,) = _LENGTH.unpack_from(body, offset)
+        offset += _LENGTH.size
+        messages.append(json.loads(body[offset:offset + length]))
+        offset += length
+    return messages
+
+
+def packetize(body: bytes, message_id: int, compress_threshold: int = 1024,
+              max_packet: int = MAX_PACKET_BYTES) -> List[bytes]:
+    """Wrap a batch body in the envelope, compressing and chunking as needed"""
+    flags = 0
+    if len(body) >= compress_threshold:
+        compressed = zlib.compress(body, 6)
+        if len(compressed) < len(body):
+            body, flags = compressed, FLAG_DEFLATE
+
+    if _HEADER.size + len(body) <= max_packet:
+        return [_HEADER.pack(MAGIC, flags) + body]
+
+    size = max_packet - _CHUNK_HEADER.size
+    chunks = [body[i:i + size] for i in range(0, len(body), size)]
+    return [
+        _CHUNK_HEADER.pack(MAGIC, flags | FLAG_CHUNKED, message_id, index, len(chunks)) + chunk
+        for index, chunk in enumerate(chunks)
+    ]
+
+
+class Reassembler:
+    """Receiving side of the envelope, mirrored by the web client"""
+
+    def __init__(self):
+        self._partial: Dict[Tuple[str, int], List[Optional[bytes]]] = {}
+
+    def feed(self, packet: bytes, sender: str = "") -> List[dict]:
+        """Messages completed by this packet (plain JSON is passed through)"""
+        if not packet or packet[0] != MAGIC:
+            return [json.loads(packet)]
+
+        _, flags = _HEADER.unpack_from(packet)
+        if flags & FLAG_CHUNKED:
+            _, _, message_id, index, count = _CHUNK_HEADER.unpack_from(packet)
+            chunks = self._partial.setdefault((sender, message_id), [None] * count)
+            chunks[index] = packet[_CHUNK_HEADER.size:]
+            if any(chunk is None for chunk in chunks):
+                return []
+            del self._partial[(sender, message_id)]
+            body = b"".join(chunks)
+        else:
+            body = packet[_HEADER.size:]
+
+        if flags & FLAG_DEFLATE:
+            body = zlib.decompress(body)
+        return decode_batch(body)
+
+
+class OutboundPublisher:
+    """Micro-batching publisher for one room's local participant"""
+
+    def __init__(
+        self,
+        get_participant: Callable[[], Optional[rtc.LocalParticipant]],
+        window: float = 0.02,
+        compress_threshold: int = 1024,
+        max_packet: int = MAX_PACKET_BYTES,
+        label: str = "",
+    ):
+        self.get_participant = get_participant
+        self.window = window
+        self.compress_threshold = compress_threshold
+        self.max_packet = max_packet
+        self.label = label
+
+        # (reliable, recipients) -> queued messages, in arrival order
+        self._pending: Dict[Tuple[bool, Tuple[str, ...]], List[dict]] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._ids = itertools.count(1)
+
+        self.messages = 0
+        self.packets = 0
+        self.raw_bytes = 0
+        self.sent_bytes = 0
+
+    def send(self, message: dict, destinations: Optional[Iterable[str]] = None, reliable: bool = True):
+        """Queue a message; destinations limits who receives it"""
+        key = (reliable, tuple(sorted(destinations)) if destinations else ())
+        self._pending.setdefault(key, []).append(message)
+        self.messages += 1
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        await self.flush()
+
+    async def flush(self):
+        """Publish everything queued so far"""
+        async with self._lock:
+            while self._pending:
+                pending, self._pending = self._pending, {}
+                await self._publish(pending)
+
+    async def _publish(self, pending: Dict[Tuple[bool, Tuple[str, ...]], List[dict]]):
+        participant = self.get_participant()
+        for (reliable, destinations), messages in pending.items():
+            if participant is None:
+                logger.warning(f"{self.label}Dropping {len(messages)} message(s): not connected")
+                continue
+
+            body = encode_batch(messages)
+            self.raw_bytes += len(body)
+            for packet in packetize(body, next(self._ids) & 0xFFFFFFFF, self.compress_threshold, self.max_packet):
+                try:
+                    with PUBLISH_SECONDS.time():
+                        await participant.publish_data(
+                            packet,
+                            reliable=reliable,
+                            destination_identities=list(destinations),
+                        )
+                except Exception as e:
+                    logger.error(f"{self.label}Publish error: {e}")
+                    ERRORS.inc("publish")
+                    break
+                self.packets += 1
+                self.sent_bytes += len(packet)
+
+    async def close(self):
+        if self._flusher and not self._flusher.done():
+            self._flusher.cancel()
+        await self.flush()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "messages": self.messages,
+            "packets": self.packets,
+            "raw_bytes": self.raw_bytes,
+            "sent_bytes": self.sent_bytes,
+        }
+
+
+def create_publisher(get_participant: Callable[[], Optional[rtc.LocalParticipant]], label: str = "") -> OutboundPublisher:
+    """Publisher configured from PUBLISH_BATCH_MS and PUBLISH_COMPRESS_BYTES"""
+    return OutboundPublisher(
+        get_participant,
+        window=float(os.getenv("PUBLISH_BATCH_MS", "20")) / 1000,
+        compress_threshold=int(os.getenv("PUBLISH_COMPRESS_BYTES", "1024")),
+        label=label,
+    )
@@ -0,0 +1,203 @@
+"""
+Pre-synthesized audio for the judge's fixed lines
+Stock phrases (welcome, abstain, ...) are rendered once, kept on disk as raw
+16-bit PCM and held in a size-bounded in-memory LRU. Hits play straight from
+memory with no TTS round trip; misses are synthesized and fill the cache.
+
+Audio is keyed by a voice string (plugin, model, voice id) that is worked
+out from configuration, so the worker process can list the cache directory
+and load what is already rendered while it prewarms without building a TTS
+client. Phrases not on disk yet are synthesized on first use by the job's
+own client.
+"""
+
+import os
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from livekit import rtc
+
+logger = logging.getLogger("phrase-cache")
+logger.setLevel(logging.INFO)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".phrase_cache")
+
+# Frames handed to the audio output when replaying a cached phrase
+FRAME_MS = 20
+
+
+@dataclass
+class PhraseAudio:
+    sample_rate: int
+    num_channels: int
+    pcm: bytes
+
+    @property
+    def duration(self) -> float:
+        return len(self.pcm) / (2 * self.num_channels * self.sample_rate)
+
+    def frames(self) -> Iterable[rtc.AudioFrame]:
+        samples_per_frame = self.sample_rate * FRAME_MS // 1000
+        step = samples_per_frame * self.num_channels * 2
+        for offset in range(0, len(self.pcm), step):
+            chunk = self.pcm[offset:offset + step]
+            yield rtc.AudioFrame(
+                data=chunk,
+                sample_rate=self.sample_rate,
+                num_channels=self.num_channels,
+                samples_per_channel=len(chunk) // (2 * self.num_channels),
+            )
+
+
+class PhraseCache:
+    """Disk-backed LRU of synthesized phrases for one TTS voice"""
+
+    def __init__(self, voice: str, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = 16 * 1024 * 1024, tts: Any = None):
+        # Plugin, model and voice id; audio is only reused for the same voice
+        self.voice = voice
+        # Set by the job that owns the client; only needed to fill misses
+        self.tts = tts
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, PhraseAudio]" = OrderedDict()
+        self._bytes = 0
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        # key -> file name of every rendered phrase on disk, listed once
+        self._index: Optional[Dict[str, str]] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.voice}|{text.strip()}".encode("utf-8")).hexdigest()[:20]
+
+    def _scan(self) -> Dict[str, str]:
+        """List the cache directory into the index (blocking)"""
+        if self._index is None:
+            index: Dict[str, str] = {}
+            if os.path.isdir(self.cache_dir):
+                for name in os.listdir(self.cache_dir):
+                    if name.endswith(".pcm"):
+                        index.setdefault(name.split("-", 1)[0], name)
+            self._index = index
+        return self._index
+
+    def _path(self, key: str, sample_rate: int, num_channels: int) -> str:
+        return os.path.join(self.cache_dir, f"{key}-{sample_rate}-{num_channels}.pcm")
+
+    def _remember(self, key: str, audio: PhraseAudio):
+        if key in self._entries:
+            self._bytes -= len(self._entries.pop(key).pcm)
+        self._entries[key] = audio
+        self._bytes += len(audio.pcm)
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted.pcm)
+
+    def _load_from_disk(self, key: str) -> Optional[PhraseAudio]:
+        """Read one rendered phrase (blocking)"""
+        name = self._scan().get(key)
+        if name is None:
+            return None
+        try:
+            _, sample_rate, num_channels = name[:-4].split("-")
+            with open(os.path.join(self.cache_dir, name), "rb") as f:
+                return PhraseAudio(int(sample_rate), int(num_channels), f.read())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable cached phrase {name}: {e}")
+            return None
+
+    def _save_to_disk(self, key: str, audio: PhraseAudio):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(key, audio.sample_rate, audio.num_channels)
+            with open(f"{path}.tmp", "wb") as f:
+                f.write(audio.pcm)
+            os.replace(f"{path}.tmp", path)
+            self._scan()[key] = os.path.basename(path)
+        except OSError as e:
+            logger.warning(f"Could not write phrase cache: {e}")
+
+    def load(self, phrases: Iterable[str]):
+        """Pull already rendered phrases from disk into memory (blocking, no network)"""
+        for text in phrases:
+            key = self._key(text)
+            if key not in self._entries:
+                audio = self._load_from_disk(key)
+                if audio:
+                    self._remember(key, audio)
+
+    def missing(self, phrases: Iterable[str]) -> List[str]:
+        """Phrases with no rendered audio in memory or on disk"""
+        index = self._scan()
+        return [text for text in phrases if self._key(text) not in self._entries and self._key(text) not in index]
+
+    @staticmethod
+    async def _render(tts, text: str) -> PhraseAudio:
+        stream = tts.synthesize(text)
+        try:
+            frame = await stream.collect()
+        finally:
+            await stream.aclose()
+        return PhraseAudio(frame.sample_rate, frame.num_channels, bytes(frame.data))
+
+    async def _synthesize(self, key: str, text: str) -> PhraseAudio:
+        if self.tts is None:
+            raise RuntimeError("no TTS client to render with")
+        audio = await self._render(self.tts, text)
+        self._remember(key, audio)
+        await asyncio.get_running_loop().run_in_executor(None, self._save_to_disk, key, audio)
+        return audio
+
+    async def get(self, text: str) -> PhraseAudio:
+        """Cached audio for a phrase, synthesizing it on a miss"""
+        key = self._key(text)
+        audio = self._entries.get(key)
+        if audio:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return audio
+
+        loop = asyncio.get_running_loop()
+        if self._index is None:
+            await loop.run_in_executor(None, self._scan)
+        if key in self._index:
+            audio = await loop.run_in_executor(None, self._load_from_disk, key)
+            if audio:
+                self.disk_hits += 1
+                self._remember(key, audio)
+                return audio
+
+        task = self._in_flight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.create_task(self._synthesize(key, text))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _replay(self, audio: PhraseAudio) -> AsyncIterator[rtc.AudioFrame]:
+        for frame in audio.frames():
+            yield frame
+
+    async def say(self, session, text: str, **kwargs):
+        """session.say() using cached audio, falling back to live TTS"""
+        try:
+            audio = await self.get(text)
+        except Exception as e:
+            logger.warning(f"Phrase cache miss failed ({e!r}); using live TTS")
+            return session.say(text, **kwargs)
+        return session.say(text, audio=self._replay(audio), **kwargs)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+        }
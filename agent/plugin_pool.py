@@ -0,0 +1,172 @@
+"""
+Shared STT/LLM/TTS plugin clients for judge sessions
+Clients are built on first use instead of at import time and reused by every
+session in the worker process, so their HTTP/websocket connections are too.
+Each backend has a cap on concurrent sessions; a client that reports an
+unrecoverable error (or several in a row) is evicted and rebuilt for the
+next session, and closed once the sessions still using it are done.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("plugin-pool")
+logger.setLevel(logging.INFO)
+
+
+@dataclass
+class _Backend:
+    kind: str
+    candidates: List[Tuple[str, Callable[[], Any]]]
+    max_sessions: int
+    slots: Optional[asyncio.Semaphore] = None
+    client: Any = None
+    name: Optional[str] = None
+    leases: Dict[int, int] = field(default_factory=dict)  # id(client) -> sessions
+    retired: Dict[int, Any] = field(default_factory=dict)
+    consecutive_errors: int = 0
+    in_use: int = 0
+    peak: int = 0
+    waits: int = 0
+    wait_seconds: float = 0.0
+    builds: int = 0
+    build_seconds: float = 0.0
+    evictions: int = 0
+
+
+class PluginPool:
+    """Lazily built plugin clients with per-backend session limits"""
+
+    def __init__(self, max_errors: int = 3):
+        self.max_errors = max_errors
+        self.created_at = time.monotonic()
+        self._backends: Dict[str, _Backend] = {}
+
+    def register(self, kind: str, candidates: List[Tuple[str, Callable[[], Any]]], max_sessions: int):
+        """Candidates are tried in order; ImportError moves on to the next"""
+        self._backends[kind] = _Backend(kind, candidates, max_sessions)
+
+    def _build(self, backend: _Backend) -> Any:
+        started = time.monotonic()
+        for name, factory in backend.candidates:
+            try:
+                client = factory()
+            except ImportError:
+                logger.info(f"{backend.kind}: {name} not available, trying next")
+                continue
+            backend.name = name
+            backend.builds += 1
+            backend.build_seconds += time.monotonic() - started
+            backend.consecutive_errors = 0
+            self._watch_health(backend, client)
+            logger.info(f"{backend.kind}: built {name} in {time.monotonic() - started:.2f}s")
+            return client
+        raise RuntimeError(f"No {backend.kind} plugin available")
+
+    def _watch_health(self, backend: _Backend, client: Any):
+        if not hasattr(client, "on"):
+            return
+
+        def on_error(event):
+            if backend.client is not client:
+                return
+            backend.consecutive_errors += 1
+            if not getattr(event, "recoverable", True) or backend.consecutive_errors >= self.max_errors:
+                logger.warning(f"{backend.kind}: evicting {backend.name} after {getattr(event, 'error', event)!r}")
+                self.evict(backend.kind)
+
+        def on_metrics(_):
+            if backend.client is client:
+                backend.consecutive_errors = 0
+
+        client.on("error", on_error)
+        client.on("metrics_collected", on_metrics)
+
+    def get(self, kind: str) -> Any:
+        """The current client for a backend, built on first use"""
+        backend = self._backends[kind]
+        if backend.client is None:
+            backend.client = self._build(backend)
+        return backend.client
+
+    def plugin(self, kind: str) -> Optional[str]:
+        """Name of the plugin the backend's current client was built from"""
+        return self._backends[kind].name
+
+    async def acquire(self, kind: str) -> Any:
+        """Take a session slot on a backend and return its client"""
+        backend = self._backends[kind]
+        if backend.slots is None:
+            backend.slots = asyncio.Semaphore(backend.max_sessions)
+
+        if backend.slots.locked():
+            backend.waits += 1
+            logger.warning(f"{kind}: all {backend.max_sessions} slots busy, waiting")
+        started = time.monotonic()
+        await backend.slots.acquire()
+        backend.wait_seconds += time.monotonic() - started
+
+        try:
+            client = self.get(kind)
+        except Exception:
+            backend.slots.release()
+            raise
+
+        backend.in_use += 1
+        backend.peak = max(backend.peak, backend.in_use)
+        backend.leases[id(client)] = backend.leases.get(id(client), 0) + 1
+        return client
+
+    def release(self, kind: str, client: Any):
+        """Give back a session slot"""
+        backend = self._backends[kind]
+        backend.in_use -= 1
+        backend.slots.release()
+
+        remaining = backend.leases.get(id(client), 1) - 1
+        if remaining > 0:
+            backend.leases[id(client)] = remaining
+            return
+        backend.leases.pop(id(client), None)
+        if id(client) in backend.retired:
+            del backend.retired[id(client)]
+            self._close(client)
+
+    def evict(self, kind: str):
+        """Drop a backend's client; the next session gets a fresh one"""
+        backend = self._backends[kind]
+        client, backend.client = backend.client, None
+        if client is None:
+            return
+        backend.evictions += 1
+        if backend.leases.get(id(client)):
+            backend.retired[id(client)] = client
+        else:
+            self._close(client)
+
+    def _close(self, client: Any):
+        if hasattr(client, "aclose"):
+            try:
+                asyncio.get_running_loop().create_task(client.aclose())
+            except RuntimeError:
+                pass
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            kind: {
+                "plugin": backend.name,
+                "in_use": backend.in_use,
+                "max_sessions": backend.max_sessions,
+                "peak": backend.peak,
+                "saturation": round(backend.peak / backend.max_sessions, 2),
+                "waits": backend.waits,
+                "wait_seconds": round(backend.wait_seconds, 3),
+                "builds": backend.builds,
+                "build_seconds": round(backend.build_seconds, 3),
+                "evictions": backend.evictions,
+            }
+            for kind, backend in self._backends.items()
+        }
@@ -0,0 +1,94 @@
+"""
+Idle reaper - frees judges whose room has been empty for a while
+Rooms report presence changes from participant events; one task sleeps until
+the earliest idle deadline in a heap, so empty rooms cost nothing until they
+are actually due.
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("reaper")
+logger.setLevel(logging.INFO)
+
+
+class IdleReaper:
+    """Single-task reaper driven by a heap of idle deadlines"""
+
+    def __init__(self, on_idle: Callable[[str], Awaitable[None]], grace_period: float = 300.0):
+        self.on_idle = on_idle
+        self.grace_period = grace_period
+        self._heap: List[Tuple[float, str]] = []
+        self._deadlines: Dict[str, float] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def mark_idle(self, room_code: str):
+        """Start the grace period for a room that just became empty"""
+        if room_code in self._deadlines:
+            return
+
+        deadline = time.monotonic() + self.grace_period
+        self._deadlines[room_code] = deadline
+        heapq.heappush(self._heap, (deadline, room_code))
+        logger.info(f"[{room_code}] No participants, reaping in {self.grace_period:.0f}s")
+
+        if self._heap[0][1] == room_code:
+            self._wakeup.set()
+
+    def mark_busy(self, room_code: str):
+        """Cancel the grace period; the stale heap entry is skipped later"""
+        self._deadlines.pop(room_code, None)
+
+    def forget(self, room_code: str):
+        self.mark_busy(room_code)
+
+    def idle_rooms(self) -> List[str]:
+        return list(self._deadlines.keys())
+
+    async def _run(self):
+        try:
+            while True:
+                if not self._heap:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+
+                deadline, room_code = self._heap[0]
+                if self._deadlines.get(room_code) != deadline:
+                    heapq.heappop(self._heap)
+                    continue
+
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                heapq.heappop(self._heap)
+                del self._deadlines[room_code]
+                logger.info(f"[{room_code}] Idle grace period over, reaping")
+                asyncio.create_task(self._reap(room_code))
+        except asyncio.CancelledError:
+            pass
+
+    async def _reap(self, room_code: str):
+        try:
+            await self.on_idle(room_code)
+        except Exception as e:
+            logger.error(f"[{room_code}] Reap error: {e!r}")
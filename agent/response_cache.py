@@ -0,0 +1,209 @@
+"""
+Response cache for judge prompts
+Answers are keyed on the normalized question plus game context and evicted
+LRU-first or after a TTL. Identical requests that arrive while one is already
+in flight wait for that call instead of making their own; the shared call is
+cancelled once every caller waiting on it has gone. A streamed fetch is shared
+the same way: its deltas are fanned out to every waiting caller, and callers
+that join late get the deltas they missed replayed first.
+"""
+
+import os
+import json
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("response-cache")
+logger.setLevel(logging.INFO)
+
+
+def _percentile(samples: Deque[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+_DONE = object()
+
+
+class _InFlight:
+    __slots__ = ("task", "waiters", "deltas", "listeners")
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+        self.deltas: List[str] = []
+        self.listeners: List[asyncio.Queue] = []
+
+    def emit(self, delta: str):
+        """Hand a streamed delta to every caller waiting on this fetch"""
+        self.deltas.append(delta)
+        for listener in self.listeners:
+            listener.put_nowait(delta)
+
+    def listen(self) -> asyncio.Queue:
+        """Deltas so far, then the rest as they arrive, then _DONE"""
+        listener: asyncio.Queue = asyncio.Queue()
+        for delta in self.deltas:
+            listener.put_nowait(delta)
+        if self.task.done():
+            listener.put_nowait(_DONE)
+        self.listeners.append(listener)
+        return listener
+
+    def finish(self, _task: asyncio.Task):
+        for listener in self.listeners:
+            listener.put_nowait(_DONE)
+
+
+def _retrieve(task: asyncio.Task):
+    # A fetch whose callers all left may still fail; don't log it as unretrieved
+    if not task.cancelled():
+        task.exception()
+
+
+class ResponseCache:
+    """LRU+TTL cache with in-flight request coalescing"""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 60.0, latency_samples: int = 500):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._in_flight: Dict[str, _InFlight] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._cached_latency: Deque[float] = deque(maxlen=latency_samples)
+        self._uncached_latency: Deque[float] = deque(maxlen=latency_samples)
+        # Callers that joined someone else's fetch; kept apart so they don't
+        # flatter the uncached numbers
+        self._coalesced_latency: Deque[float] = deque(maxlen=latency_samples)
+
+    @staticmethod
+    def make_key(payload: Dict[str, Any]) -> str:
+        """Normalize the question and serialize the context deterministically"""
+        question = re.sub(r"\s+", " ", str(payload.get("question", ""))).strip().lower()
+        context = json.dumps(payload.get("gameContext"), sort_keys=True, separators=(",", ":"))
+        return f"{payload.get('provider', '')}|{question}|{context}"
+
+    def _lookup(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _store(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def peek(self, payload: Dict[str, Any]) -> Optional[Any]:
+        """A cached answer for the payload, without fetching"""
+        return self._lookup(self.make_key(payload))
+
+    async def get_or_fetch(
+        self,
+        payload: Dict[str, Any],
+        fetch: Callable[[Callable[[str], None]], Awaitable[Any]],
+        on_delta: Optional[Callable[..., Awaitable[None]]] = None,
+    ) -> Any:
+        """Return a cached answer, join an identical in-flight call, or fetch
+
+        fetch(emit) calls emit(delta) for each streamed piece of the answer;
+        every caller that passed on_delta gets them as on_delta(delta, seq=n).
+        """
+        started = time.monotonic()
+        key = self.make_key(payload)
+
+        value = self._lookup(key)
+        if value is not None:
+            self.hits += 1
+            self._cached_latency.append(time.monotonic() - started)
+            return value
+
+        flight = self._in_flight.get(key)
+        joined = flight is not None
+        if joined:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            flight = _InFlight()
+            flight.task = asyncio.create_task(self._fetch(key, fetch, flight.emit))
+            self._in_flight[key] = flight
+            flight.task.add_done_callback(_retrieve)
+            flight.task.add_done_callback(flight.finish)
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+
+        flight.waiters += 1
+        listener = flight.listen() if on_delta else None
+        try:
+            if listener is None:
+                value = await asyncio.shield(flight.task)
+            else:
+                # Forward in this caller's task so a slow room only holds itself up
+                seq = 0
+                delta = await listener.get()
+                while delta is not _DONE:
+                    seq += 1
+                    await on_delta(delta, seq=seq)
+                    delta = await listener.get()
+                value = flight.task.result()
+        finally:
+            flight.waiters -= 1
+            if listener is not None:
+                flight.listeners.remove(listener)
+            if flight.waiters == 0 and not flight.task.done():
+                # Nobody wants the answer any more
+                flight.task.cancel()
+                self._forget(key, flight)
+        (self._coalesced_latency if joined else self._uncached_latency).append(time.monotonic() - started)
+        return value
+
+    def _forget(self, key: str, flight: _InFlight):
+        if self._in_flight.get(key) is flight:
+            del self._in_flight[key]
+
+    async def _fetch(self, key: str, fetch: Callable[..., Awaitable[Any]], emit: Callable[[str], None]) -> Any:
+        value = await fetch(emit)
+        # Empty answers mean the upstream had nothing useful; don't pin them
+        if value:
+            self._store(key, value)
+        return value
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "cached_p50_ms": round(_percentile(self._cached_latency, 0.5) * 1000, 2),
+            "uncached_p50_ms": round(_percentile(self._uncached_latency, 0.5) * 1000, 1),
+            "uncached_p95_ms": round(_percentile(self._uncached_latency, 0.95) * 1000, 1),
+            "coalesced_p50_ms": round(_percentile(self._coalesced_latency, 0.5) * 1000, 1),
+            "coalesced_p95_ms": round(_percentile(self._coalesced_latency, 0.95) * 1000, 1),
+        }
+
+
+_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response cache"""
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache(
+            max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "256")),
+            ttl=float(os.getenv("RESPONSE_CACHE_TTL", "60")),
+        )
+    return _cache
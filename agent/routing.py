@@ -0,0 +1,297 @@
+"""
+Provider routing with hedged requests
+Judge replies can come from more than one upstream (/api/host providers or
+LLM models). The router keeps rolling latency and error stats per provider
+and sends each call to the fastest healthy one. If that call is still
+running after the provider's p95 latency, a hedged copy goes to the next
+provider and whichever answers first wins; the other is cancelled. A call
+that fails outright fails over to the next provider straight away.
+
+Hedges are capped to a fraction of calls so a slow period can't double the
+load on every upstream at once. Hedging and failover need at least two
+providers in the list; with one, the router just measures it.
+
+A call refused by the provider's own circuit breaker moves on to the next
+provider without counting as that provider's error.
+"""
+
+import os
+import asyncio
+import logging
+import time
+import weakref
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Sequence, TypeVar
+
+from admission import CircuitOpenError
+from metrics import REGISTRY, Counter, Histogram, gauge
+
+logger = logging.getLogger("routing")
+logger.setLevel(logging.INFO)
+
+T = TypeVar("T")
+
+PROVIDER_SECONDS = REGISTRY.register(Histogram(
+    "judge_provider_seconds", "Time for a provider to answer (or start streaming)", ["provider"],
+))
+PROVIDER_CALLS = REGISTRY.register(Counter(
+    "judge_provider_calls_total", "Calls per provider by outcome", ["provider", "outcome"],
+))
+HEDGES = REGISTRY.register(Counter("judge_hedges_total", "Hedged requests", ["outcome"]))
+
+
+class ProviderError(Exception):
+    """A provider answered, but with an error instead of a reply"""
+
+    def __init__(self, provider: str, detail: str = ""):
+        super().__init__(f"{provider} failed{': ' + detail if detail else ''}")
+        self.provider = provider
+
+
+class ProviderStats:
+    """Rolling latency and error window for one provider"""
+
+    def __init__(self, name: str, window: int = 50):
+        self.name = name
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)  # True = answered
+        self.consecutive_errors = 0
+        self.down_until = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.wins = 0
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+    @property
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def to_dict(self) -> Dict[str, object]:
+        p50, p95 = self.quantile(0.5), self.quantile(0.95)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "wins": self.wins,
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "healthy": self.healthy,
+        }
+
+
+class ProviderRouter:
+    """Sends each call to the fastest healthy provider, hedging slow ones"""
+
+    def __init__(
+        self,
+        providers: Sequence[str],
+        hedge: bool = True,
+        hedge_quantile: float = 0.95,
+        min_hedge_delay: float = 0.25,
+        initial_hedge_delay: float = 2.0,
+        max_hedge_ratio: float = 0.2,
+        min_samples: int = 5,
+        max_errors: int = 3,
+        cooldown: float = 15.0,
+        label: str = "",
+    ):
+        if not providers:
+            raise ValueError("ProviderRouter needs at least one provider")
+        self.providers = list(providers)
+        self.hedge = hedge and len(self.providers) > 1
+        self.hedge_quantile = hedge_quantile
+        self.min_hedge_delay = min_hedge_delay
+        self.initial_hedge_delay = initial_hedge_delay
+        self.max_hedge_ratio = max_hedge_ratio
+        self.min_samples = min_samples
+        self.max_errors = max_errors
+        self.cooldown = cooldown
+        self.label = label
+        self._stats: Dict[str, ProviderStats] = {name: ProviderStats(name) for name in self.providers}
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def _score(self, stats: ProviderStats) -> float:
+        # Untried providers go first so they get measured; configured order breaks ties
+        if len(stats.latencies) < self.min_samples:
+            return 0.0
+        return stats.quantile(0.5) / max(0.05, 1.0 - stats.error_rate)
+
+    def ranked(self) -> List[str]:
+        """Providers in the order they should be tried"""
+        healthy = [s for s in self._stats.values() if s.healthy]
+        down = sorted((s for s in self._stats.values() if not s.healthy), key=lambda s: s.down_until)
+        healthy.sort(key=self._score)
+        return [s.name for s in healthy + down]
+
+    def hedge_delay(self, provider: str) -> float:
+        """How long to give a provider before hedging: its recent p95"""
+        stats = self._stats[provider]
+        if len(stats.latencies) < self.min_samples:
+            return self.initial_hedge_delay
+        return max(self.min_hedge_delay, stats.quantile(self.hedge_quantile))
+
+    def _can_hedge(self) -> bool:
+        return self.hedges < self.max_hedge_ratio * self.calls + 1
+
+    def _succeeded(self, provider: str, elapsed: float):
+        stats = self._stats[provider]
+        stats.latencies.append(elapsed)
+        stats.outcomes.append(True)
+        stats.consecutive_errors = 0
+        stats.down_until = 0.0
+        stats.wins += 1
+        PROVIDER_SECONDS.observe(elapsed, provider)
+        PROVIDER_CALLS.inc(provider, "ok")
+
+    def _failed(self, provider: str, error: BaseException):
+        stats = self._stats[provider]
+        stats.outcomes.append(False)
+        stats.errors += 1
+        stats.consecutive_errors += 1
+        PROVIDER_CALLS.inc(provider, "error")
+        if stats.consecutive_errors >= self.max_errors and stats.healthy:
+            stats.down_until = time.monotonic() + self.cooldown
+            logger.warning(f"{self.label}{provider} marked down for {self.cooldown:.0f}s after {error!r}")
+
+    def _abandoned(self, provider: str, elapsed: float):
+        # Lost the race: it took at least this long, which is what p95 should see
+        self._stats[provider].latencies.append(elapsed)
+        PROVIDER_CALLS.inc(provider, "cancelled")
+
+    async def call(
+        self,
+        attempt: Callable[[str], Awaitable[T]],
+        hedge: Optional[bool] = None,
+        discard: Optional[Callable[[T], Any]] = None,
+    ) -> T:
+        """Run attempt(provider) on the best provider, hedging and failing over
+
+        discard is called with results that lost the race, so they can be
+        released (open streams, for example).
+        """
+        hedge = self.hedge if hedge is None else hedge and len(self.providers) > 1
+        order = self.ranked()
+        self.calls += 1
+        tasks: Dict[asyncio.Task, tuple] = {}
+        next_index = 0
+        hedged = False
+        last_error: Optional[BaseException] = None
+
+        primary, primary_started = order[0], time.monotonic()
+
+        def launch(is_hedge: bool = False):
+            nonlocal next_index, primary, primary_started
+            name = order[next_index]
+            next_index += 1
+            self._stats[name].calls += 1
+            tasks[asyncio.create_task(attempt(name))] = (name, time.monotonic(), is_hedge)
+            if not is_hedge:
+                primary, primary_started = name, time.monotonic()
+
+        launch()
+        try:
+            while tasks:
+                timeout = None
+                if hedge and not hedged and next_index < len(order) and len(tasks) == 1 and self._can_hedge():
+                    timeout = max(0.0, self.hedge_delay(primary) - (time.monotonic() - primary_started))
+
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # The primary is slower than usual; race a second provider
+                    hedged = True
+                    self.hedges += 1
+                    HEDGES.inc("launched")
+                    launch(is_hedge=True)
+                    logger.info(f"{self.label}Hedging {primary} with {order[next_index - 1]}")
+                    continue
+
+                for task in done:
+                    name, started, is_hedge = tasks.pop(task)
+                    try:
+                        result = task.result()
+                    except CircuitOpenError as e:
+                        # Refused without trying; the breaker already knows
+                        PROVIDER_CALLS.inc(name, "rejected")
+                        last_error = e
+                        continue
+                    except Exception as e:
+                        self._failed(name, e)
+                        last_error = e
+                        continue
+                    self._succeeded(name, time.monotonic() - started)
+                    if is_hedge:
+                        self.hedge_wins += 1
+                        HEDGES.inc("won")
+                    return result
+
+                if not tasks and next_index < len(order):
+                    self.failovers += 1
+                    logger.warning(f"{self.label}Failing over to {order[next_index]} after {last_error!r}")
+                    launch()
+            raise last_error
+        finally:
+            for task, (name, started, _) in tasks.items():
+                if task.done() and not task.cancelled() and task.exception() is None:
+                    if discard:
+                        discard(task.result())
+                else:
+                    task.cancel()
+                    self._abandoned(name, time.monotonic() - started)
+
+    def health(self) -> Dict[tuple, float]:
+        return {(name,): 1 if stats.healthy else 0 for name, stats in self._stats.items()}
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "providers": {name: stats.to_dict() for name, stats in self._stats.items()},
+        }
+
+
+def provider_list(env_var: str, default: str) -> List[str]:
+    """Comma-separated provider names from the environment"""
+    return [name.strip() for name in os.getenv(env_var, default).split(",") if name.strip()]
+
+
+def create_router(providers: Sequence[str], label: str = "") -> ProviderRouter:
+    """Router with JUDGE_HEDGE / JUDGE_HEDGE_* settings from the environment"""
+    router = ProviderRouter(
+        providers,
+        hedge=os.getenv("JUDGE_HEDGE", "1") == "1",
+        hedge_quantile=float(os.getenv("JUDGE_HEDGE_QUANTILE", "0.95")),
+        min_hedge_delay=float(os.getenv("JUDGE_HEDGE_MIN_DELAY", "0.25")),
+        max_hedge_ratio=float(os.getenv("JUDGE_HEDGE_MAX_RATIO", "0.2")),
+        label=label,
+    )
+    _routers.add(router)
+    return router
+
+
+_routers: "weakref.WeakSet[ProviderRouter]" = weakref.WeakSet()
+
+
+def _provider_health() -> Dict[tuple, float]:
+    # A provider shared by several routers counts as down if any marked it down
+    health: Dict[tuple, float] = {}
+    for router in list(_routers):
+        for labels, value in router.health().items():
+            health[labels] = min(value, health.get(labels, 1))
+    return health
+
+
+gauge("judge_provider_healthy", "1 while a provider is being routed to", _provider_health, ["provider"])
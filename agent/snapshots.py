@@ -0,0 +1,170 @@
+"""
+Room state snapshots for warm restarts
+Each judge's room assignment and conversation memory is kept in a local
+SQLite file (WAL mode, so writes append to the log). Only rooms whose state
+changed since the last pass are written, one row per room, so the cost does
+not grow with the number of idle rooms. On startup the saved rooms are
+re-spawned concurrently and pick their memory back up.
+
+Workers of the supervisor share one file; SQLite's locking keeps their
+writes apart.
+"""
+
+import os
+import json
+import asyncio
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger("snapshots")
+logger.setLevel(logging.INFO)
+
+DEFAULT_SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".judge_state.db")
+
+
+class SnapshotStore:
+    """One row of JSON state per room code"""
+
+    def __init__(self, path: str, max_age: float = 6 * 3600):
+        self.path = path
+        self.max_age = max_age
+        self._db: Optional[sqlite3.Connection] = None
+        # sqlite3 connections are used from one thread at a time
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshots")
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS rooms ("
+                "room_code TEXT PRIMARY KEY, state TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+        return self._db
+
+    async def _run(self, fn: Callable, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _save(self, states: Dict[str, dict]):
+        now = time.time()
+        rows = [(code, json.dumps(state, separators=(",", ":")), now) for code, state in states.items()]
+        with self._connect() as db:
+            db.executemany(
+                "INSERT INTO rooms (room_code, state, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(room_code) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+                rows,
+            )
+
+    def _delete(self, codes: List[str]):
+        with self._connect() as db:
+            db.executemany("DELETE FROM rooms WHERE room_code = ?", [(code,) for code in codes])
+
+    def _load(self, code: str) -> Optional[dict]:
+        row = self._connect().execute(
+            "SELECT state FROM rooms WHERE room_code = ? AND updated_at >= ?",
+            (code, time.time() - self.max_age),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _room_codes(self) -> List[str]:
+        with self._connect() as db:
+            # Rooms nobody has touched in max_age are games that ended
+            db.execute("DELETE FROM rooms WHERE updated_at < ?", (time.time() - self.max_age,))
+            return [code for (code,) in db.execute("SELECT room_code FROM rooms ORDER BY updated_at DESC")]
+
+    async def save(self, states: Dict[str, dict]):
+        if states:
+            await self._run(self._save, states)
+
+    async def delete(self, codes: Iterable[str]):
+        codes = list(codes)
+        if codes:
+            await self._run(self._delete, codes)
+
+    async def load(self, code: str) -> Optional[dict]:
+        """Saved state for a room, or None if there is none (or it's stale)"""
+        return await self._run(self._load, code)
+
+    async def room_codes(self) -> List[str]:
+        """Rooms to restore, most recently active first"""
+        return await self._run(self._room_codes)
+
+    def close(self):
+        if self._db is not None:
+            self._executor.submit(self._db.close).result()
+            self._db = None
+        self._executor.shutdown(wait=False)
+
+
+class RoomSnapshotter:
+    """Periodically writes the rooms whose state changed"""
+
+    def __init__(self, store: SnapshotStore, get_agents: Callable[[], Dict[str, object]], interval: float = 5.0):
+        self.store = store
+        self.get_agents = get_agents
+        self.interval = interval
+        self._saved: Dict[str, int] = {}  # room code -> state version last written
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.writes = 0
+        self.rows_written = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                try:
+                    await self.flush()
+                except Exception as e:
+                    logger.error(f"Snapshot write failed: {e!r}")
+        except asyncio.CancelledError:
+            pass
+
+    async def flush(self):
+        """Write every room that changed since it was last saved"""
+        async with self._lock:
+            changed = {
+                code: agent
+                for code, agent in self.get_agents().items()
+                if self._saved.get(code) != agent.state_version
+            }
+            if not changed:
+                return
+            versions = {code: agent.state_version for code, agent in changed.items()}
+            await self.store.save({code: agent.snapshot() for code, agent in changed.items()})
+            self._saved.update(versions)
+            self.writes += 1
+            self.rows_written += len(changed)
+
+    def mark_saved(self, code: str, version: int):
+        """A room was just restored with this state; no need to write it back"""
+        self._saved[code] = version
+
+    async def forget(self, code: str):
+        """The room is gone for good; drop its snapshot"""
+        self._saved.pop(code, None)
+        await self.store.delete([code])
+
+    def stats(self) -> Dict[str, int]:
+        return {"rooms": len(self._saved), "writes": self.writes, "rows_written": self.rows_written}
+
+
+def create_snapshot_store() -> Optional[SnapshotStore]:
+    """Store at SNAPSHOT_PATH (empty disables snapshots)"""
+    path = os.getenv("SNAPSHOT_PATH", DEFAULT_SNAPSHOT_PATH)
+    if not path:
+        return None
+    return SnapshotStore(path, max_age=float(os.getenv("SNAPSHOT_MAX_AGE", str(6 * 3600))))
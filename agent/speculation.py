@@ -0,0 +1,238 @@
+"""
+Speculative judge replies during push-to-talk
+While a player still holds the button, the judge drafts a reply from the
+partial transcript. On end_turn the draft is used if the final transcript
+is close enough to what it was drafted from; otherwise it is cancelled and
+the reply is generated normally. Only latency after release is saved, so
+that is what the stats report. SessionSpeculation reports the same numbers
+for an AgentSession's own preemptive generation, read from its metrics.
+"""
+
+import asyncio
+import difflib
+import logging
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("speculation")
+logger.setLevel(logging.INFO)
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def similarity(a: str, b: str) -> float:
+    """Word-level similarity between two transcripts (0..1)"""
+    a_words, b_words = _words(a), _words(b)
+    if not a_words and not b_words:
+        return 1.0
+    return difflib.SequenceMatcher(None, a_words, b_words, autojunk=False).ratio()
+
+
+class _Draft:
+    def __init__(self, text: str, task: asyncio.Task):
+        self.text = text
+        self.task = task
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        task.add_done_callback(lambda _: setattr(self, "finished", time.monotonic()))
+
+
+class Speculator:
+    """Drafts one reply at a time from a speaker's partial transcript"""
+
+    def __init__(
+        self,
+        draft: Callable[[str], Awaitable[Optional[str]]],
+        match_threshold: float = 0.85,
+        min_words: int = 4,
+        poll_interval: float = 0.25,
+        min_redraft_interval: float = 1.0,
+        max_drafts: int = 3,
+        latency_samples: int = 200,
+    ):
+        self.draft = draft
+        self.match_threshold = match_threshold
+        self.min_words = min_words
+        self.poll_interval = poll_interval
+        self.min_redraft_interval = min_redraft_interval
+        self.max_drafts = max_drafts
+
+        self._watcher: Optional[asyncio.Task] = None
+        self._current: Optional[_Draft] = None
+        self._drafts_this_turn = 0
+
+        self.turns = 0
+        self.drafts = 0
+        self.hits = 0
+        self.misses = 0
+        self.cancelled = 0
+        self._saved: Deque[float] = deque(maxlen=latency_samples)
+
+    def start(self, partial: Callable[[], str]):
+        """Begin watching a new turn's partial transcript"""
+        self._reset()
+        self._drafts_this_turn = 0
+        self._watcher = asyncio.create_task(self._watch(partial))
+
+    async def _watch(self, partial: Callable[[], str]):
+        last_launch = 0.0
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            text = partial()
+            if len(_words(text)) < self.min_words:
+                continue
+            if self._current and similarity(self._current.text, text) >= self.match_threshold:
+                continue
+            if self._drafts_this_turn >= self.max_drafts:
+                continue
+            if time.monotonic() - last_launch < self.min_redraft_interval:
+                continue
+
+            self._drop_draft()
+            self._current = _Draft(text, asyncio.create_task(self.draft(text)))
+            self._drafts_this_turn += 1
+            self.drafts += 1
+            last_launch = time.monotonic()
+
+    def _drop_draft(self):
+        if self._current:
+            self._current.task.cancel()
+            self._current = None
+
+    def _reset(self):
+        if self._watcher:
+            self._watcher.cancel()
+            self._watcher = None
+        self._drop_draft()
+
+    async def resolve(self, final_text: str) -> Optional[str]:
+        """Return the drafted reply if it still fits the final transcript"""
+        released = time.monotonic()
+        draft = self._current
+        self._current = None
+        if self._watcher:
+            self._watcher.cancel()
+            self._watcher = None
+        self.turns += 1
+
+        if draft is None:
+            return None
+        if similarity(draft.text, final_text) < self.match_threshold:
+            draft.task.cancel()
+            self.misses += 1
+            return None
+
+        try:
+            answer = await draft.task
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Speculative draft failed: {e!r}")
+            answer = None
+
+        if not answer:
+            self.misses += 1
+            return None
+
+        # Without the draft the same call would have started at release
+        finished = draft.finished or time.monotonic()
+        self._saved.append(max(0.0, released + (finished - draft.started) - max(released, finished)))
+        self.hits += 1
+        return answer
+
+    def cancel(self):
+        """Drop the turn's speculation (player cancelled)"""
+        if self._watcher or self._current:
+            self.cancelled += 1
+        self._reset()
+
+    def stats(self) -> Dict[str, float]:
+        resolved = self.hits + self.misses
+        saved = sorted(self._saved)
+        return {
+            "turns": self.turns,
+            "drafts": self.drafts,
+            "hits": self.hits,
+            "misses": self.misses,
+            "cancelled": self.cancelled,
+            "hit_rate": round(self.hits / resolved, 3) if resolved else 0.0,
+            "saved_avg_ms": round(sum(saved) / len(saved) * 1000, 1) if saved else 0.0,
+            "saved_p50_ms": round(saved[len(saved) // 2] * 1000, 1) if saved else 0.0,
+        }
+
+
+class SessionSpeculation:
+    """Hit rate and saved latency of an AgentSession's preemptive generation
+
+    The session names the speech that answers a committed turn in its
+    eou_metrics, and its llm_metrics say when that speech's LLM request ran.
+    A request that started before the turn was committed was the preemptive
+    draft; the part of it that ran before then is the latency saved.
+    """
+
+    def __init__(self, latency_samples: int = 200, max_pending: int = 32):
+        self.max_pending = max_pending
+        self._released_at: Optional[float] = None
+        # speech_id -> (started, finished) of LLM requests not yet matched to a turn
+        self._requests: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        # speech_id -> release time of turns whose LLM request hasn't reported
+        self._replies: "OrderedDict[str, float]" = OrderedDict()
+
+        self.turns = 0
+        self.hits = 0
+        self.misses = 0
+        self._saved: Deque[float] = deque(maxlen=latency_samples)
+
+    def released(self):
+        """The floor holder let go; their turn is being committed"""
+        self._released_at = time.time()
+
+    def on_metrics(self, ev: Any):
+        """metrics_collected handler"""
+        m = ev.metrics
+        if not getattr(m, "speech_id", None):
+            return
+        if m.type == "llm_metrics" and not m.cancelled:
+            request = (m.timestamp - m.duration, m.timestamp)
+            released = self._replies.pop(m.speech_id, None)
+            if released is None:
+                self._remember(self._requests, m.speech_id, request)
+            else:
+                self._resolve(request, released)
+        elif m.type == "eou_metrics" and self._released_at is not None:
+            released, self._released_at = self._released_at, None
+            request = self._requests.pop(m.speech_id, None)
+            if request is None:
+                self._remember(self._replies, m.speech_id, released)
+            else:
+                self._resolve(request, released)
+
+    def _remember(self, pending: OrderedDict, speech_id: str, value):
+        pending[speech_id] = value
+        # Requests that never answer a turn (dropped drafts) age out
+        while len(pending) > self.max_pending:
+            pending.popitem(last=False)
+
+    def _resolve(self, request: Tuple[float, float], released: float):
+        started, finished = request
+        self.turns += 1
+        if started < released:
+            self.hits += 1
+            self._saved.append(min(finished, released) - started)
+        else:
+            self.misses += 1
+
+    def stats(self) -> Dict[str, float]:
+        saved = sorted(self._saved)
+        return {
+            "turns": self.turns,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / self.turns, 3) if self.turns else 0.0,
+            "saved_avg_ms": round(sum(saved) / len(saved) * 1000, 1) if saved else 0.0,
+            "saved_p50_ms": round(saved[len(saved) // 2] * 1000, 1) if saved else 0.0,
+        }
@@ -0,0 +1,338 @@
+"""
+Speech-to-text for the lightweight judges
+On start_turn the judge reads the speaker's microphone (subscribed by the
+room's AudioSubscriptions, see subscriptions.py) and streams frames into an
+incremental STT backend, keeping partial transcripts.
+On end_turn the text is already mostly there; finishing just waits a short
+budget for the backend's last words.
+
+Backends:
+- vosk:     offline, runs locally (pip install vosk, set VOSK_MODEL_PATH)
+- deepgram: cloud streaming (set DEEPGRAM_API_KEY)
+"""
+
+import os
+import abc
+import json
+import asyncio
+import logging
+import threading
+from typing import List, Optional
+
+import aiohttp
+from livekit import rtc
+
+logger = logging.getLogger("stt")
+logger.setLevel(logging.INFO)
+
+SAMPLE_RATE = 16000
+
+
+class STTStream(abc.ABC):
+    """One utterance being transcribed"""
+
+    def __init__(self):
+        self.finals: List[str] = []
+        self.partial = ""
+
+    @property
+    def text(self) -> str:
+        return " ".join(part for part in self.finals + [self.partial] if part).strip()
+
+    @abc.abstractmethod
+    async def push(self, pcm: bytes):
+        """Feed one chunk of 16-bit mono PCM"""
+
+    @abc.abstractmethod
+    async def finish(self, timeout: float) -> str:
+        """Flush the backend and return the final text"""
+
+    async def close(self):
+        pass
+
+
+class STTBackend(abc.ABC):
+    """Factory for per-utterance streams"""
+
+    name = "none"
+
+    @abc.abstractmethod
+    async def create_stream(self, sample_rate: int) -> STTStream:
+        """A new stream for one utterance"""
+
+    async def close(self):
+        pass
+
+
+class VoskSTT(STTBackend):
+    """Offline recognizer; no keys or network needed"""
+
+    name = "vosk"
+
+    def __init__(self, model_path: str):
+        import vosk  # noqa: F401 - fail early if the package is missing
+
+        self.model_path = model_path
+        self._model = None
+        self._lock = asyncio.Lock()
+
+    async def _load_model(self):
+        async with self._lock:
+            if self._model is None:
+                import vosk
+                logger.info(f"Loading Vosk model from {self.model_path}")
+                loop = asyncio.get_running_loop()
+                self._model = await loop.run_in_executor(None, vosk.Model, self.model_path)
+        return self._model
+
+    async def create_stream(self, sample_rate: int) -> STTStream:
+        import vosk
+        model = await self._load_model()
+        return VoskStream(vosk.KaldiRecognizer(model, sample_rate), sample_rate)
+
+
+class VoskStream(STTStream):
+    # Decode in ~200ms chunks so the executor hop isn't paid per 10ms frame
+    CHUNK_SECONDS = 0.2
+
+    def __init__(self, recognizer, sample_rate: int):
+        super().__init__()
+        self._recognizer = recognizer
+        # A cancelled push can still be decoding in the executor
+        self._lock = threading.Lock()
+        self._buffer = bytearray()
+        self._chunk_bytes = int(sample_rate * self.CHUNK_SECONDS) * 2
+
+    def _accept(self, pcm: bytes):
+        with self._lock:
+            self._accept_locked(pcm)
+
+    def _accept_locked(self, pcm: bytes):
+        if self._recognizer.AcceptWaveform(pcm):
+            text = json.loads(self._recognizer.Result()).get("text", "")
+            if text:
+                self.finals.append(text)
+            self.partial = ""
+        else:
+            self.partial = json.loads(self._recognizer.PartialResult()).get("partial", "")
+
+    async def push(self, pcm: bytes):
+        self._buffer.extend(pcm)
+        if len(self._buffer) >= self._chunk_bytes:
+            chunk = bytes(self._buffer)
+            self._buffer.clear()
+            await asyncio.get_running_loop().run_in_executor(None, self._accept, chunk)
+
+    async def finish(self, timeout: float) -> str:
+        def flush():
+            with self._lock:
+                if self._buffer:
+                    self._recognizer.AcceptWaveform(bytes(self._buffer))
+                    self._buffer.clear()
+                text = json.loads(self._recognizer.FinalResult()).get("text", "")
+                if text:
+                    self.finals.append(text)
+                self.partial = ""
+
+        try:
+            await asyncio.wait_for(asyncio.get_running_loop().run_in_executor(None, flush), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Vosk flush timed out, using partial transcript")
+        return self.text
+
+
+class DeepgramSTT(STTBackend):
+    """Deepgram live streaming with interim results"""
+
+    name = "deepgram"
+    URL = "wss://api.deepgram.com/v1/listen"
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def create_stream(self, sample_rate: int) -> STTStream:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        ws = await self._session.ws_connect(
+            self.URL,
+            params={
+                "encoding": "linear16",
+                "sample_rate": str(sample_rate),
+                "channels": "1",
+                "interim_results": "true",
+                "punctuate": "true",
+            },
+            headers={"Authorization": f"Token {self.api_key}"},
+        )
+        return DeepgramStream(ws)
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+
+class DeepgramStream(STTStream):
+    def __init__(self, ws: aiohttp.ClientWebSocketResponse):
+        super().__init__()
+        self._ws = ws
+        self._reader = asyncio.create_task(self._read())
+
+    async def _read(self):
+        async for message in self._ws:
+            if message.type != aiohttp.WSMsgType.TEXT:
+                continue
+            data = json.loads(message.data)
+            if data.get("type") != "Results":
+                continue
+            alternatives = data.get("channel", {}).get("alternatives") or [{}]
+            transcript = alternatives[0].get("transcript", "")
+            if data.get("is_final"):
+                if transcript:
+                    self.finals.append(transcript)
+                self.partial = ""
+            else:
+                self.partial = transcript
+
+    async def push(self, pcm: bytes):
+        if not self._ws.closed:
+            await self._ws.send_bytes(pcm)
+
+    async def finish(self, timeout: float) -> str:
+        try:
+            if not self._ws.closed:
+                await self._ws.send_str(json.dumps({"type": "CloseStream"}))
+            await asyncio.wait_for(asyncio.shield(self._reader), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Deepgram flush timed out, using partial transcript")
+        except Exception as e:
+            logger.error(f"Deepgram finish error: {e!r}")
+        await self.close()
+        return self.text
+
+    async def close(self):
+        self._reader.cancel()
+        await self._ws.close()
+
+
+_backend: Optional[STTBackend] = None
+_backend_loaded = False
+
+
+def get_stt_backend() -> Optional[STTBackend]:
+    """Return the process-wide backend, or None if STT is unavailable"""
+    global _backend, _backend_loaded
+    if not _backend_loaded:
+        _backend = create_stt_backend()
+        _backend_loaded = True
+        logger.info(f"Speech-to-text backend: {_backend.name if _backend else 'none'}")
+    return _backend
+
+
+def create_stt_backend() -> Optional[STTBackend]:
+    """Pick a backend from STT_BACKEND, or the best available one"""
+    choice = os.getenv("STT_BACKEND", "auto").lower()
+
+    if choice in ("deepgram", "auto") and os.getenv("DEEPGRAM_API_KEY"):
+        return DeepgramSTT(os.getenv("DEEPGRAM_API_KEY"))
+
+    if choice in ("vosk", "auto") and os.getenv("VOSK_MODEL_PATH"):
+        try:
+            return VoskSTT(os.getenv("VOSK_MODEL_PATH"))
+        except ImportError:
+            logger.warning("Vosk not installed (pip install vosk); speech-to-text disabled")
+
+    return None
+
+
+async def wait_for_audio_track(room: rtc.Room, identity: str, timeout: float = 5.0) -> Optional[rtc.Track]:
+    """Wait for a participant's microphone track to be subscribed
+
+    Subscribing is left to AudioSubscriptions; this only waits for the track.
+    """
+    loop = asyncio.get_running_loop()
+    found: asyncio.Future = loop.create_future()
+
+    def on_subscribed(track, publication, participant):
+        if participant.identity == identity and track.kind == rtc.TrackKind.KIND_AUDIO and not found.done():
+            found.set_result(track)
+
+    room.on("track_subscribed", on_subscribed)
+    try:
+        participant = room.remote_participants.get(identity)
+        if participant:
+            for publication in participant.track_publications.values():
+                if publication.kind == rtc.TrackKind.KIND_AUDIO and publication.track:
+                    return publication.track
+        return await asyncio.wait_for(found, timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"No microphone track from {identity}")
+        return None
+    finally:
+        room.off("track_subscribed", on_subscribed)
+
+
+class SpeakerTranscriber:
+    """Transcribes whoever currently holds push-to-talk in one room"""
+
+    def __init__(self, backend: Optional[STTBackend], finish_timeout: float = 0.3):
+        self.backend = backend
+        self.finish_timeout = finish_timeout
+        self.speaker: Optional[str] = None
+        self._room: Optional[rtc.Room] = None
+        self._stream: Optional[STTStream] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def partial(self) -> str:
+        return self._stream.text if self._stream else ""
+
+    async def start(self, room: rtc.Room, identity: str):
+        """Begin transcribing a new speaker"""
+        await self.cancel()
+        if not self.backend:
+            return
+        self.speaker = identity
+        self._room = room
+        self._task = asyncio.create_task(self._run(room, identity))
+
+    async def _run(self, room: rtc.Room, identity: str):
+        try:
+            track = await wait_for_audio_track(room, identity)
+            if track is None:
+                return
+
+            self._stream = await self.backend.create_stream(SAMPLE_RATE)
+            audio = rtc.AudioStream(track, sample_rate=SAMPLE_RATE, num_channels=1)
+            try:
+                async for event in audio:
+                    await self._stream.push(event.frame.data.tobytes())
+            finally:
+                await audio.aclose()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Transcription error for {identity}: {e!r}")
+
+    async def _halt(self) -> Optional[STTStream]:
+        task, stream = self._task, self._stream
+        self._task = self._stream = None
+        if task:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        # The room's AudioSubscriptions decides when the track is dropped
+        self.speaker = None
+        return stream
+
+    async def stop(self) -> str:
+        """End the turn and return the final transcript"""
+        stream = await self._halt()
+        if stream is None:
+            return ""
+        return await stream.finish(self.finish_timeout)
+
+    async def cancel(self):
+        """Drop the current turn without finishing it"""
+        stream = await self._halt()
+        if stream:
+            await stream.close()
@@ -0,0 +1,218 @@
+"""
+Selective audio subscription for the judges
+A judge only needs the push-to-talk speaker's microphone, but a room that
+subscribes to everyone receives and decodes every player's Opus stream all
+game long. Each room instead subscribes to:
+
+- the floor holder, from start_turn until the judge has answered them (so a
+  quick second press continues without re-subscribing)
+- a small warm set: the next players in the turn queue, so their start_turn
+  finds the track already flowing
+
+Everyone else stays unsubscribed. The room's inbound RTP stats are sampled
+every few seconds while anything is subscribed, and again before tracks are
+dropped, so bytes received and seconds of audio decoded are counted per room
+even for tracks that are gone.
+
+Decoding runs inside the LiveKit FFI library's own threads, so its CPU time
+can't be split out per room from Python. Seconds of audio decoded stand in
+for it: Opus decode cost grows linearly with the audio decoded, so
+decoded_audio_s (and bytes_received for the network side) is what to compare
+between rooms and against a subscribe-to-everyone baseline.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, Iterable, Optional, Set
+
+from livekit import rtc
+
+from metrics import REGISTRY, Counter
+
+logger = logging.getLogger("subscriptions")
+logger.setLevel(logging.INFO)
+
+AUDIO_BYTES = REGISTRY.register(Counter(
+    "judge_audio_bytes_received_total", "Inbound audio RTP bytes",
+))
+AUDIO_DECODED = REGISTRY.register(Counter(
+    "judge_audio_decoded_seconds_total", "Seconds of inbound audio decoded",
+))
+SUBSCRIPTIONS = REGISTRY.register(Counter(
+    "judge_audio_subscriptions_total", "Microphone subscriptions by reason", ["reason"],
+))
+
+
+def _audio_publications(participant) -> Iterable[rtc.RemoteTrackPublication]:
+    for publication in getattr(participant, "track_publications", {}).values():
+        if publication.kind == rtc.TrackKind.KIND_AUDIO:
+            yield publication
+
+
+class AudioSubscriptions:
+    """Keeps one room subscribed to the floor holder plus a warm set"""
+
+    def __init__(
+        self,
+        get_room: Callable[[], Optional[rtc.Room]],
+        warm_size: int = 1,
+        label: str = "",
+        sample_interval: float = 10.0,
+    ):
+        self.get_room = get_room
+        self.warm_size = warm_size
+        self.label = label
+        self.sample_interval = sample_interval
+        self._sampler: Optional[asyncio.Task] = None
+        self.active: Optional[str] = None
+        self.warm: Set[str] = set()
+        self._attached: Optional[rtc.Room] = None
+
+        # Inbound stream id -> last (bytes, decoded seconds) seen
+        self._seen: Dict[str, tuple] = {}
+        self._subscribed_since: Dict[str, float] = {}
+        self.bytes_received = 0
+        self.decoded_seconds = 0.0
+        self.subscribed_seconds = 0.0
+        self.subscribes = 0
+        self.unsubscribes = 0
+        self.warm_hits = 0
+        self.cold_starts = 0
+
+    @property
+    def wanted(self) -> Set[str]:
+        return self.warm | ({self.active} if self.active else set())
+
+    def _attach(self, room: rtc.Room):
+        # Rooms are replaced on reconnect; follow the current one
+        if self._attached is not room:
+            room.on("track_published", self._on_track_published)
+            self._attached = room
+            self._subscribed_since.clear()
+            self._seen.clear()
+        if self._sampler is None and self.sample_interval > 0:
+            self._sampler = asyncio.create_task(self._sample_loop())
+
+    async def _sample_loop(self):
+        # Keeps the per-room counters moving while tracks stay subscribed
+        while True:
+            await asyncio.sleep(self.sample_interval)
+            if self._subscribed_since:
+                await self.sample()
+
+    def _on_track_published(self, publication, participant):
+        if participant.identity in self.wanted and publication.kind == rtc.TrackKind.KIND_AUDIO:
+            publication.set_subscribed(True)
+
+    def _subscribe(self, room: rtc.Room, identity: str, reason: str):
+        participant = room.remote_participants.get(identity)
+        if participant is None:
+            return
+        for publication in _audio_publications(participant):
+            if not publication.subscribed:
+                publication.set_subscribed(True)
+        if identity not in self._subscribed_since:
+            self._subscribed_since[identity] = time.monotonic()
+            self.subscribes += 1
+            SUBSCRIPTIONS.inc(reason)
+
+    def _unsubscribe(self, room: rtc.Room, identity: str):
+        since = self._subscribed_since.pop(identity, None)
+        if since is not None:
+            self.subscribed_seconds += time.monotonic() - since
+            self.unsubscribes += 1
+        participant = room.remote_participants.get(identity)
+        if participant is None:
+            return
+        for publication in _audio_publications(participant):
+            if publication.subscribed:
+                publication.set_subscribed(False)
+
+    def update(self, active: Optional[str], upcoming: Iterable[str]):
+        """Subscribe to the holder and the next few players, drop the rest"""
+        room = self.get_room()
+        if room is None:
+            return
+        self._attach(room)
+        if active and active != self.active:
+            # Did the new speaker's track come from the warm set?
+            if active in self._subscribed_since:
+                self.warm_hits += 1
+            else:
+                self.cold_starts += 1
+        self.active = active
+        self.warm = {identity for identity in list(upcoming)[:self.warm_size] if identity != active}
+
+        wanted = self.wanted
+        for identity in wanted:
+            self._subscribe(room, identity, "active" if identity == active else "warm")
+        dropped = [identity for identity in self._subscribed_since if identity not in wanted]
+        if dropped:
+            # Count their traffic before the inbound streams disappear
+            self._sample_then_drop(room, dropped)
+
+    def _sample_then_drop(self, room: rtc.Room, dropped: Iterable[str]):
+        async def run():
+            await self.sample()
+            for identity in dropped:
+                if identity not in self.wanted:
+                    self._unsubscribe(room, identity)
+
+        asyncio.create_task(run())
+
+    async def sample(self):
+        """Add inbound audio since the last sample to the room's totals"""
+        room = self.get_room()
+        if room is None or not hasattr(room, "get_rtc_stats"):
+            return
+        try:
+            stats = await room.get_rtc_stats()
+        except Exception as e:
+            logger.debug(f"{self.label}RTC stats unavailable: {e!r}")
+            return
+
+        for report in stats.subscriber_stats:
+            if report.WhichOneof("stats") != "inbound_rtp":
+                continue
+            inbound = report.inbound_rtp
+            if inbound.stream.kind != "audio":
+                continue
+            key = inbound.rtc.id
+            total_bytes = inbound.inbound.bytes_received
+            decoded = inbound.inbound.total_samples_duration
+            last_bytes, last_decoded = self._seen.get(key, (0, 0.0))
+            # Counters restart when a track is re-subscribed
+            new_bytes = total_bytes - last_bytes if total_bytes >= last_bytes else total_bytes
+            new_decoded = decoded - last_decoded if decoded >= last_decoded else decoded
+            self._seen[key] = (total_bytes, decoded)
+            self.bytes_received += new_bytes
+            self.decoded_seconds += new_decoded
+            AUDIO_BYTES.inc(amount=new_bytes)
+            AUDIO_DECODED.inc(amount=new_decoded)
+
+    def clear(self):
+        """Drop every subscription (the judge is leaving)"""
+        if self._sampler:
+            self._sampler.cancel()
+            self._sampler = None
+        room = self.get_room()
+        for identity in list(self._subscribed_since):
+            if room is not None:
+                self._unsubscribe(room, identity)
+        self.active = None
+        self.warm = set()
+
+    def stats(self) -> Dict[str, object]:
+        now = time.monotonic()
+        subscribed = self.subscribed_seconds + sum(now - since for since in self._subscribed_since.values())
+        return {
+            "subscribed": sorted(self._subscribed_since),
+            "bytes_received": self.bytes_received,
+            "decoded_audio_s": round(self.decoded_seconds, 1),
+            "subscribed_track_s": round(subscribed, 1),
+            "subscribes": self.subscribes,
+            "unsubscribes": self.unsubscribes,
+            "warm_hits": self.warm_hits,
+            "cold_starts": self.cold_starts,
+        }
@@ -0,0 +1,320 @@
+"""
+Supervisor mode - shards rooms across worker processes
+Each worker runs its own AgentManager and event loop. Room codes are mapped
+to workers by consistent hashing, and a worker that dies is restarted while
+its rooms are re-homed onto the surviving workers.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import logging
+import multiprocessing as mp
+import queue
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger("supervisor")
+logger.setLevel(logging.INFO)
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes"""
+
+    def __init__(self, replicas: int = 64):
+        self.replicas = replicas
+        self._keys: List[int] = []
+        self._nodes: Dict[int, int] = {}
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int(hashlib.md5(key.encode("utf-8")).hexdigest()[:16], 16)
+
+    def add(self, node: int):
+        for replica in range(self.replicas):
+            key = self._hash(f"{node}#{replica}")
+            if key not in self._nodes:
+                bisect.insort(self._keys, key)
+            self._nodes[key] = node
+
+    def remove(self, node: int):
+        for replica in range(self.replicas):
+            key = self._hash(f"{node}#{replica}")
+            if self._nodes.get(key) == node:
+                del self._nodes[key]
+                self._keys.remove(key)
+
+    def get(self, room_code: str) -> Optional[int]:
+        """Return the worker that owns a room code"""
+        if not self._keys:
+            return None
+        index = bisect.bisect(self._keys, self._hash(room_code)) % len(self._keys)
+        return self._nodes[self._keys[index]]
+
+
+def _worker_main(worker_id: int, commands: mp.Queue, events: mp.Queue):
+    """Process entrypoint for one worker"""
+    try:
+        asyncio.run(_run_worker(worker_id, commands, events))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _run_worker(worker_id: int, commands: mp.Queue, events: mp.Queue):
+    """Run an AgentManager and apply commands sent by the supervisor"""
+    from multi_agent import AgentManager
+    from http_client import close_host_client
+    from metrics import metrics_port, start_metrics_server
+
+    manager = AgentManager()
+    # Rooms can also leave on their own (idle reaper, lost connection)
+    manager.on_removed = lambda room_code: events.put(("removed", worker_id, room_code))
+    # Each worker serves its own rooms' metrics on METRICS_PORT + worker_id + 1
+    port = metrics_port(worker_id + 1)
+    metrics_runner = await start_metrics_server(port) if port else None
+    loop = asyncio.get_running_loop()
+    pending = set()
+
+    async def spawn(room_code: str):
+        await manager.spawn_agent(room_code)
+        status = "spawned" if room_code in manager.agents else "failed"
+        events.put((status, worker_id, room_code))
+
+    logger.info(f"[worker {worker_id}] Ready")
+    while True:
+        command, room_code = await loop.run_in_executor(None, commands.get)
+
+        if command == "spawn":
+            task = asyncio.create_task(spawn(room_code))
+        elif command == "remove":
+            task = asyncio.create_task(manager.remove_agent(room_code))
+        elif command == "stop":
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            await manager.shutdown()
+            await close_host_client()
+            if metrics_runner:
+                await metrics_runner.cleanup()
+            break
+        else:
+            continue
+
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+
+@dataclass
+class WorkerHandle:
+    process: mp.Process
+    commands: mp.Queue
+    restarts: int = 0
+    started_at: float = 0.0
+    restart_at: Optional[float] = None
+
+
+class Supervisor:
+    """Runs N worker processes and routes rooms to them"""
+
+    def __init__(self, num_workers: int, check_interval: float = 1.0, max_restart_delay: float = 30.0):
+        self.num_workers = num_workers
+        self.check_interval = check_interval
+        self.max_restart_delay = max_restart_delay
+        self.ctx = mp.get_context("spawn")
+        self.events = self.ctx.Queue()
+        self.ring = HashRing()
+        self.workers: Dict[int, WorkerHandle] = {}
+        self.assignments: Dict[str, int] = {}
+        self._monitor_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start all workers and the health monitor"""
+        for worker_id in range(self.num_workers):
+            self._start_worker(worker_id)
+        self._monitor_task = asyncio.create_task(self._monitor())
+
+    def _start_worker(self, worker_id: int, restarts: int = 0):
+        commands = self.ctx.Queue()
+        process = self.ctx.Process(
+            target=_worker_main,
+            args=(worker_id, commands, self.events),
+            name=f"judge-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        self.workers[worker_id] = WorkerHandle(process, commands, restarts, time.monotonic())
+        self.ring.add(worker_id)
+        logger.info(f"Started worker {worker_id} (pid {process.pid})")
+
+    def spawn_agent(self, room_code: str):
+        """Assign a room to its worker and spawn an agent there"""
+        room_code = room_code.upper()
+
+        if room_code in self.assignments:
+            logger.info(f"Agent already exists for room {room_code}")
+            return
+
+        worker_id = self.ring.get(room_code)
+        if worker_id is None:
+            logger.error(f"No live workers to host room {room_code}")
+            return
+
+        self.assignments[room_code] = worker_id
+        self.workers[worker_id].commands.put(("spawn", room_code))
+
+    def remove_agent(self, room_code: str):
+        """Remove the agent for a room from whichever worker hosts it"""
+        room_code = room_code.upper()
+        worker_id = self.assignments.pop(room_code, None)
+
+        if worker_id is not None and worker_id in self.workers:
+            self.workers[worker_id].commands.put(("remove", room_code))
+
+        logger.info(f"Removed agent for room: {room_code}")
+
+    def list_agents(self) -> List[Tuple[str, int]]:
+        """List (room code, worker id) for every assigned room"""
+        return sorted(self.assignments.items())
+
+    async def _monitor(self):
+        """Restart dead workers and re-home their rooms"""
+        try:
+            while True:
+                await asyncio.sleep(self.check_interval)
+                self._drain_events()
+
+                now = time.monotonic()
+                for worker_id, handle in list(self.workers.items()):
+                    if handle.process.is_alive():
+                        continue
+                    if handle.restart_at is None:
+                        self._recover_worker(worker_id, handle)
+                    elif now >= handle.restart_at:
+                        # Rooms stay where they were re-homed; only new
+                        # rooms hash to the replacement worker
+                        self._start_worker(worker_id, restarts=handle.restarts + 1)
+        except asyncio.CancelledError:
+            pass
+
+    def _drain_events(self):
+        while True:
+            try:
+                status, worker_id, room_code = self.events.get_nowait()
+            except queue.Empty:
+                return
+
+            if status == "spawned" and worker_id in self.workers:
+                # A quick remove-then-spawn can report the removal after we re-assigned
+                self.assignments.setdefault(room_code, worker_id)
+            elif status == "failed" and self.assignments.get(room_code) == worker_id:
+                # Let the operator retry instead of keeping a phantom room
+                del self.assignments[room_code]
+                logger.error(f"❌ Worker {worker_id} failed to spawn room: {room_code}")
+            elif status == "removed" and self.assignments.get(room_code) == worker_id:
+                del self.assignments[room_code]
+                logger.info(f"Worker {worker_id} released room: {room_code}")
+
+    def _recover_worker(self, worker_id: int, handle: WorkerHandle):
+        logger.error(f"Worker {worker_id} died (exit code {handle.process.exitcode})")
+
+        # Re-home rooms onto the surviving workers first, so games recover
+        # without waiting for the replacement process to boot
+        self.ring.remove(worker_id)
+        orphans = [code for code, owner in self.assignments.items() if owner == worker_id]
+        for room_code in orphans:
+            del self.assignments[room_code]
+            self.spawn_agent(room_code)
+        if orphans:
+            logger.info(f"Re-homed {len(orphans)} room(s) from worker {worker_id}")
+
+        # Back off when a worker keeps crashing right after it starts
+        if time.monotonic() - handle.started_at > 60:
+            handle.restarts = 0
+        delay = min(2 ** handle.restarts, self.max_restart_delay)
+        handle.restart_at = time.monotonic() + delay
+        logger.info(f"Restarting worker {worker_id} in {delay:.0f}s")
+
+    async def stop(self, timeout: float = 10.0):
+        """Stop every worker, disconnecting all of their agents"""
+        if self._monitor_task:
+            self._monitor_task.cancel()
+
+        for handle in self.workers.values():
+            handle.commands.put(("stop", None))
+
+        loop = asyncio.get_running_loop()
+        for handle in self.workers.values():
+            await loop.run_in_executor(None, handle.process.join, timeout)
+            if handle.process.is_alive():
+                handle.process.terminate()
+
+        self.assignments.clear()
+
+
+async def supervisor_mode(num_workers: int):
+    """Interactive mode backed by a pool of worker processes"""
+    supervisor = Supervisor(num_workers)
+    supervisor.start()
+
+    # Workers pick each room's memory back up from the shared snapshot file
+    from snapshots import create_snapshot_store
+    store = create_snapshot_store()
+    if store:
+        codes = await store.room_codes()
+        store.close()
+        for room_code in codes:
+            supervisor.spawn_agent(room_code)
+        if codes:
+            print(f"Restoring {len(codes)} room(s) from the last run")
+
+    print("\n" + "="*60)
+    print(f"🎮 SuperMafia Multi-Agent Supervisor ({num_workers} workers)")
+    print("="*60)
+    print("\nCommands:")
+    print("  spawn <CODE>  - Spawn agent for room code (e.g., spawn ABC123)")
+    print("  list          - List all active agents")
+    print("  remove <CODE> - Remove agent for room")
+    print("  quit          - Exit")
+    print("="*60 + "\n")
+
+    while True:
+        try:
+            cmd = await asyncio.get_event_loop().run_in_executor(
+                None,
+                input,
+                "🤖 > "
+            )
+
+            parts = cmd.strip().split()
+            if not parts:
+                continue
+
+            command = parts[0].lower()
+
+            if command == "spawn" and len(parts) > 1:
+                supervisor.spawn_agent(parts[1])
+
+            elif command == "list":
+                agents = supervisor.list_agents()
+                if agents:
+                    print("Active agents: " + ", ".join(f"{code} (worker {worker})" for code, worker in agents))
+                else:
+                    print("No active agents")
+
+            elif command == "remove" and len(parts) > 1:
+                supervisor.remove_agent(parts[1])
+
+            elif command in ["quit", "exit"]:
+                print("Shutting down all workers...")
+                await supervisor.stop()
+                break
+
+            else:
+                print("Unknown command. Type 'spawn <CODE>', 'list', 'remove <CODE>', or 'quit'")
+
+        except KeyboardInterrupt:
+            print("\nShutting down...")
+            await supervisor.stop()
+            break
+        except Exception as e:
+            logger.error(f"Error: {e}")
@@ -0,0 +1,141 @@
+import asyncio
+import time
+
+import pytest
+
+from admission import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    AdmissionController,
+    CircuitBreaker,
+    CircuitOpenError,
+    Deadline,
+    Overloaded,
+)
+
+
+def test_deadline_counts_down():
+    deadline = Deadline(0.05)
+    assert 0 < deadline.remaining() <= 0.05 and not deadline.expired
+    time.sleep(0.06)
+    assert deadline.remaining() == 0 and deadline.expired
+
+
+def test_busy_room_is_shed_without_waiting():
+    async def main():
+        admission = AdmissionController(global_limit=4, room_limit=1)
+        async with admission.admit("ROOM"):
+            with pytest.raises(Overloaded) as shed:
+                async with admission.try_admit("ROOM"):
+                    pass
+            assert shed.value.reason == "room_busy"
+            # Other rooms still get in
+            async with admission.try_admit("OTHER"):
+                assert admission.in_flight == 2
+        assert admission.stats()["shed"] == {"room_busy": 1}
+        assert admission._rooms == {}
+
+    asyncio.run(main())
+
+
+def test_waiter_gets_the_slot_when_it_frees_up():
+    async def main():
+        admission = AdmissionController(global_limit=1, room_limit=1, max_wait=1.0)
+        order = []
+
+        async def reply(name, hold):
+            async with admission.admit("ROOM"):
+                order.append(name)
+                await asyncio.sleep(hold)
+
+        await asyncio.gather(reply("first", 0.02), reply("second", 0))
+        assert order == ["first", "second"]
+        assert admission.admitted == 2
+
+    asyncio.run(main())
+
+
+def test_global_limit_sheds_after_max_wait():
+    async def main():
+        admission = AdmissionController(global_limit=1, room_limit=2, max_wait=0.02)
+        async with admission.admit("A"):
+            started = time.monotonic()
+            with pytest.raises(Overloaded) as shed:
+                async with admission.admit("B"):
+                    pass
+            assert shed.value.reason == "global_busy"
+            assert time.monotonic() - started < 0.5
+
+    asyncio.run(main())
+
+
+def test_full_queue_and_expired_deadline_are_shed():
+    async def main():
+        admission = AdmissionController(global_limit=1, room_limit=1, max_queue=0)
+        async with admission.admit("A"):
+            with pytest.raises(Overloaded) as shed:
+                async with admission.admit("A"):
+                    pass
+            assert shed.value.reason == "queue_full"
+
+        with pytest.raises(Overloaded) as shed:
+            async with admission.admit("A", deadline=Deadline(0)):
+                pass
+        assert shed.value.reason == "deadline"
+
+    asyncio.run(main())
+
+
+def test_breaker_opens_fails_fast_and_recovers():
+    async def main():
+        breaker = CircuitBreaker("host", failure_threshold=2, reset_timeout=0.02)
+
+        async def call(error=None):
+            async with breaker.guard():
+                if error:
+                    raise error
+                return "ok"
+
+        for _ in range(2):
+            with pytest.raises(OSError):
+                await call(OSError("down"))
+        assert breaker.state == OPEN
+
+        with pytest.raises(CircuitOpenError):
+            await call()
+        assert breaker.rejected == 1
+
+        await asyncio.sleep(0.03)
+        assert breaker.allow() and breaker.state == HALF_OPEN
+        # Only one probe at a time
+        assert not breaker.allow()
+        breaker.success()
+        assert breaker.state == CLOSED
+        assert await call() == "ok"
+
+    asyncio.run(main())
+
+
+def test_failed_probe_reopens_and_ignored_errors_dont_count():
+    async def main():
+        breaker = CircuitBreaker("host", failure_threshold=1, reset_timeout=0.01,
+                                 is_failure=lambda e: not isinstance(e, ValueError))
+
+        async def call(error):
+            async with breaker.guard():
+                raise error
+
+        with pytest.raises(ValueError):
+            await call(ValueError("bad request"))
+        assert breaker.state == CLOSED
+
+        with pytest.raises(OSError):
+            await call(OSError("down"))
+        assert breaker.state == OPEN
+        await asyncio.sleep(0.02)
+        with pytest.raises(OSError):
+            await call(OSError("still down"))
+        assert breaker.state == OPEN and breaker.opened == 2
+
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+import asyncio
+from types import SimpleNamespace
+
+from livekit import api, rtc
+
+from discovery import RoomDiscovery, is_player
+from tokens import JUDGE_IDENTITY
+
+
+class FakeManager:
+    def __init__(self, hosted=()):
+        self.agents = {code: object() for code in hosted}
+        self.spawned = []
+        self.removed = []
+
+    async def spawn_agent(self, room_code):
+        self.agents[room_code] = object()
+        self.spawned.append(room_code)
+        return True
+
+    async def remove_agent(self, room_code):
+        self.agents.pop(room_code, None)
+        self.removed.append(room_code)
+        return True
+
+
+def discovery(manager, rooms, **kwargs):
+    async def source():
+        return dict(rooms)
+
+    return RoomDiscovery(manager, source, **kwargs)
+
+
+def test_spawns_rooms_with_players_only():
+    async def main():
+        manager = FakeManager()
+        assert await discovery(manager, {"ABCD": 2, "EMPTY": 0}).poll_once()
+        assert manager.spawned == ["ABCD"]
+
+    asyncio.run(main())
+
+
+def test_hosted_room_with_one_player_is_kept():
+    async def main():
+        manager = FakeManager(hosted=["ABCD"])
+        rooms = {"ABCD": 1}
+        watcher = discovery(manager, rooms)
+        for _ in range(5):
+            assert not await watcher.poll_once()
+        assert manager.removed == [] and manager.spawned == []
+
+    asyncio.run(main())
+
+
+def test_empty_room_is_left_to_the_idle_reaper():
+    async def main():
+        manager = FakeManager(hosted=["ABCD"])
+        watcher = discovery(manager, {"ABCD": 0}, missing_polls=1)
+        for _ in range(5):
+            await watcher.poll_once()
+        assert manager.removed == []
+
+    asyncio.run(main())
+
+
+def test_vanished_room_is_reaped_after_consecutive_misses():
+    async def main():
+        manager = FakeManager(hosted=["ABCD"])
+        rooms = {}
+        watcher = discovery(manager, rooms, missing_polls=3)
+
+        assert not await watcher.poll_once()
+        assert not await watcher.poll_once()
+        # Seen again: the count starts over
+        rooms["ABCD"] = 1
+        assert not await watcher.poll_once()
+        del rooms["ABCD"]
+        assert not await watcher.poll_once()
+        assert not await watcher.poll_once()
+        assert manager.removed == []
+
+        assert await watcher.poll_once()
+        assert manager.removed == ["ABCD"]
+        assert not watcher._missing
+
+    asyncio.run(main())
+
+
+def test_failed_spawn_waits_before_retrying():
+    async def main():
+        manager = FakeManager()
+
+        async def refuse(room_code):
+            manager.spawned.append(room_code)
+            return False
+
+        manager.spawn_agent = refuse
+        watcher = discovery(manager, {"ABCD": 1}, retry_delay=60)
+        await watcher.poll_once()
+        await watcher.poll_once()
+        assert manager.spawned == ["ABCD"]
+
+    asyncio.run(main())
+
+
+def test_judge_and_agents_are_not_players():
+    standard = api.ParticipantInfo.Kind.STANDARD
+    agent = api.ParticipantInfo.Kind.AGENT
+    assert is_player(SimpleNamespace(identity="alice", kind=standard))
+    assert not is_player(SimpleNamespace(identity=JUDGE_IDENTITY, kind=standard))
+    assert not is_player(SimpleNamespace(identity="voice-judge", kind=agent))
+
+
+def test_room_participants_are_filtered_the_same_way():
+    # AgentManager's presence check sees rtc participants, not API listings
+    assert not is_player(SimpleNamespace(identity="voice-judge", kind=rtc.ParticipantKind.PARTICIPANT_KIND_AGENT))
+    assert is_player(SimpleNamespace(identity="bob", kind=rtc.ParticipantKind.PARTICIPANT_KIND_STANDARD))
+    # Fakes without a kind count as players
+    assert is_player(SimpleNamespace(identity="bob"))
@@ -0,0 +1,23 @@
+import pytest
+
+from http_client import _check_answer
+from routing import ProviderError
+
+
+def test_answer_from_the_requested_provider_passes():
+    event = {"answer": "Order.", "provider": "baseten"}
+    assert _check_answer("baseten", event) is event
+    assert _check_answer("baseten", {"answer": "Order."})
+    assert _check_answer(None, {"answer": "Order.", "provider": "janitorai"})
+
+
+@pytest.mark.parametrize("answered_by", ["janitorai", "mock", "fallback", "janitorai-error"])
+def test_answer_from_anyone_else_is_a_provider_error(answered_by):
+    with pytest.raises(ProviderError) as error:
+        _check_answer("baseten", {"answer": "Order.", "provider": answered_by})
+    assert error.value.provider == "baseten"
+
+
+def test_canned_answer_without_a_requested_provider_is_an_error():
+    with pytest.raises(ProviderError):
+        _check_answer(None, {"answer": "The game continues.", "provider": "fallback"})
@@ -0,0 +1,54 @@
+from memory import RoomMemory, estimate_tokens
+
+
+def context_tokens(context):
+    tokens = sum(estimate_tokens(player) + estimate_tokens(text) for player, text in context.get("earlierStatements", {}).items())
+    tokens += sum(estimate_tokens(s["player"]) + estimate_tokens(s["text"]) for s in context.get("recentStatements", []))
+    return tokens
+
+
+def test_old_turns_fold_into_a_summary():
+    memory = RoomMemory(turns_per_player=2)
+    memory.add_turn("alice", "I was at the docks. Nobody saw me.")
+    memory.add_turn("alice", "Bob is lying.")
+    memory.add_turn("alice", "Vote Bob.")
+
+    assert memory.recent_turns("alice") == ["Bob is lying.", "Vote Bob."]
+    assert memory.summary("alice") == "I was at the docks."
+    assert memory.turn_count == 3
+
+
+def test_blank_statements_are_ignored():
+    memory = RoomMemory()
+    memory.add_turn("alice", "   ")
+    assert memory.turn_count == 0 and memory.players == []
+
+
+def test_summary_stays_within_its_size():
+    memory = RoomMemory(turns_per_player=1, summary_chars=40)
+    for i in range(20):
+        memory.add_turn("alice", f"Statement number {i} about the night.")
+    assert len(memory.summary("alice")) <= 40
+    assert memory.summary("alice").endswith("Statement number 18 about the night.")
+
+
+def test_context_fits_the_token_budget_newest_first():
+    memory = RoomMemory(turns_per_player=50)
+    for i in range(50):
+        memory.add_turn(f"player{i % 5}", f"This is statement {i}, and it is fairly long on purpose.")
+
+    context = memory.build_context({"round": 2}, token_budget=100)
+    assert context["round"] == 2
+    assert context_tokens(context) <= 100
+
+    statements = [s["text"] for s in context["recentStatements"]]
+    assert statements[-1] == "This is statement 49, and it is fairly long on purpose."
+    # Chronological order in the prompt
+    assert statements == sorted(statements, key=lambda text: int(text.split()[3].rstrip(",")))
+
+
+def test_render_lists_summaries_then_recent_statements():
+    memory = RoomMemory(turns_per_player=1)
+    memory.add_turn("alice", "First.")
+    memory.add_turn("alice", "Second.")
+    assert memory.render() == "Earlier, alice: First.\nalice: Second."
@@ -0,0 +1,55 @@
+import json
+import os
+
+from outbound import FLAG_CHUNKED, FLAG_DEFLATE, MAGIC, Reassembler, encode_batch, packetize
+
+MESSAGES = [
+    {"type": "judge_response_delta", "seq": 1, "text": "The court"},
+    {"type": "judge_response_delta", "seq": 2, "text": " is in session."},
+]
+
+
+def test_small_batch_round_trip():
+    packets = packetize(encode_batch(MESSAGES), message_id=1)
+    assert len(packets) == 1
+    assert packets[0][0] == MAGIC and packets[0][1] == 0
+    assert Reassembler().feed(packets[0]) == MESSAGES
+
+
+def test_long_batch_is_deflated():
+    messages = [{"type": "judge_response", "text": "Order in the court. " * 200}]
+    packets = packetize(encode_batch(messages), message_id=2, compress_threshold=1024)
+    assert len(packets) == 1
+    assert packets[0][1] & FLAG_DEFLATE
+    assert len(packets[0]) < len(encode_batch(messages))
+    assert Reassembler().feed(packets[0]) == messages
+
+
+def test_oversized_batch_is_chunked_and_reassembled_in_any_order():
+    # Random text doesn't compress, so it has to be split
+    messages = [{"type": "blob", "data": os.urandom(20000).hex()}]
+    packets = packetize(encode_batch(messages), message_id=7, max_packet=15000)
+    assert len(packets) > 1
+    assert all(len(packet) <= 15000 and packet[1] & FLAG_CHUNKED for packet in packets)
+
+    reassembler = Reassembler()
+    results = [reassembler.feed(packet) for packet in reversed(packets)]
+    assert results[:-1] == [[]] * (len(packets) - 1)
+    assert results[-1] == messages
+
+
+def test_chunks_from_different_senders_are_kept_apart():
+    messages = [{"type": "blob", "data": os.urandom(20000).hex()}]
+    packets = packetize(encode_batch(messages), message_id=3, max_packet=15000)
+    reassembler = Reassembler()
+
+    for packet in packets[:-1]:
+        assert reassembler.feed(packet, sender="alice") == []
+        assert reassembler.feed(packet, sender="bob") == []
+    assert reassembler.feed(packets[-1], sender="alice") == messages
+    assert reassembler.feed(packets[-1], sender="bob") == messages
+
+
+def test_plain_json_passes_through():
+    packet = json.dumps({"type": "turn_queue", "depth": 0}).encode("utf-8")
+    assert Reassembler().feed(packet) == [{"type": "turn_queue", "depth": 0}]
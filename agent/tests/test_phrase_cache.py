@@ -0,0 +1,59 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from phrase_cache import PhraseCache
+
+LINE = "The Judge has entered."
+
+
+class FakeTTS:
+    """Renders 10ms of silence per phrase, counting calls"""
+
+    def __init__(self):
+        self.rendered = []
+
+    def synthesize(self, text):
+        self.rendered.append(text)
+
+        class Stream:
+            async def collect(self):
+                return SimpleNamespace(sample_rate=16000, num_channels=1, data=b"\0\0" * 160)
+
+            async def aclose(self):
+                pass
+
+        return Stream()
+
+
+def test_first_use_renders_and_later_caches_load_from_disk(tmp_path):
+    async def main():
+        tts = FakeTTS()
+        cache = PhraseCache("openai::alloy", str(tmp_path), tts=tts)
+        audio = await cache.get(LINE)
+        assert audio.duration == pytest.approx(0.01)
+        assert await cache.get(LINE) is audio
+        assert tts.rendered == [LINE]
+
+        # A new worker process finds it on disk without any TTS client
+        warm = PhraseCache("openai::alloy", str(tmp_path))
+        warm.load([LINE])
+        assert warm.missing([LINE]) == []
+        assert (await warm.get(LINE)).pcm == audio.pcm
+        assert warm.stats()["hits"] == 1
+
+    asyncio.run(main())
+
+
+def test_audio_is_only_reused_for_the_same_voice(tmp_path):
+    async def main():
+        await PhraseCache("openai::alloy", str(tmp_path), tts=FakeTTS()).get(LINE)
+
+        other = PhraseCache("cartesia::", str(tmp_path))
+        assert other.missing([LINE]) == [LINE]
+        # No client yet, so the miss can't be filled
+        with pytest.raises(RuntimeError):
+            await other.get(LINE)
+
+    asyncio.run(main())
@@ -0,0 +1,193 @@
+import asyncio
+import gc
+
+from response_cache import ResponseCache
+
+PAYLOAD = {"question": "Who is lying?", "gameContext": {"round": 1}}
+
+
+class SlowFetch:
+    """Answers after `delay`, streaming `deltas` first; records starts and cancellations"""
+
+    def __init__(self, answer="Nobody.", delay=0.05, error=None, cleanup_error=None, deltas=()):
+        self.answer = answer
+        self.delay = delay
+        self.deltas = deltas
+        self.error = error
+        self.cleanup_error = cleanup_error
+        self.started = 0
+        self.cancelled = 0
+
+    async def __call__(self, emit):
+        self.started += 1
+        try:
+            for delta in self.deltas:
+                await asyncio.sleep(self.delay / (len(self.deltas) + 1))
+                emit(delta)
+            await asyncio.sleep(self.delay / (len(self.deltas) + 1))
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            if self.cleanup_error:
+                raise self.cleanup_error
+            raise
+        if self.error:
+            raise self.error
+        return self.answer
+
+
+def test_identical_calls_share_one_fetch():
+    async def main():
+        cache, fetch = ResponseCache(), SlowFetch()
+        answers = await asyncio.gather(*(cache.get_or_fetch(PAYLOAD, fetch) for _ in range(3)))
+        assert answers == ["Nobody."] * 3
+        assert fetch.started == 1
+        assert cache.coalesced == 2
+        assert await cache.get_or_fetch(PAYLOAD, fetch) == "Nobody."
+        assert cache.hits == 1
+
+    asyncio.run(main())
+
+
+def test_fetch_is_cancelled_when_the_last_waiter_leaves():
+    async def main():
+        cache, fetch = ResponseCache(), SlowFetch()
+        first = asyncio.create_task(cache.get_or_fetch(PAYLOAD, fetch))
+        second = asyncio.create_task(cache.get_or_fetch(PAYLOAD, fetch))
+        await asyncio.sleep(0.01)
+
+        first.cancel()
+        await asyncio.sleep(0.01)
+        assert fetch.cancelled == 0
+
+        second.cancel()
+        await asyncio.sleep(0.01)
+        assert fetch.cancelled == 1
+        assert cache.peek(PAYLOAD) is None
+        assert not cache._in_flight
+
+    asyncio.run(main())
+
+
+def test_remaining_waiter_still_gets_the_answer():
+    async def main():
+        cache, fetch = ResponseCache(), SlowFetch()
+        leaving = asyncio.create_task(cache.get_or_fetch(PAYLOAD, fetch))
+        staying = asyncio.create_task(cache.get_or_fetch(PAYLOAD, fetch))
+        await asyncio.sleep(0.01)
+        leaving.cancel()
+
+        assert await staying == "Nobody."
+        assert fetch.cancelled == 0
+        assert cache.peek(PAYLOAD) == "Nobody."
+
+    asyncio.run(main())
+
+
+def test_abandoned_fetch_failure_is_not_left_unretrieved():
+    unhandled = []
+
+    async def main():
+        asyncio.get_running_loop().set_exception_handler(lambda _, context: unhandled.append(context))
+        cache = ResponseCache()
+        # Fails while being cancelled, after its only waiter timed out
+        fetch = SlowFetch(cleanup_error=RuntimeError("connection reset"))
+        try:
+            await asyncio.wait_for(cache.get_or_fetch(PAYLOAD, fetch), 0.005)
+        except asyncio.TimeoutError:
+            pass
+        await asyncio.sleep(0.01)
+        assert fetch.cancelled == 1
+        assert cache.peek(PAYLOAD) is None
+
+    asyncio.run(main())
+    gc.collect()
+    assert unhandled == []
+
+
+def test_failed_fetch_reaches_every_waiter_and_is_not_cached():
+    async def main():
+        cache, fetch = ResponseCache(), SlowFetch(error=RuntimeError("upstream down"))
+        results = await asyncio.gather(
+            *(cache.get_or_fetch(PAYLOAD, fetch) for _ in range(2)), return_exceptions=True
+        )
+        assert [type(result) for result in results] == [RuntimeError, RuntimeError]
+        assert fetch.started == 1
+        assert cache.peek(PAYLOAD) is None
+
+    asyncio.run(main())
+
+
+class Room:
+    """Collects the deltas handed to on_delta"""
+
+    def __init__(self):
+        self.deltas = []
+
+    async def on_delta(self, delta, seq):
+        self.deltas.append((seq, delta))
+
+
+DELTAS = ("No", "bo", "dy.")
+STREAMED = [(1, "No"), (2, "bo"), (3, "dy.")]
+
+
+def test_streamed_fetch_is_shared_and_fanned_out():
+    async def main():
+        cache, fetch = ResponseCache(), SlowFetch(deltas=DELTAS)
+        rooms = [Room() for _ in range(3)]
+        answers = await asyncio.gather(
+            *(cache.get_or_fetch(PAYLOAD, fetch, on_delta=room.on_delta) for room in rooms)
+        )
+        assert answers == ["Nobody."] * 3
+        assert fetch.started == 1 and cache.coalesced == 2
+        assert all(room.deltas == STREAMED for room in rooms)
+        stats = cache.stats()
+        assert stats["coalesced_p50_ms"] > 0 and stats["uncached_p50_ms"] > 0
+
+    asyncio.run(main())
+
+
+def test_late_joiner_gets_the_deltas_it_missed():
+    async def main():
+        cache, fetch = ResponseCache(), SlowFetch(deltas=DELTAS, delay=0.08)
+        early, late = Room(), Room()
+        first = asyncio.create_task(cache.get_or_fetch(PAYLOAD, fetch, on_delta=early.on_delta))
+        await asyncio.sleep(0.05)
+        assert len(early.deltas) >= 2
+
+        assert await cache.get_or_fetch(PAYLOAD, fetch, on_delta=late.on_delta) == "Nobody."
+        assert await first == "Nobody."
+        assert early.deltas == late.deltas == STREAMED
+        assert fetch.started == 1
+
+    asyncio.run(main())
+
+
+def test_cancelled_streaming_waiter_leaves_the_others_streaming():
+    async def main():
+        cache, fetch = ResponseCache(), SlowFetch(deltas=DELTAS, delay=0.08)
+        leaving, staying = Room(), Room()
+        gone = asyncio.create_task(cache.get_or_fetch(PAYLOAD, fetch, on_delta=leaving.on_delta))
+        kept = asyncio.create_task(cache.get_or_fetch(PAYLOAD, fetch, on_delta=staying.on_delta))
+        await asyncio.sleep(0.03)
+        gone.cancel()
+
+        assert await kept == "Nobody."
+        assert staying.deltas == STREAMED
+        assert len(leaving.deltas) < 3
+        assert fetch.cancelled == 0
+        assert cache.peek(PAYLOAD) == "Nobody."
+        assert not cache._in_flight
+
+    asyncio.run(main())
+
+
+def test_streaming_after_the_answer_is_cached_skips_the_deltas():
+    async def main():
+        cache, fetch = ResponseCache(), SlowFetch(deltas=DELTAS)
+        await cache.get_or_fetch(PAYLOAD, fetch, on_delta=Room().on_delta)
+        room = Room()
+        assert await cache.get_or_fetch(PAYLOAD, fetch, on_delta=room.on_delta) == "Nobody."
+        assert room.deltas == [] and fetch.started == 1
+
+    asyncio.run(main())
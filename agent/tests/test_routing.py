@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+from routing import ProviderRouter
+
+
+class Upstreams:
+    """attempt(provider) with a per-provider delay or error"""
+
+    def __init__(self, **behaviour):
+        self.behaviour = behaviour
+        self.started = []
+        self.cancelled = []
+
+    async def __call__(self, provider):
+        self.started.append(provider)
+        delay, error = self.behaviour[provider]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(provider)
+            raise
+        if error:
+            raise error
+        return f"answer from {provider}"
+
+
+def router(*providers, **options):
+    options.setdefault("initial_hedge_delay", 0.05)
+    return ProviderRouter(providers, **options)
+
+
+def test_fast_primary_is_not_hedged():
+    async def main():
+        upstreams = Upstreams(a=(0.0, None), b=(0.0, None))
+        routing = router("a", "b")
+        assert await routing.call(upstreams) == "answer from a"
+        assert upstreams.started == ["a"]
+        assert routing.hedges == 0
+
+    asyncio.run(main())
+
+
+def test_slow_primary_is_hedged_and_the_loser_cancelled():
+    async def main():
+        upstreams = Upstreams(a=(1.0, None), b=(0.0, None))
+        routing = router("a", "b")
+        assert await routing.call(upstreams) == "answer from b"
+        await asyncio.sleep(0)
+
+        assert upstreams.started == ["a", "b"]
+        assert upstreams.cancelled == ["a"]
+        stats = routing.stats()
+        assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+        assert stats["providers"]["a"]["errors"] == 0
+
+    asyncio.run(main())
+
+
+def test_hedging_can_be_turned_off_per_call():
+    async def main():
+        upstreams = Upstreams(a=(0.1, None), b=(0.0, None))
+        routing = router("a", "b")
+        assert await routing.call(upstreams, hedge=False) == "answer from a"
+        assert upstreams.started == ["a"]
+
+    asyncio.run(main())
+
+
+def test_failed_primary_fails_over():
+    async def main():
+        upstreams = Upstreams(a=(0.0, OSError("down")), b=(0.0, None))
+        routing = router("a", "b")
+        assert await routing.call(upstreams) == "answer from b"
+        stats = routing.stats()
+        assert stats["failovers"] == 1
+        assert stats["providers"]["a"]["errors"] == 1
+
+    asyncio.run(main())
+
+
+def test_last_error_is_raised_when_every_provider_fails():
+    async def main():
+        upstreams = Upstreams(a=(0.0, OSError("a down")), b=(0.0, ValueError("b down")))
+        with pytest.raises(ValueError):
+            await router("a", "b").call(upstreams)
+
+    asyncio.run(main())
+
+
+def test_provider_marked_down_goes_last():
+    async def main():
+        upstreams = Upstreams(a=(0.0, OSError("down")), b=(0.0, None))
+        routing = router("a", "b", max_errors=2, cooldown=60)
+        for _ in range(2):
+            await routing.call(upstreams)
+        assert routing.ranked() == ["b", "a"]
+
+        upstreams.started.clear()
+        await routing.call(upstreams)
+        assert upstreams.started == ["b"]
+
+    asyncio.run(main())
+
+
+def test_result_that_lost_the_race_is_discarded():
+    async def main():
+        answered = asyncio.Event()
+        discarded = []
+
+        async def attempt(provider):
+            if provider == "a":
+                # Finishes in the same loop turn as the hedge
+                await answered.wait()
+            else:
+                answered.set()
+            return f"stream from {provider}"
+
+        routing = router("a", "b", initial_hedge_delay=0.01)
+        result = await routing.call(attempt, discard=discarded.append)
+        assert sorted([result] + discarded) == ["stream from a", "stream from b"]
+
+    asyncio.run(main())
+
+
+def test_single_provider_never_hedges():
+    async def main():
+        upstreams = Upstreams(a=(0.1, None))
+        routing = router("a")
+        assert await routing.call(upstreams) == "answer from a"
+        assert routing.hedges == 0
+
+    asyncio.run(main())
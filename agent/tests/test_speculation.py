@@ -0,0 +1,153 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from speculation import SessionSpeculation, Speculator, similarity
+
+
+class Drafter:
+    """Drafts answer after `delay`, remembering what it was asked"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.asked = []
+
+    async def __call__(self, text):
+        self.asked.append(text)
+        await asyncio.sleep(self.delay)
+        return f"About: {text}"
+
+
+def speculator(drafter, **options):
+    return Speculator(drafter, min_words=3, poll_interval=0.005, min_redraft_interval=0.0, **options)
+
+
+async def wait_for_draft(spec, count=1):
+    for _ in range(100):
+        if spec.drafts >= count:
+            return
+        await asyncio.sleep(0.005)
+    raise AssertionError("no draft started")
+
+
+def test_similarity():
+    assert similarity("Bob is the wolf", "bob is the wolf!") == 1.0
+    assert similarity("Bob is the wolf", "Alice saved me last night") < 0.5
+    assert similarity("", "") == 1.0
+
+
+def test_matching_draft_is_used():
+    async def main():
+        drafter = Drafter()
+        spec = speculator(drafter)
+        spec.start(lambda: "I think Bob is the wolf")
+        await wait_for_draft(spec)
+
+        assert await spec.resolve("I think Bob is the wolf") == "About: I think Bob is the wolf"
+        stats = spec.stats()
+        assert stats["hits"] == 1 and stats["hit_rate"] == 1.0
+        assert drafter.asked == ["I think Bob is the wolf"]
+
+    asyncio.run(main())
+
+
+def test_draft_that_no_longer_fits_is_dropped():
+    async def main():
+        spec = speculator(Drafter(delay=1.0))
+        spec.start(lambda: "I think Bob is the wolf")
+        await wait_for_draft(spec)
+        draft = spec._current.task
+
+        assert await spec.resolve("Actually Alice saved me last night") is None
+        await asyncio.sleep(0)
+        assert draft.cancelled()
+        assert spec.stats()["misses"] == 1
+
+    asyncio.run(main())
+
+
+def test_short_partials_are_not_drafted():
+    async def main():
+        spec = speculator(Drafter())
+        spec.start(lambda: "Bob is")
+        await asyncio.sleep(0.03)
+        assert spec.drafts == 0
+        assert await spec.resolve("Bob is") is None
+
+    asyncio.run(main())
+
+
+def test_saved_latency_counts_only_time_after_release():
+    async def main():
+        spec = speculator(Drafter(delay=0.05))
+        spec.start(lambda: "I think Bob is the wolf")
+        await wait_for_draft(spec)
+        await asyncio.sleep(0.02)
+
+        assert await spec.resolve("I think Bob is the wolf")
+        saved = spec.stats()["saved_avg_ms"]
+        # The draft ran ~50ms, ~20ms+ of it before release
+        assert 10 < saved < 50
+
+    asyncio.run(main())
+
+
+def test_cancel_stops_the_turn():
+    async def main():
+        spec = speculator(Drafter(delay=1.0))
+        spec.start(lambda: "I think Bob is the wolf")
+        await wait_for_draft(spec)
+        spec.cancel()
+        assert spec.stats()["cancelled"] == 1
+        assert await spec.resolve("I think Bob is the wolf") is None
+
+    asyncio.run(main())
+
+
+def llm_metrics(speech_id, started, finished, cancelled=False):
+    return SimpleNamespace(metrics=SimpleNamespace(
+        type="llm_metrics", speech_id=speech_id, timestamp=finished,
+        duration=finished - started, cancelled=cancelled,
+    ))
+
+
+def eou_metrics(speech_id):
+    return SimpleNamespace(metrics=SimpleNamespace(type="eou_metrics", speech_id=speech_id))
+
+
+def test_session_preemptive_draft_counts_as_a_hit():
+    spec = SessionSpeculation()
+    now = time.time()
+    # The draft ran for 300ms, finishing 100ms after release
+    spec.on_metrics(llm_metrics("speech_a", now - 0.2, now + 0.1))
+    spec.released()
+    spec._released_at = now
+    spec.on_metrics(eou_metrics("speech_a"))
+
+    stats = spec.stats()
+    assert stats["hits"] == 1 and stats["hit_rate"] == 1.0
+    assert 190 < stats["saved_avg_ms"] < 210
+
+
+def test_session_reply_started_after_release_is_a_miss():
+    spec = SessionSpeculation()
+    spec.released()
+    spec.on_metrics(eou_metrics("speech_b"))
+    assert spec.turns == 0
+    now = time.time()
+    spec.on_metrics(llm_metrics("speech_b", now + 0.01, now + 0.5))
+
+    stats = spec.stats()
+    assert stats["turns"] == 1 and stats["misses"] == 1 and stats["hit_rate"] == 0.0
+
+
+def test_session_dropped_drafts_are_not_turns():
+    spec = SessionSpeculation(max_pending=2)
+    now = time.time()
+    for n in range(4):
+        spec.on_metrics(llm_metrics(f"draft_{n}", now - 1, now - 0.5))
+    spec.on_metrics(llm_metrics("cancelled", now - 1, now, cancelled=True))
+    # An eou without a commit (no release) is ignored too
+    spec.on_metrics(eou_metrics("draft_3"))
+    assert spec.turns == 0
+    assert list(spec._requests) == ["draft_2", "draft_3"]
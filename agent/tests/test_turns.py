@@ -0,0 +1,135 @@
+import asyncio
+
+from turns import GRANTED, IDLE, PRIORITY_HOST, RESPONDING, SPEAKING, TurnScheduler
+
+
+def run(body, **options):
+    """TurnScheduler arms its timers on the running loop"""
+
+    async def main():
+        scheduler = TurnScheduler(**options)
+        try:
+            await body(scheduler)
+        finally:
+            scheduler.close()
+
+    asyncio.run(main())
+
+
+def queue(turns):
+    return [waiting["identity"] for waiting in turns.snapshot()["queue"]]
+
+
+def test_first_press_takes_the_floor_and_others_queue():
+    async def body(turns):
+        assert turns.request("alice").granted
+        decision = turns.request("bob")
+        assert not decision.granted and decision.position == 1
+        assert turns.request("carol").position == 2
+        assert queue(turns) == ["bob", "carol"]
+
+    run(body)
+
+
+def test_press_while_answered_continues_the_same_turn():
+    async def body(turns):
+        turns.request("alice")
+        assert turns.finish("alice")
+        assert turns.phase == RESPONDING
+
+        decision = turns.request("alice")
+        assert decision.granted and decision.coalesced
+        assert turns.phase == SPEAKING
+        assert turns.stats()["coalesced"] == 1
+
+    run(body)
+
+
+def test_press_after_the_coalesce_window_queues():
+    async def body(turns):
+        turns.request("alice")
+        turns.finish("alice")
+        await asyncio.sleep(0.02)
+
+        decision = turns.request("alice")
+        assert not decision.granted and decision.position == 1
+        assert turns.phase == RESPONDING
+
+    run(body, coalesce_window=0.01)
+
+
+def test_host_preempts_a_player_but_not_the_reverse():
+    async def body(turns):
+        turns.request("alice")
+        turns.request("bob")
+
+        decision = turns.request("host", PRIORITY_HOST)
+        assert decision.granted and decision.preempted == "alice"
+        assert turns.holder == "host" and turns.phase == SPEAKING
+        assert turns.stats()["preemptions"] == 1
+
+        assert not turns.request("alice").granted
+        assert queue(turns) == ["bob", "alice"]
+
+    run(body)
+
+
+def test_preempting_player_leaves_the_queue():
+    async def body(turns):
+        turns.request("alice")
+        assert turns.request("host").position == 1
+        assert turns.request("host", PRIORITY_HOST).preempted == "alice"
+        assert queue(turns) == []
+
+    run(body)
+
+
+def test_no_preemption_rule_queues_the_host():
+    async def body(turns):
+        turns.request("alice")
+        assert not turns.request("host", PRIORITY_HOST).granted
+        assert turns.holder == "alice"
+
+    run(body, preempt="none")
+
+
+def test_reply_done_grants_the_next_player():
+    granted = []
+
+    async def body(turns):
+        turns.request("alice")
+        turns.request("bob")
+        turns.finish("alice")
+        turns.reply_done("alice")
+
+        assert turns.holder == "bob" and turns.phase == GRANTED
+        assert granted == ["bob"]
+        assert turns.request("bob").granted
+        assert turns.phase == SPEAKING
+
+        turns.finish("bob")
+        turns.reply_done("bob")
+        assert turns.holder is None and turns.phase == IDLE
+
+    run(body, on_grant=granted.append)
+
+
+def test_priority_order_puts_the_host_first():
+    async def body(turns):
+        turns.request("alice")
+        turns.request("bob")
+        turns.request("host", PRIORITY_HOST)
+        assert queue(turns) == ["host", "bob"]
+
+    run(body, order="priority", preempt="none")
+
+
+def test_stuck_reply_releases_the_floor():
+    async def body(turns):
+        turns.request("alice")
+        turns.request("bob")
+        turns.finish("alice")
+        await asyncio.sleep(0.05)
+        assert turns.holder == "bob"
+
+    run(body, response_timeout=0.01)
@@ -0,0 +1,170 @@
+"""
+Cached LiveKit access tokens for judge connections
+Credentials are read once, and each room's JWT is reused until it nears
+expiry. A background task re-signs tokens before they expire, so connects
+and reconnects normally never sign on the critical path.
+"""
+
+import os
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, Iterable, Optional
+
+from livekit import api
+
+logger = logging.getLogger("tokens")
+logger.setLevel(logging.INFO)
+
+JUDGE_IDENTITY = "ptt-agent"
+JUDGE_NAME = "AI Judge"
+
+
+@dataclass
+class LiveKitCredentials:
+    url: str
+    api_key: str
+    api_secret: str
+
+
+@dataclass
+class _CachedToken:
+    jwt: str
+    expires_at: float
+    last_used: float
+
+
+def load_credentials() -> Optional[LiveKitCredentials]:
+    """Read LiveKit credentials from the environment"""
+    url = os.getenv("LIVEKIT_URL") or os.getenv("LIVEKIT_WS_URL")
+    api_key = os.getenv("LIVEKIT_API_KEY")
+    api_secret = os.getenv("LIVEKIT_API_SECRET")
+
+    if not all([url, api_key, api_secret]):
+        return None
+    return LiveKitCredentials(url, api_key, api_secret)
+
+
+class TokenCache:
+    """Per-room JWT cache with background refresh"""
+
+    def __init__(self, ttl: float = 6 * 3600, refresh_margin: float = 600, refresh_interval: float = 60):
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.refresh_interval = refresh_interval
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self._credentials: Optional[LiveKitCredentials] = None
+        self._credentials_loaded = False
+        self._tokens: Dict[str, _CachedToken] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def credentials(self) -> Optional[LiveKitCredentials]:
+        if not self._credentials_loaded:
+            self._credentials = load_credentials()
+            self._credentials_loaded = True
+        return self._credentials
+
+    def _mint(self, room_name: str) -> str:
+        credentials = self.credentials
+        token = api.AccessToken(credentials.api_key, credentials.api_secret)
+        token.with_identity(JUDGE_IDENTITY)
+        token.with_name(JUDGE_NAME)
+        token.with_grants(api.VideoGrants(
+            room_join=True,
+            room=room_name,
+            can_publish=True,
+            can_subscribe=True,
+            can_publish_data=True,
+        ))
+        token.with_metadata('{"push-to-talk": "1"}')
+        token.with_ttl(timedelta(seconds=self.ttl))
+        return token.to_jwt()
+
+    def _store(self, room_name: str) -> _CachedToken:
+        now = time.monotonic()
+        cached = _CachedToken(self._mint(room_name), now + self.ttl, now)
+        self._tokens[room_name] = cached
+        return cached
+
+    def get(self, room_name: str) -> Optional[str]:
+        """Return a valid JWT for the room, or None without credentials"""
+        if not self.credentials:
+            return None
+
+        now = time.monotonic()
+        cached = self._tokens.get(room_name)
+        if cached and cached.expires_at - now > self.refresh_margin:
+            self.hits += 1
+            cached.last_used = now
+        else:
+            self.misses += 1
+            cached = self._store(room_name)
+
+        self._ensure_refresher()
+        return cached.jwt
+
+    def prefetch(self, room_names: Iterable[str]):
+        """Mint tokens ahead of a mass spawn"""
+        if not self.credentials:
+            return
+        for room_name in room_names:
+            if room_name not in self._tokens:
+                self._store(room_name)
+        self._ensure_refresher()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "cached": len(self._tokens),
+        }
+
+    def _ensure_refresher(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            try:
+                self._refresh_task = asyncio.get_running_loop().create_task(self._refresh_loop())
+            except RuntimeError:
+                # No running loop; tokens are minted on demand instead
+                pass
+
+    async def _refresh_loop(self):
+        try:
+            while self._tokens:
+                await asyncio.sleep(self.refresh_interval)
+                self.refresh_due()
+        except asyncio.CancelledError:
+            pass
+
+    def refresh_due(self):
+        """Re-sign tokens close to expiry and drop ones nobody used lately"""
+        now = time.monotonic()
+        horizon = self.refresh_margin + self.refresh_interval
+
+        for room_name, cached in list(self._tokens.items()):
+            if now - cached.last_used > self.ttl:
+                del self._tokens[room_name]
+            elif cached.expires_at - now <= horizon:
+                self._store(room_name).last_used = cached.last_used
+                self.refreshes += 1
+
+    def stop(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+
+_cache: Optional[TokenCache] = None
+
+
+def get_token_cache() -> TokenCache:
+    """Return the process-wide token cache"""
+    global _cache
+    if _cache is None:
+        _cache = TokenCache()
+    return _cache
@@ -0,0 +1,291 @@
+"""
+Per-room push-to-talk turn scheduling
+One player holds the floor at a time, from pressing the button until the
+judge has answered them, so a second press no longer throws away in-flight
+STT/LLM work. Other presses wait in a queue (FIFO, or by priority) and are
+granted the floor in turn. Preemption rules decide who may cut in (by
+default only the host), and a player who presses again while the judge is
+still answering them continues the same turn instead of starting a new one.
+"""
+
+import os
+import json
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger("turns")
+logger.setLevel(logging.INFO)
+
+PRIORITY_PLAYER = 0
+PRIORITY_HOST = 10
+
+# Floor phases
+IDLE = "idle"
+GRANTED = "granted"          # handed over from the queue, waiting for the press
+SPEAKING = "speaking"
+RESPONDING = "responding"    # released, judge is answering
+
+
+@dataclass
+class TurnDecision:
+    granted: bool
+    position: int = 0
+    preempted: Optional[str] = None
+    coalesced: bool = False
+
+    def to_dict(self) -> dict:
+        if not self.granted:
+            return {"status": "queued", "position": self.position}
+        return {"status": "coalesced" if self.coalesced else "granted"}
+
+
+@dataclass
+class _Waiting:
+    identity: str
+    priority: int
+    seq: int
+    since: float
+
+
+def host_can_preempt(requester: int, holder: int) -> bool:
+    return requester >= PRIORITY_HOST > holder
+
+
+def higher_can_preempt(requester: int, holder: int) -> bool:
+    return requester > holder
+
+
+def never_preempt(requester: int, holder: int) -> bool:
+    return False
+
+
+PREEMPTION_RULES: Dict[str, Callable[[int, int], bool]] = {
+    "host": host_can_preempt,
+    "priority": higher_can_preempt,
+    "none": never_preempt,
+}
+
+
+def speaker_priority(participant, payload: str = "") -> int:
+    """Host priority from participant attributes or the start_turn payload"""
+    attributes = getattr(participant, "attributes", None) or {}
+    if attributes.get("role") == "host" or attributes.get("isHost") in ("1", "true"):
+        return PRIORITY_HOST
+    try:
+        if json.loads(payload or "{}").get("role") == "host":
+            return PRIORITY_HOST
+    except (ValueError, AttributeError):
+        pass
+    return PRIORITY_PLAYER
+
+
+class TurnScheduler:
+    """Floor control for one room"""
+
+    def __init__(
+        self,
+        order: str = "fifo",
+        preempt: str = "host",
+        coalesce_window: float = 3.0,
+        grant_timeout: float = 15.0,
+        response_timeout: float = 30.0,
+        on_grant: Optional[Callable[[str], None]] = None,
+        on_change: Optional[Callable[[], None]] = None,
+    ):
+        self.order = order
+        self.can_preempt = PREEMPTION_RULES[preempt]
+        self.coalesce_window = coalesce_window
+        self.grant_timeout = grant_timeout
+        self.response_timeout = response_timeout
+        self.on_grant = on_grant
+        self.on_change = on_change
+
+        self.holder: Optional[str] = None
+        self.holder_priority = PRIORITY_PLAYER
+        self.phase = IDLE
+        self._released_at = 0.0
+        self._queue: List[_Waiting] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self.grants = 0
+        self.preemptions = 0
+        self.coalesced = 0
+        self._waits: Deque[float] = deque(maxlen=200)
+
+
+    def request(self, identity: str, priority: int = PRIORITY_PLAYER) -> TurnDecision:
+        """A player pressed push-to-talk"""
+        if identity == self.holder:
+            coalesced = (
+                self.phase == RESPONDING
+                and time.monotonic() - self._released_at <= self.coalesce_window
+            )
+            if self.phase in (GRANTED, SPEAKING) or coalesced:
+                if coalesced:
+                    self.coalesced += 1
+                self._set_phase(SPEAKING)
+                return TurnDecision(granted=True, coalesced=coalesced)
+
+        if self.holder is None:
+            self._take_floor(identity, priority, SPEAKING)
+            return TurnDecision(granted=True)
+
+        if identity != self.holder and self.can_preempt(priority, self.holder_priority):
+            preempted = self.holder
+            self.preemptions += 1
+            self._dequeue(identity)
+            logger.info(f"{identity} preempts {preempted}")
+            self._take_floor(identity, priority, SPEAKING)
+            return TurnDecision(granted=True, preempted=preempted)
+
+        # Includes the holder pressing again after the coalesce window
+        position = self._enqueue(identity, priority)
+        return TurnDecision(granted=False, position=position)
+
+    def finish(self, identity: str) -> bool:
+        """A player released the button; True if they held the floor"""
+        if identity != self.holder or self.phase != SPEAKING:
+            return False
+        self._released_at = time.monotonic()
+        self._set_phase(RESPONDING)
+        return True
+
+    def cancel(self, identity: str) -> bool:
+        """A player cancelled; True if they held the floor"""
+        if identity == self.holder:
+            self._pass_floor()
+            return True
+        if self._dequeue(identity):
+            self._changed()
+        return False
+
+    def reply_done(self, identity: Optional[str] = None):
+        """The judge finished answering the current holder"""
+        if self.phase != RESPONDING or (identity and identity != self.holder):
+            return
+        self._pass_floor()
+
+    def leave(self, identity: str):
+        """A participant disconnected"""
+        self.cancel(identity)
+
+    def is_speaking(self, identity: str) -> bool:
+        return self.holder == identity and self.phase == SPEAKING
+
+    def upcoming(self, count: int) -> List[str]:
+        """The next players in line for the floor"""
+        return [w.identity for w in self._queue[:count]]
+
+
+    def _enqueue(self, identity: str, priority: int) -> int:
+        if not any(w.identity == identity for w in self._queue):
+            self._queue.append(_Waiting(identity, priority, next(self._seq), time.monotonic()))
+            if self.order == "priority":
+                self._queue.sort(key=lambda w: (-w.priority, w.seq))
+            self._changed()
+        return self.position(identity)
+
+    def _dequeue(self, identity: str) -> bool:
+        before = len(self._queue)
+        self._queue = [w for w in self._queue if w.identity != identity]
+        return len(self._queue) != before
+
+    def position(self, identity: str) -> int:
+        for index, waiting in enumerate(self._queue, start=1):
+            if waiting.identity == identity:
+                return index
+        return 0
+
+
+    def _take_floor(self, identity: str, priority: int, phase: str):
+        self.holder = identity
+        self.holder_priority = priority
+        self.grants += 1
+        self._set_phase(phase)
+
+    def _pass_floor(self):
+        self.holder = None
+        self.holder_priority = PRIORITY_PLAYER
+        if not self._queue:
+            self._set_phase(IDLE)
+            return
+
+        waiting = self._queue.pop(0)
+        self._waits.append(time.monotonic() - waiting.since)
+        self._take_floor(waiting.identity, waiting.priority, GRANTED)
+        logger.info(f"Floor granted to {waiting.identity} after {self._waits[-1]:.1f}s")
+        if self.on_grant:
+            self.on_grant(waiting.identity)
+
+    def _set_phase(self, phase: str):
+        self.phase = phase
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+        # Don't let an absent player or a stuck reply hold the floor forever
+        timeout = {GRANTED: self.grant_timeout, RESPONDING: self.response_timeout}.get(phase)
+        if timeout:
+            holder = self.holder
+            self._timer = asyncio.get_running_loop().call_later(timeout, self._expire, holder, phase)
+        self._changed()
+
+    def _expire(self, holder: str, phase: str):
+        self._timer = None
+        if self.holder == holder and self.phase == phase:
+            logger.info(f"Turn for {holder} timed out while {phase}")
+            self._pass_floor()
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change()
+
+
+    def snapshot(self) -> dict:
+        """Queue state as published to clients"""
+        now = time.monotonic()
+        return {
+            "speaker": self.holder,
+            "phase": self.phase,
+            "depth": len(self._queue),
+            "queue": [
+                {"identity": w.identity, "position": i, "waitSeconds": round(now - w.since, 1)}
+                for i, w in enumerate(self._queue, start=1)
+            ],
+        }
+
+    def stats(self) -> Dict[str, float]:
+        waits = sorted(self._waits)
+        return {
+            "depth": len(self._queue),
+            "grants": self.grants,
+            "preemptions": self.preemptions,
+            "coalesced": self.coalesced,
+            "wait_p50_s": round(waits[len(waits) // 2], 2) if waits else 0.0,
+            "wait_max_s": round(waits[-1], 2) if waits else 0.0,
+        }
+
+    def close(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+
+def create_turn_scheduler(
+    on_grant: Optional[Callable[[str], None]] = None,
+    on_change: Optional[Callable[[], None]] = None,
+) -> TurnScheduler:
+    """Scheduler configured from TURN_ORDER, TURN_PREEMPT and TURN_COALESCE_WINDOW"""
+    return TurnScheduler(
+        order=os.getenv("TURN_ORDER", "fifo"),
+        preempt=os.getenv("TURN_PREEMPT", "host"),
+        coalesce_window=float(os.getenv("TURN_COALESCE_WINDOW", "3")),
+        on_grant=on_grant,
+        on_change=on_change,
+    )
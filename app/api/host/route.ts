@@ -20,24 +20,7 @@ async function callBaseten(question: string, gameContext?: any, personality?: 'd
       'Content-Type': 'application/json',
       'Authorization': `Bearer ${apiKey}`
     },
-    body: JSON.stringify({
-      model: modelName,
-      messages: [
-        {
-          role: "system",
-          content: "You are a dramatic English-speaking game narrator for Werewolf/Mafia. CRITICAL RULE: You MUST respond ONLY in English language. Never use Chinese (中文). Keep responses SHORT (1-2 sentences maximum). Be dramatic and atmospheric. Only reveal information players should know based on their role and game phase."
-        },
-        {
-          role: "user",
-          content: `Game Context: ${gameContext ? JSON.stringify(gameContext, null, 2) : 'Not started'}\n\nNarration Request: ${question}\n\nIMPORTANT: Respond in English only with 1-2 dramatic sentences. Do not use Chinese characters.`
-        }
-      ],
-      max_tokens: 150,
-      temperature: 0.5,
-      top_p: 0.8,
-      stream: false,
-      response_format: { type: "text" }
-    })
+    body: JSON.stringify(basetenRequestBody(modelName, question, gameContext, false))
   })
 
   console.log('Baseten response status:', response.status)
@@ -129,6 +112,106 @@ async function callBaseten(question: string, gameContext?: any, personality?: 'd
   return trimmed
 }
 
+function basetenRequestBody(modelName: string, question: string, gameContext: any, stream: boolean) {
+  return {
+    model: modelName,
+    messages: [
+      {
+        role: "system",
+        content: "You are a dramatic English-speaking game narrator for Werewolf/Mafia. CRITICAL RULE: You MUST respond ONLY in English language. Never use Chinese (中文). Keep responses SHORT (1-2 sentences maximum). Be dramatic and atmospheric. Only reveal information players should know based on their role and game phase."
+      },
+      {
+        role: "user",
+        content: `Game Context: ${gameContext ? JSON.stringify(gameContext, null, 2) : 'Not started'}\n\nNarration Request: ${question}\n\nIMPORTANT: Respond in English only with 1-2 dramatic sentences. Do not use Chinese characters.`
+      }
+    ],
+    max_tokens: 150,
+    temperature: 0.5,
+    top_p: 0.8,
+    stream,
+    response_format: { type: "text" }
+  }
+}
+
+// Streams Baseten tokens to the caller as server-sent events:
+//   data: {"delta": "..."}                      one per token chunk
+//   data: {"answer": "...", "provider": "..."}  final, same shape as the JSON reply
+// A canned answer after a failed or unusable stream is marked provider 'fallback'
+// so agents routing between providers can tell it apart from a real reply.
+function streamBaseten(question: string, gameContext?: any): Response {
+  const apiKey = getEnv('BASETEN_API_KEY')
+  const modelName = getEnv('BASETEN_MODEL_ID', 'zai-org/GLM-4.6')
+  const encoder = new TextEncoder()
+
+  const stream = new ReadableStream({
+    async start(controller) {
+      const send = (event: any) => controller.enqueue(encoder.encode(`data: ${JSON.stringify(event)}\n\n`))
+      let assembled = ''
+
+      try {
+        console.log('Streaming Baseten API with model:', modelName)
+        const response = await fetch('https://inference.baseten.co/v1/chat/completions', {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+            'Authorization': `Bearer ${apiKey}`
+          },
+          body: JSON.stringify(basetenRequestBody(modelName, question, gameContext, true))
+        })
+
+        if (!response.ok || !response.body) {
+          throw new Error(`Baseten API error: ${response.status}`)
+        }
+
+        const reader = response.body.getReader()
+        const decoder = new TextDecoder()
+        let buffer = ''
+        while (true) {
+          const { done, value } = await reader.read()
+          if (done) break
+          buffer += decoder.decode(value, { stream: true })
+          const lines = buffer.split(/\r?\n/)
+          buffer = lines.pop() || ''
+          for (const line of lines) {
+            const trimmed = line.trim()
+            if (!trimmed.startsWith('data:')) continue
+            const payload = trimmed.slice(5).trim()
+            if (!payload || payload === '[DONE]') continue
+            try {
+              const deltaText = JSON.parse(payload).choices?.[0]?.delta?.content || ''
+              assembled += deltaText
+              // Never forward Chinese text; the final answer falls back to English below
+              if (deltaText && !/[\u4e00-\u9fa5]/.test(deltaText)) send({ delta: deltaText })
+            } catch {
+              // Not JSON payload; ignore this chunk
+            }
+          }
+        }
+      } catch (error) {
+        console.error('❌ Baseten stream error:', error)
+      }
+
+      let answer = assembled.trim()
+      let provider = 'baseten'
+      if (!answer || answer.length < 3 || /[\u4e00-\u9fa5]/.test(answer)) {
+        console.warn('⚠️ Baseten stream returned empty/invalid response, using English fallback')
+        answer = 'The game continues. Stay alert and trust your instincts.'
+        provider = 'fallback'
+      }
+      send({ answer, provider })
+      controller.close()
+    }
+  })
+
+  return new Response(stream, {
+    headers: {
+      'Content-Type': 'text/event-stream',
+      'Cache-Control': 'no-cache',
+      'Connection': 'keep-alive'
+    }
+  })
+}
+
 async function callJanitorAI(question: string, gameContext?: any, personality?: 'default' | 'funny' | 'rap'): Promise<string> {
   const apiKey = getEnv('JANITOR_AI_API_KEY')
   
@@ -256,6 +339,11 @@ export async function POST(req: Request) {
 
     console.log(`Provider preference: ${preferredProvider}, Baseten available: ${useBaseten}, JanitorAI available: ${useJanitorAI}`)
 
+    // Agents ask for a token stream so players see the judge's first words sooner
+    if (body?.stream === true && useBaseten && preferredProvider !== 'janitorai') {
+      return streamBaseten(question, gameContext)
+    }
+
     // If user prefers a specific provider, try that first
     if (preferredProvider === 'baseten' && useBaseten) {
       try {
@@ -382,7 +470,8 @@ export async function POST(req: Request) {
     }
     
     console.log('Using mock response:', answer.substring(0, 50))
-    return NextResponse.json({ answer, provider: 'mock' })
+    // With a provider configured we only get here after it failed
+    return NextResponse.json({ answer, provider: useBaseten || useJanitorAI ? 'fallback' : 'mock' })
   } catch (e) {
     console.error('Host API error:', e)
     return NextResponse.json({ error: 'bad_request' }, { status: 400 })
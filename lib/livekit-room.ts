@@ -9,6 +9,74 @@ export function generateRoomCode(): string {
   return Math.random().toString(36).substring(2, 8).toUpperCase()
 }
 
+// Judge agents batch their messages into a small binary envelope
+// (see agent/outbound.py); plain JSON packets are still accepted
+const ENVELOPE_MAGIC = 0xa5
+const FLAG_DEFLATE = 0x01
+const FLAG_CHUNKED = 0x02
+const pendingChunks = new Map<string, (Uint8Array | undefined)[]>()
+
+async function inflate(body: Uint8Array): Promise<Uint8Array> {
+  const stream = new Blob([body]).stream().pipeThrough(new DecompressionStream('deflate'))
+  return new Uint8Array(await new Response(stream).arrayBuffer())
+}
+
+function concatChunks(chunks: Uint8Array[]): Uint8Array {
+  const body = new Uint8Array(chunks.reduce((total, chunk) => total + chunk.length, 0))
+  let offset = 0
+  for (const chunk of chunks) {
+    body.set(chunk, offset)
+    offset += chunk.length
+  }
+  return body
+}
+
+// Turn one data packet into the messages it carries ([] while chunks are missing)
+export async function decodeDataPacket(payload: Uint8Array, sender = ''): Promise<any[]> {
+  const decoder = new TextDecoder()
+  if (payload[0] !== ENVELOPE_MAGIC) {
+    const strData = decoder.decode(payload)
+    try {
+      return [JSON.parse(strData)]
+    } catch {
+      return [{ raw: strData }]
+    }
+  }
+
+  const flags = payload[1]
+  let body: Uint8Array
+  if (flags & FLAG_CHUNKED) {
+    const header = new DataView(payload.buffer, payload.byteOffset, payload.byteLength)
+    const key = `${sender}:${header.getUint32(2)}`
+    const chunks = pendingChunks.get(key) ?? new Array(header.getUint16(8)).fill(undefined)
+    chunks[header.getUint16(6)] = payload.slice(10)
+    if (chunks.some((chunk) => chunk === undefined)) {
+      pendingChunks.set(key, chunks)
+      return []
+    }
+    pendingChunks.delete(key)
+    body = concatChunks(chunks as Uint8Array[])
+  } else {
+    body = payload.subarray(2)
+  }
+
+  if (flags & FLAG_DEFLATE) {
+    body = await inflate(body)
+  }
+
+  // Length-prefixed JSON records
+  const view = new DataView(body.buffer, body.byteOffset, body.byteLength)
+  const messages: any[] = []
+  let offset = 0
+  while (offset < body.length) {
+    const length = view.getUint32(offset)
+    offset += 4
+    messages.push(JSON.parse(decoder.decode(body.subarray(offset, offset + length))))
+    offset += length
+  }
+  return messages
+}
+
 // Connect to a LiveKit room with a room code
 export async function connectToRoom(
   roomCode: string,
@@ -64,15 +132,13 @@ export async function connectToRoom(
       currentRoom.on(RoomEvent.ParticipantDisconnected, onParticipantLeft)
     }
     if (onDataReceived) {
+      // Decode in arrival order even when a packet needs async inflating
+      let decoding = Promise.resolve()
       currentRoom.on(RoomEvent.DataReceived, (payload: Uint8Array, participant?: RemoteParticipant) => {
-        const decoder = new TextDecoder()
-        const strData = decoder.decode(payload)
-        try {
-          const jsonData = JSON.parse(strData)
-          onDataReceived(jsonData, participant)
-        } catch {
-          onDataReceived({ raw: strData }, participant)
-        }
+        decoding = decoding
+          .then(() => decodeDataPacket(payload, participant?.identity))
+          .then((messages) => messages.forEach((message) => onDataReceived(message, participant)))
+          .catch((error) => console.error('Failed to decode data packet:', error))
       })
     }
 